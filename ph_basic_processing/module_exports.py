@@ -0,0 +1,108 @@
+"""Classes and functions for finding the names that a module exports to "from module import *", as TestMethod needs to
+for asterisk imports.  Each module is only parsed once for as long as it's unchanged, even across runs of py-holmes: its
+names are kept in a persistent cache (see persistent_caches.py), keyed by the module's path and checked against its
+modification time and size.
+"""
+
+
+#
+# IMPORTS
+#
+import ast
+import os
+
+from ph_basic_processing.parsers import get_class_name_from_definition_line, get_method_name_from_definition_line
+from ph_basic_processing.persistent_caches import load_persistent_cache, save_persistent_cache
+
+
+#
+# GLOBAL VARIABLES
+#
+EXPORTED_NAMES_CACHE_NAME = "exported_names_of_modules"     # The name of the persistent cache that EXPORTED_NAMES_OF_MODULES is kept in
+EXPORTED_NAMES_OF_MODULES = {}  # For caching results of get_exported_names().  Keys are absolute filepaths of modules.  Values are a tuple containing (the module's (modification time in nanoseconds, size in bytes) when its names were found, a tuple of the names)
+exported_names_loaded = False   # Whether EXPORTED_NAMES_OF_MODULES has been loaded from its persistent cache yet
+exported_names_unsaved = False  # Whether EXPORTED_NAMES_OF_MODULES has changed since it was last saved to its persistent cache
+
+
+#
+# HELPER FUNCTIONS
+#
+def get_exported_names(filepath: str) -> tuple:
+    """Return the names of the outermost classes and functions that the module at filepath, an absolute path, exports
+    to "from module import *", in the order they're defined.  If the module sets __all__ to a list or tuple of strings,
+    those names are returned instead.  Otherwise, names starting with an underscore aren't exported.
+    Modules that can't be parsed are searched line by line for class and function definitions without any indentation.
+    """
+    global exported_names_loaded, exported_names_unsaved
+    if not exported_names_loaded:
+        saved = load_persistent_cache(EXPORTED_NAMES_CACHE_NAME)
+        if isinstance(saved, dict):
+            EXPORTED_NAMES_OF_MODULES.update(saved)
+        exported_names_loaded = True
+
+    stat_result = os.stat(filepath)
+    version = (stat_result.st_mtime_ns, stat_result.st_size)
+    if filepath in EXPORTED_NAMES_OF_MODULES and EXPORTED_NAMES_OF_MODULES[filepath][0] == version:
+        return EXPORTED_NAMES_OF_MODULES[filepath][1]
+
+    with open(filepath, "r", encoding="utf-8") as file:
+        file_content = file.read()
+    try:
+        names = exported_names_in_tree(ast.parse(file_content))
+    except (SyntaxError, ValueError) as err:
+        names = exported_names_in_lines(file_content.splitlines(keepends=True))
+    EXPORTED_NAMES_OF_MODULES[filepath] = (version, names)
+    exported_names_unsaved = True
+    return names
+
+
+def save_exported_names() -> None:
+    """Save EXPORTED_NAMES_OF_MODULES to its persistent cache, if it's changed since it was last saved."""
+    global exported_names_unsaved
+    if exported_names_unsaved:
+        save_persistent_cache(EXPORTED_NAMES_CACHE_NAME, EXPORTED_NAMES_OF_MODULES)
+        exported_names_unsaved = False
+
+
+def exported_names_in_tree(tree: ast.Module) -> tuple:
+    """Return the names that the module parsed into tree exports, as described in get_exported_names()."""
+    names = []
+    all_names = None
+    for node in tree.body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            names.append(node.name)
+        elif isinstance(node, ast.Assign) and any(isinstance(target, ast.Name) and target.id == "__all__" for target in node.targets):
+            all_names = literal_names_in(node.value)
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name) and node.target.id == "__all__" and node.value is not None:
+            all_names = literal_names_in(node.value)
+        elif isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name) and node.target.id == "__all__" and all_names is not None:
+            more_names = literal_names_in(node.value)
+            all_names = all_names + more_names if more_names is not None else None
+    if all_names is not None:
+        return tuple(all_names)
+    return tuple(name for name in names if not name.startswith("_"))
+
+
+def literal_names_in(node: ast.AST):
+    """Return node as a list of names if it's a list or tuple of string literals, or None if it isn't."""
+    try:
+        value = ast.literal_eval(node)
+    except ValueError as err:
+        return None
+    if isinstance(value, (list, tuple)) and all(isinstance(element, str) for element in value):
+        return list(value)
+    return None
+
+
+def exported_names_in_lines(file_content: list) -> tuple:
+    """Return the names of the classes and functions defined on lines of file_content, a line-by-line list of a
+    module's contents, that don't begin with whitespace (indicating that they're outermost).
+    """
+    names = []
+    for line in file_content:
+        if len(line) > 0 and line[0] not in ["\t", " ", "\n"]:
+            if line.startswith("class "):
+                names.append(get_class_name_from_definition_line(line))
+            elif line.startswith("def "):
+                names.append(get_method_name_from_definition_line(line))
+    return tuple(names)
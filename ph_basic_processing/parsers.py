@@ -1,7 +1,7 @@
 """Classes and functions for parsing strings."""
 
 import string
-from fnmatch import fnmatch
+import ast
 from os import path
 from Levenshtein import distance as lev
 
@@ -317,6 +317,8 @@ def matches_an_ignore_pattern(input_string: str, optional_ignore_patterns=None)
     input_string must be an absolute path.
     If you wish to use a set of custom ignore patterns, make it the argument for optional_ignore_patterns.  It should
     be a list of UNIX-like pattern strings.
+    The patterns are compiled into a single regex once, and the decision for each input_string is remembered; see
+    scrapers_for_holmesignore_and_holmessearchextend.IgnorePatternMatcher.
     """
     # Handle errors
     # input_string not a string
@@ -331,16 +333,14 @@ def matches_an_ignore_pattern(input_string: str, optional_ignore_patterns=None)
 
     # Grab the patterns to use
     if optional_ignore_patterns is None:
-        from ph_variable_sharing.shared_variables import get_ignore_patterns
-        patterns = get_ignore_patterns()
+        from ph_variable_sharing.shared_variables import get_ignore_matcher
+        matcher = get_ignore_matcher()
     else:
-        patterns = optional_ignore_patterns
+        from ph_basic_processing.scrapers_for_holmesignore_and_holmessearchextend import get_ignore_pattern_matcher
+        matcher = get_ignore_pattern_matcher(optional_ignore_patterns)
 
     # Compare input_string to patterns
-    for this_pattern in patterns:
-        if fnmatch(input_string, this_pattern):
-            return True
-    return False
+    return matcher.matches(input_string)
 
 
 def find_class_containing_method(line_number: int, module_content: list):
@@ -385,6 +385,44 @@ def find_class_containing_method(line_number: int, module_content: list):
     return class_containing, ii + 1
 
 
+def get_containers_of_lines(module_content: list) -> tuple:
+    """Parse module_content once with ast, and return two lists that give, for each line, the innermost class or
+    function containing it as a (name, type, definition line number) tuple, where type is "class", "func", or "file", and
+    line numbers start counting at 1.  Lines outside any class or function are contained by ("<module>", "file", 0).
+    In the first list, the lines of a class or function's own definition (from "def " or "class " up to its body) are
+    contained by that class or function.  In the second, they're contained by the next container out.
+    Raises SyntaxError (or ValueError, for null bytes) if module_content isn't valid Python.
+    :param module_content:  newline-separated list containing the entire content of the file, as from readlines()
+    """
+    # Handle errors
+    # module_content not a list
+    if not isinstance(module_content, list):
+        raise TypeError("module_content must be a list")
+
+    module_container = ("<module>", "file", 0)
+    containers = [module_container] * (len(module_content) + 1)     # Index 0 is unused, so that line numbers can be used as indices
+    outer_containers = containers.copy()
+
+    # Walk the tree outermost first, so that each container's lines are overwritten by those of the containers within it.
+    # Expressions can't contain classes or functions, so they're skipped
+    def mark_containers_within(node, container) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                child_container = (child.name, "class" if isinstance(child, ast.ClassDef) else "func", child.lineno)
+                for line_number in range(child.lineno, child.end_lineno + 1):
+                    containers[line_number] = child_container
+                    outer_containers[line_number] = child_container
+                for line_number in range(child.lineno, max(child.lineno + 1, child.body[0].lineno)):
+                    outer_containers[line_number] = container
+                mark_containers_within(child, child_container)
+            elif not isinstance(child, ast.expr):
+                mark_containers_within(child, container)
+    mark_containers_within(ast.parse("".join(module_content)), module_container)
+
+    # Return!
+    return containers, outer_containers
+
+
 def get_module_level_only_from_file_content(file_content_in: list) -> list:
     """Return a version of file_content_in in which all lines that aren't at the module level have been removed.
     :param file_content_in: list.   newline-separated list of strings comprising the content of a file.  Should include leading whitespace.
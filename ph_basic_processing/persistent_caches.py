@@ -0,0 +1,83 @@
+"""Classes and functions for keeping caches on disk between runs of py-holmes, in the .holmescache folder of the
+project directory.  Each cache is a single pickle file.  A cache that's missing, unreadable, or from an older version of
+py-holmes is treated as empty, and is simply rebuilt.
+"""
+
+
+#
+# IMPORTS
+#
+import os
+import pickle
+
+from ph_variable_sharing import shared_variables
+
+
+#
+# GLOBAL VARIABLES
+#
+CACHE_DIR_NAME = ".holmescache"
+CACHE_FORMAT_VERSION = 5    # Bump whenever the layout of any cache changes, so that caches saved before then are ignored
+
+
+#
+# HELPER FUNCTIONS
+#
+def get_cache_dir() -> str:
+    """Return the absolute path of the folder that persistent caches are kept in."""
+    shared_variables.initialize()
+    return os.path.join(shared_variables.ROOT_DIR, CACHE_DIR_NAME)
+
+
+def get_cache_path(cache_name: str) -> str:
+    """Return the absolute path of the file that the persistent cache named cache_name is kept in."""
+    return os.path.join(get_cache_dir(), cache_name + ".pickle")
+
+
+def load_persistent_cache(cache_name: str):
+    """Return the content of the persistent cache named cache_name, or None if it hasn't been saved yet, or can't be
+    used.
+    """
+    # Handle errors
+    # cache_name not a string
+    if not isinstance(cache_name, str):
+        raise TypeError("cache_name must be a string")
+    # cache_name empty
+    if len(cache_name) == 0:
+        raise ValueError("cache_name must not be empty")
+
+    # Load
+    try:
+        with open(get_cache_path(cache_name), "rb") as cache_file:
+            format_version, content = pickle.load(cache_file)
+    except (OSError, EOFError, ValueError, TypeError, AttributeError, ImportError, pickle.UnpicklingError) as err:
+        return None
+    if format_version != CACHE_FORMAT_VERSION:
+        return None
+    return content
+
+
+def save_persistent_cache(cache_name: str, content) -> None:
+    """Save content as the persistent cache named cache_name.  The cache is written to a temporary file first, then
+    moved into place, so that a run of py-holmes that's cut short never leaves a half-written cache behind.  Caches that
+    can't be written (eg because the project directory is read-only) are skipped.
+    """
+    # Handle errors
+    # cache_name not a string
+    if not isinstance(cache_name, str):
+        raise TypeError("cache_name must be a string")
+    # cache_name empty
+    if len(cache_name) == 0:
+        raise ValueError("cache_name must not be empty")
+
+    # Save
+    cache_path = get_cache_path(cache_name)
+    temporary_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(get_cache_dir(), exist_ok=True)
+        with open(temporary_path, "wb") as cache_file:
+            pickle.dump((CACHE_FORMAT_VERSION, content), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, cache_path)
+    except OSError as err:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
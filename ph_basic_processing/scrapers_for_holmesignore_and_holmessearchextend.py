@@ -1,13 +1,63 @@
 """Classes and functions for gathering patterns from .holmesignore and .holmessearchextend"""
 
 
+from fnmatch import translate
 from os import path
+import re
 from ph_basic_processing.stripping import strip_custom
 
 
+#
+# GLOBAL VARIABLES
+#
+IGNORE_PATTERN_MATCHERS = {}    # For caching results of get_ignore_pattern_matcher().  Keys are tuples of UNIX-like patterns.  Values are IgnorePatternMatcher objects
+
+
+#
+# CLASSES
+#
+class IgnorePatternMatcher:
+    """A list of UNIX-like patterns, such as those in .holmesignore, compiled into a single regex that a path matches if
+    fnmatch.fnmatch() would match it with any one of the patterns.  The decision for each path is remembered, so that
+    each path is only matched once.
+    Attributes are as follows:
+    self.patterns: tuple.       The UNIX-like patterns.
+    self.regex: re.Pattern.     The patterns compiled into one regex, or None if there are no patterns.
+    self.decisions: dict.       Keys are paths that have been checked.  Values are whether they matched.
+    """
+
+    def __init__(self, patterns: tuple) -> None:
+        self.patterns = tuple(patterns)
+        if len(self.patterns) > 0:
+            self.regex = re.compile("|".join(translate(path.normcase(this_pattern)) for this_pattern in self.patterns))
+        else:
+            self.regex = None
+        self.decisions = {}
+
+    def matches(self, input_path: str) -> bool:
+        """Return whether input_path matches any of the patterns."""
+        decision = self.decisions.get(input_path)
+        if decision is None:
+            decision = self.regex is not None and self.regex.match(path.normcase(input_path)) is not None
+            self.decisions[input_path] = decision
+        return decision
+
+
 #
 # HELPER FUNCTIONS
 #
+def get_ignore_pattern_matcher(patterns) -> IgnorePatternMatcher:
+    """Return an IgnorePatternMatcher for patterns, a list or tuple of UNIX-like patterns.  The same matcher is returned
+    every time for the same patterns, so that they're only compiled once.
+    """
+    patterns = tuple(patterns)
+    matcher = IGNORE_PATTERN_MATCHERS.get(patterns)
+    if matcher is None:
+        matcher = IgnorePatternMatcher(patterns)
+        IGNORE_PATTERN_MATCHERS[patterns] = matcher
+    return matcher
+
+
 def parse_holmesignore():
     """Read .holmesignore in the uppermost project directory and return a list of strings, where each string represents
     a UNIX-like pattern specified in .holmesignore.
@@ -0,0 +1,256 @@
+"""Classes and functions for collapsing repeated blocks of lines in post-processed execution traces, so that traces of
+loop-heavy tests can be compared and shown without expanding every iteration.
+"""
+
+
+from difflib import SequenceMatcher
+
+from ph_variable_sharing import shared_variables
+
+
+#
+# GLOBAL VARIABLES
+#
+MAX_BLOCK_LENGTH = 100      # Longest run of lines that compress_trace() will look for repeats of
+REPEAT_OPENER = " (repeated {} times:"
+REPEAT_CLOSER = " (end of repeated block)"
+
+
+#
+# CLASSES
+#
+class CompressedTrace:
+    """A post-processed execution trace in which consecutive repeats of a block of lines are stored once, along with
+    the number of times the block was repeated.
+    Attributes are as follows:
+    self.items: list.       Each item is either a line of the trace as a string, or a (block, count) tuple, where block
+                            is a tuple of items (so that repeats may be nested) and count is how many times in a row the
+                            block ran.
+    """
+
+    def __init__(self, items: list) -> None:
+        """
+        :param items:   list of items as described in the class docstring
+        """
+        # Handle errors
+        # items not a list
+        if not isinstance(items, list):
+            raise TypeError("items must be a list")
+
+        self.items = items
+
+    def __str__(self) -> str:
+        return "\n".join(self.rendered_lines())
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CompressedTrace) and self.items == other.items
+
+    def __contains__(self, s: str) -> bool:
+        """Return whether s appears in the trace as it's shown by __str__(), so that the checks done on string traces
+        also work on compressed ones.  A lone newline is found from the items, and substrings without newlines are looked
+        for in each line of the items, so that the trace is only rendered for other substrings with newlines.
+        """
+        if s == "\n":
+            # Lines never contain newlines themselves, and each repeated block is shown on at least three lines
+            return len(self.items) > 1 or (len(self.items) == 1 and not isinstance(self.items[0], str))
+        if "\n" in s:
+            return s in str(self)
+        return rendered_lines_of_contain(self.items, s)
+
+    def expand(self) -> str:
+        """Return the uncompressed trace as a string."""
+        return "\n".join(expanded_lines_of(self.items))
+
+    def rendered_lines(self) -> list:
+        """Return the trace as a list of lines for showing to the user, with each repeated block shown once between a
+        line saying how many times it was repeated and a line marking its end.
+        """
+        return rendered_lines_of(self.items)
+
+    def number_of_lines(self) -> int:
+        """Return the number of lines in the uncompressed trace."""
+        return sum(number_of_lines_of(item) for item in self.items)
+
+
+#
+# HELPER FUNCTIONS
+#
+def compress_trace(trace, max_block_length=MAX_BLOCK_LENGTH) -> CompressedTrace:
+    """Return a CompressedTrace in which every run of consecutive repeats of a block of up to max_block_length lines in
+    trace is collapsed into a single (block, count) item.  Repeats inside repeated blocks are collapsed as well.
+    :param trace:               execution trace post-processed by trace_exit_line_adders.add_exit_lines_to_trace(), or a CompressedTrace, which is returned as-is
+    :param max_block_length:    longest block of lines to look for repeats of
+    :return:                    a CompressedTrace of trace
+    """
+    # Handle errors
+    # trace is already compressed
+    if isinstance(trace, CompressedTrace):
+        return trace
+    # trace not a string
+    if not isinstance(trace, str):
+        raise TypeError("trace must be a string or a CompressedTrace")
+    # max_block_length not an int
+    if not isinstance(max_block_length, int):
+        raise TypeError("max_block_length must be an int")
+    # max_block_length less than 1
+    if max_block_length < 1:
+        raise ValueError("max_block_length must be at least 1")
+
+    # Collapse repeats until a pass doesn't shorten the trace any further.  Later passes catch repeats of blocks that
+    # themselves contain collapsed repeats.
+    items = trace.split("\n")
+    while True:
+        compressed_items = collapse_repeats(items, max_block_length)
+        if len(compressed_items) == len(items):
+            break
+        items = compressed_items
+
+    # Return!
+    return CompressedTrace(items)
+
+
+def collapse_repeats(items: list, max_block_length: int) -> list:
+    """Make one left-to-right pass over items, replacing each run of consecutive repeats of a block with a single
+    (block, count) item.  Where blocks of several lengths repeat from the same position, use the one whose repeats
+    cover the most items, preferring the shortest on ties.  The contents of each block are collapsed in turn.
+    """
+    # Compare items by integer token rather than by content, so that long lines and nested blocks are only hashed once
+    tokens_of_items = {}
+    tokens = [tokens_of_items.setdefault(item, len(tokens_of_items)) for item in items]
+
+    output = []
+    ii = 0
+    while ii < len(items):
+        best_block_length = 0
+        best_count = 1
+        for block_length in range(1, min(max_block_length, (len(items) - ii) // 2) + 1):
+            if tokens[ii + block_length] != tokens[ii]:     # Cheap check before comparing whole blocks
+                continue
+            block = tokens[ii:ii + block_length]
+            count = 1
+            while tokens[ii + count*block_length:ii + (count+1)*block_length] == block:
+                count += 1
+            if count > 1 and count*block_length > best_count*best_block_length:
+                best_block_length = block_length
+                best_count = count
+        if best_block_length == 0:
+            output.append(items[ii])
+            ii += 1
+        else:
+            block = tuple(collapse_repeats(items[ii:ii + best_block_length], max_block_length))
+            output.append((block, best_count))
+            ii += best_count * best_block_length
+
+    # Return!
+    return output
+
+
+def expanded_lines_of(items) -> list:
+    """Return the lines of items, a list or tuple of CompressedTrace items, with every repeated block expanded."""
+    output = []
+    for item in items:
+        if isinstance(item, str):
+            output.append(item)
+        else:
+            block, count = item
+            output.extend(expanded_lines_of(block) * count)
+    return output
+
+
+def rendered_lines_of(items) -> list:
+    """Return the lines of items, a list or tuple of CompressedTrace items, with every repeated block shown once
+    between REPEAT_OPENER and REPEAT_CLOSER lines.
+    """
+    output = []
+    for item in items:
+        if isinstance(item, str):
+            output.append(item)
+        else:
+            block, count = item
+            output.append(REPEAT_OPENER.format(count))
+            output.extend(rendered_lines_of(block))
+            output.append(REPEAT_CLOSER)
+    return output
+
+
+def rendered_lines_of_contain(items, s: str) -> bool:
+    """Return whether s, which has no newlines, appears in any of the lines that rendered_lines_of() returns for
+    items, without building them.  Each repeated block is only looked in once.
+    """
+    for item in items:
+        if isinstance(item, str):
+            if s in item:
+                return True
+        else:
+            block, count = item
+            if s in REPEAT_OPENER.format(count) or s in REPEAT_CLOSER or rendered_lines_of_contain(block, s):
+                return True
+    return False
+
+
+def number_of_lines_of(item) -> int:
+    """Return the number of lines item, a single CompressedTrace item, stands for once expanded."""
+    if isinstance(item, str):
+        return 1
+    block, count = item
+    return count * sum(number_of_lines_of(element) for element in block)
+
+
+def distance_weight_of(item) -> int:
+    """Return the distance that adding or removing item, a single CompressedTrace item, contributes to
+    compressed_trace_distance().  As in variant_test_runners.distance_between_execution_traces(), function calls weigh
+    10, exit lines weigh nothing, and every other line weighs 1.  A repeated block weighs as much as all of its repeats.
+    """
+    if isinstance(item, str):
+        item = " " + item   # distance_between_execution_traces() checks lines after ndiff has prefixed them
+        if " ||| exiting modulename: " in item:
+            return 0
+        if " --- modulename: " in item:
+            return 10
+        return 1
+    block, count = item
+    return count * sum(distance_weight_of(element) for element in block)
+
+
+def compressed_trace_distance(trace_new: CompressedTrace, trace_old: CompressedTrace) -> int:
+    """Return the distance between two CompressedTrace objects, using the same weights as
+    variant_test_runners.distance_between_execution_traces(), without expanding either trace.  Where the same block is
+    repeated a different number of times in each trace, only the extra or missing repeats add distance.  Any other
+    differing stretch is expanded on its own and compared line by line.  Since stretches are compared separately, a
+    change that shifts where a repeated block starts can cost somewhat more than it would in the uncompressed traces.
+    """
+    distance = 0
+    matcher = SequenceMatcher(None, trace_old.items, trace_new.items, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        old_items = trace_old.items[old_start:old_end]
+        new_items = trace_new.items[new_start:new_end]
+        # Same blocks, repeated a different number of times
+        if len(old_items) == len(new_items) and all(not isinstance(old_item, str) and not isinstance(new_item, str) and old_item[0] == new_item[0] for old_item, new_item in zip(old_items, new_items)):
+            distance += sum(distance_weight_of((old_item[0], abs(old_item[1] - new_item[1]))) for old_item, new_item in zip(old_items, new_items))
+            continue
+        # Pure removal or addition
+        if not old_items or not new_items:
+            distance += sum(distance_weight_of(item) for item in old_items + new_items)
+            continue
+        # Anything else
+        old_lines = expanded_lines_of(old_items)
+        new_lines = expanded_lines_of(new_items)
+        line_matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+        for line_tag, old_line_start, old_line_end, new_line_start, new_line_end in line_matcher.get_opcodes():
+            if line_tag != "equal":
+                distance += sum(distance_weight_of(line) for line in old_lines[old_line_start:old_line_end] + new_lines[new_line_start:new_line_end])
+
+    # Return!
+    return distance
+
+
+def get_trace_compress() -> bool:
+    """Return whether --trace_compress was given, ie whether execution traces of test variants should be compressed."""
+    shared_variables.initialize()
+    try:
+        trace_compress = shared_variables.trace_compress
+    except AttributeError as err:
+        trace_compress = False
+    return trace_compress
@@ -4,18 +4,24 @@ The following parameters are assumed when the trace.Trace object is produced:
 """
 
 
-from ph_basic_processing.parsers import leading_spaces_of, get_method_name_from_definition_line, get_class_name_from_definition_line, starts_with_one_of, index_of_last_substring_in_string, begins_with_def_or_class, get_modulename_from_functioncall, get_funcname_from_functioncall, is_paren_balanced, strip_file_extension
+from ph_basic_processing.parsers import get_containers_of_lines, leading_spaces_of, get_method_name_from_definition_line, get_class_name_from_definition_line, starts_with_one_of, index_of_last_substring_in_string, begins_with_def_or_class, get_modulename_from_functioncall, get_funcname_from_functioncall, is_paren_balanced, strip_file_extension
 from ph_basic_processing.stripping import strip_custom
-from ph_original_test_result_generation.ph_dir_and_file_finders.pathfinders import FILES_ALREADY_READ, get_absolute_path
+from ph_original_test_result_generation.ph_dir_and_file_finders.pathfinders import FILES_ALREADY_FOUND, CONTAINERS_OF_FILES, get_absolute_path, file_contains_content_on_line, is_found_non_ignored_user_file, get_found_user_filenames
+from ph_original_test_result_generation.ph_dir_and_file_finders.line_caches import LINE_CACHE
 from ph_variable_sharing import shared_variables
 
 from warnings import warn
+from functools import lru_cache
+import re
 
 
 #
 # GLOBALED VARIABLES
 #
 function_stack = []     # For keeping track of the layers of functions we're inside of.  Each entry is a sublist where the first entry is a modulename, and the second is a funcname
+PARSED_TRACELINES_MAX_SIZE = 2 ** 16   # Most distinct tracelines whose parses are held at once by parse_traceline_cached()
+FUNCTIONCALL_PATTERN = re.compile(r" --- modulename: ([^, ]*), funcname: ([^, ]*)")   # A functioncall traceline as the trace module prints it
+LINELOG_PATTERN = re.compile(r"([^ :]*)\.py\(([0-9]+)\):(.*)", re.DOTALL)   # A linelog traceline as the trace module prints it, from a file whose name has no spaces or colons
 
 
 #
@@ -24,7 +30,7 @@ function_stack = []     # For keeping track of the layers of functions we're ins
 class ParsedTraceline:
     """Basic container for file and line number information of a traceline.
     Attributes are as follows:
-    self.category: str.                     The general meaning of the line in the execution trace, ie blank vs linelog vs function call.
+    self.category: str.                     The general meaning of the line in the execution trace, ie blank vs linelog vs function call vs function exit.
     self.traceline: str.                    The content of the line; what we already had before parsing.
     self.file_no_extension: str.            The file containing the line, if the category of the line is linelog.
     self.file_with_extension: str.          Same as file_no_extension, but with a file extension attached, if the category of the line is linelog.
@@ -32,105 +38,75 @@ class ParsedTraceline:
     self.line_content: str.                 The content of the file on line_number, if the category of the line is linelog.
     self.innermost_container: str.          The name of the innermost class, function, or just <module> that contains this line, if the category of the line is linelog.
     self.innermost_container_type: str.     Whether the innermost container is a class, func, or file, if the category of the line is linelog.
-    self.modulename: str.                   The modulename mentioned, if the category of the line is functioncall.
-    self.funcname: str.                     The funcname mentioned, if the category of the line is functioncall.
+    self.modulename: str.                   The modulename mentioned, if the category of the line is functioncall or functionexit.
+    self.funcname: str.                     The funcname mentioned, if the category of the line is functioncall or functionexit.
     self.file_path: str.                    The absolute path to the file, if the category of this line is linelog.
     """
 
+    __slots__ = ("category", "traceline", "file_no_extension", "file_with_extension", "line_number", "line_content", "innermost_container", "innermost_container_type", "modulename", "funcname", "file_path")
+
     def __init__(self, traceline: str) -> None:
-        """Build attributes given the content of the traceline we're parsing"""
-        # Assign attributes
-        # Set category
-        self.category = None
-        if ":" in traceline:
-            if " --- modulename: " in traceline and ", funcname: " in traceline and traceline.index(" --- modulename: ") < index_of_last_substring_in_string(traceline, ", funcname: "):
-                self.category = "functioncall"
-                # For this category, we also trim everything before " --- modulename: "
-                traceline = traceline[traceline.index(" --- modulename: "):]
-                # Set important variants and indices
-                traceline_until_colon = traceline[:traceline.index(":")]
-                traceline_after_colon = traceline[traceline.index(":") + 1:]
-            elif ":" in traceline and ".py(" in traceline:
-                self.category = "linelog"
-                # For this category, we also trim everything before the last space before the last ".py("
-                index_last_dotpyparen = index_of_last_substring_in_string(traceline, ".py(")
-                index_space_for_cut = None
-                for ii in range(index_last_dotpyparen-1, -1, -1):   # Walk backward until we find a space
-                    if traceline[ii] == " ":
-                        index_space_for_cut = ii
-                        break
-                if index_space_for_cut == None:
-                    index_space_for_cut = -1
-                traceline = traceline[index_space_for_cut+1:]
-                # Set important variants and indices
-                traceline_until_colon = traceline[:traceline.index(":")]
-                traceline_after_colon = traceline[traceline.index(":") + 1:]
-        else:
-            traceline_until_colon = traceline
-            traceline_after_colon = ""
-            if traceline == "":
-                self.category = "blank"
-        if self.category is None:
-            warn("traceline does not look like an execution trace line (this is okay if it's printed content): " + traceline)
-        # Set traceline
-        self.traceline = traceline
-        # Set file_with_extension and file_no_extension
-        if self.category == "blank":
-            pass
-        elif self.category == "linelog":
-            index_period_closest_before_first_colon = len(traceline_until_colon) - traceline_until_colon[::-1].index(".") - 1
-            index_open_paren_closest_before_first_colon = len(traceline_until_colon) - traceline_until_colon[::-1].index("(") - 1
-            self.file_no_extension = traceline_until_colon[:index_period_closest_before_first_colon]
-            self.file_with_extension = traceline_until_colon[:index_open_paren_closest_before_first_colon]
-        elif self.category == "functioncall":
-            pass
-        # Set line_number
-        if self.category == "blank":
-            pass
-        elif self.category == "linelog":
-            index_closed_paren_closest_before_first_colon = len(traceline_until_colon) - traceline_until_colon[::-1].index(")") - 1
-            self.line_number = int(traceline_until_colon[index_open_paren_closest_before_first_colon + 1: index_closed_paren_closest_before_first_colon])
-        elif self.category == "functioncall":
-            pass
-        # Set line_content
-        if self.category == "blank":
-            pass
-        elif self.category == "linelog":
-            if len(traceline_after_colon) > 1:
-                self.line_content = traceline_after_colon[1:]
-            else:
-                self.line_content = ""
-        elif self.category == "functioncall":
-            pass
-        # Set innermost_container
-        if self.category == "blank":
-            pass
-        elif self.category == "linelog":
+        """Build attributes given the content of the traceline we're parsing.  The text of a traceline is only parsed
+        again once it's no longer among the most recently parsed; see parse_traceline_cached().
+        """
+        # Parse the text, or look up how it was parsed before
+        self.category, self.traceline, details = parse_traceline_cached(traceline)
+
+        # Assign the attributes of the category.  Those of linelogs that depend on the file, rather than just the text,
+        # are looked up anew every time
+        if self.category == "linelog":
+            self.file_no_extension, self.file_with_extension, self.line_number, self.line_content = details
             self.innermost_container, self.innermost_container_type = self.find_innermost_container()
-            self.file_path = FILES_ALREADY_READ[self.file_with_extension][0]
-        elif self.category == "functioncall":
-            pass
-        # Set file_path
-        if self.category == "blank":
-            pass
-        elif self.category == "linelog":
-            self.file_path = FILES_ALREADY_READ[self.file_with_extension][0]
+            self.file_path = FILES_ALREADY_FOUND[self.file_with_extension]
         elif self.category == "functioncall":
-            pass
-        # Set modulename
-        if self.category == "blank":
-            pass
-        elif self.category == "linelog":
-            pass
-        elif self.category == "functioncall":
-            self.modulename = get_modulename_from_functioncall(self.traceline)
-        # Set funcname
-        if self.category == "blank":
-            pass
-        elif self.category == "linelog":
-            pass
-        elif self.category == "functioncall":
-            self.funcname = get_funcname_from_functioncall(self.traceline)
+            self.modulename, self.funcname = details
+        elif self.category is None:
+            warn("traceline does not look like an execution trace line (this is okay if it's printed content): " + traceline)
+
+    @classmethod
+    def from_functioncall(cls, modulename: str, funcname: str):
+        """Build a ParsedTraceline of category functioncall directly from its modulename and funcname, without parsing
+        any text.  For use with tracers that record structured events rather than printed tracelines.
+        """
+        parsed = cls.__new__(cls)
+        parsed.category = "functioncall"
+        parsed.traceline = f" --- modulename: {modulename}, funcname: {funcname}"
+        parsed.modulename = modulename
+        parsed.funcname = funcname
+        return parsed
+
+    @classmethod
+    def from_functionexit(cls, modulename: str, funcname: str):
+        """Build a ParsedTraceline of category functionexit, ie an exit that was recorded rather than inferred, directly
+        from its modulename and funcname.  For use with tracers that record return events.
+        """
+        parsed = cls.__new__(cls)
+        parsed.category = "functionexit"
+        parsed.traceline = f" ||| exiting modulename: {modulename}, funcname: {funcname}"
+        parsed.modulename = modulename
+        parsed.funcname = funcname
+        return parsed
+
+    @classmethod
+    def from_linelog(cls, file_with_extension: str, line_number: int, line_content: str):
+        """Build a ParsedTraceline of category linelog directly from the file, line number, and line content, without
+        parsing any text.  For use with tracers that record structured events rather than printed tracelines.
+        Lines that don't come from a .py file, or whose content couldn't be read, are kept with a category of None, just
+        like unrecognized lines of text are.
+        """
+        parsed = cls.__new__(cls)
+        parsed.traceline = f"{file_with_extension}({line_number}): {line_content}"
+        if not file_with_extension.endswith(".py") or line_content == "":
+            parsed.category = None
+            return parsed
+        parsed.category = "linelog"
+        parsed.file_with_extension = file_with_extension
+        parsed.file_no_extension = file_with_extension[:-3]
+        parsed.line_number = line_number
+        parsed.line_content = line_content
+        parsed.innermost_container, parsed.innermost_container_type = parsed.find_innermost_container()
+        parsed.file_path = FILES_ALREADY_FOUND[file_with_extension]
+        return parsed
 
     def find_innermost_container(self, count_def_line_as_next_container=False):
         """Find the innermost class or function that contains the line represented by this object, as well as the type
@@ -138,17 +114,31 @@ class ParsedTraceline:
         If count_def_line_as_next_container == False, then a function definition line ("def ") or class definition line
         ("class ") will show an inner container of itself.  If count_def_line_as_next_container == True, then such a
         line will show an inner container of the next container containing it, possibly <module>
+        Containers are looked up in the file's entry in CONTAINERS_OF_FILES, which is built with ast the first time the
+        file is seen, and rebuilt whenever it's read anew into LINE_CACHE.  Files that can't be parsed are searched line by
+        line.
         """
         line_number_as_index = self.line_number - 1
 
-        # Get the content of the file
-        # If in the cache, grab it as long as the line matches what's in the cache
-        if self.file_with_extension in FILES_ALREADY_READ and len(FILES_ALREADY_READ[self.file_with_extension][1]) >= line_number_as_index + 1 and FILES_ALREADY_READ[self.file_with_extension][1][line_number_as_index] == self.line_content + "\n":
-            file_content = FILES_ALREADY_READ[self.file_with_extension][1]
-        # Else, read it from the file
-        else:
-            with open(get_absolute_path(self.file_with_extension, self.line_content, self.line_number), "r", encoding="utf-8") as file:
-                file_content = file.readlines()
+        # Find the file
+        # If in the cache, use it as long as the line matches what's in the cache
+        file_path = FILES_ALREADY_FOUND.get(self.file_with_extension)
+        if file_path is None or not file_contains_content_on_line(file_path, self.file_with_extension, self.line_content + "\n", self.line_number, cached=True):
+            # Else, look for it
+            file_path = get_absolute_path(self.file_with_extension, self.line_content, self.line_number)
+
+        # Look the line up in the file's containers, parsing the file if its containers aren't cached for this version of it
+        file_version = LINE_CACHE.version_of(file_path)
+        if file_path not in CONTAINERS_OF_FILES or CONTAINERS_OF_FILES[file_path][0] != file_version:
+            try:
+                CONTAINERS_OF_FILES[file_path] = (file_version,) + get_containers_of_lines(LINE_CACHE.lines(file_path))
+            except (SyntaxError, ValueError) as err:
+                CONTAINERS_OF_FILES.pop(file_path, None)
+        if file_path in CONTAINERS_OF_FILES:
+            containers_of_lines = CONTAINERS_OF_FILES[file_path][2 if count_def_line_as_next_container else 1]
+            container_name, container_type, _ = containers_of_lines[self.line_number]
+            return container_name, container_type
+        file_content = LINE_CACHE.lines(file_path)
 
         # If not count_def_line_as_next_container, and the line is itself a function definition line (starting with def) or a class definition line (starting wtih class), then this is the innermost container
         if not count_def_line_as_next_container:
@@ -186,37 +176,204 @@ class ParsedTraceline:
 #
 # HELPER FUNCTIONS
 #
-def add_exit_lines_to_trace(input_trace: str):
+def parse_traceline(traceline: str) -> tuple:
+    """Parse the text of a traceline, and return a tuple containing (its category, the traceline with anything printed
+    before it trimmed away, and a tuple of the attributes of its category).  For a linelog, the latter is
+    (file_no_extension, file_with_extension, line_number, line_content); for a functioncall, it's (modulename, funcname);
+    for anything else, it's empty.  See ParsedTraceline for what each of these means.
+    Tracelines exactly as the trace module prints them are matched with a single precompiled regex.  Anything else,
+    such as a traceline after content printed without a newline, is parsed by parse_traceline_piece_by_piece().
+    """
+    match = FUNCTIONCALL_PATTERN.fullmatch(traceline)
+    if match:
+        return "functioncall", traceline, match.groups()
+    match = LINELOG_PATTERN.fullmatch(traceline)
+    if match and ".py(" not in match.group(3) and " --- modulename: " not in traceline:   # Otherwise, parse_traceline_piece_by_piece() may categorize or cut it differently
+        file_no_extension, line_number, traceline_after_colon = match.groups()
+        line_content = traceline_after_colon[1:] if len(traceline_after_colon) > 1 else ""
+        return "linelog", traceline, (file_no_extension, file_no_extension + ".py", int(line_number), line_content)
+    return parse_traceline_piece_by_piece(traceline)
+
+
+parse_traceline_cached = lru_cache(maxsize=PARSED_TRACELINES_MAX_SIZE)(parse_traceline)    # parse_traceline(), remembering what it returned for the most recently parsed tracelines.  What it returns is immutable, so it can be shared
+
+
+def parse_traceline_piece_by_piece(traceline: str) -> tuple:
+    """Parse the text of a traceline as parse_traceline() does, by searching it for each landmark in turn.  This handles
+    tracelines that parse_traceline()'s regexes don't match.
+    """
+    category = None
+    details = ()
+    if ":" in traceline:
+        if " --- modulename: " in traceline and ", funcname: " in traceline and traceline.index(" --- modulename: ") < index_of_last_substring_in_string(traceline, ", funcname: "):
+            category = "functioncall"
+            # For this category, we also trim everything before " --- modulename: "
+            traceline = traceline[traceline.index(" --- modulename: "):]
+            details = (get_modulename_from_functioncall(traceline), get_funcname_from_functioncall(traceline))
+        elif ".py(" in traceline:
+            category = "linelog"
+            # For this category, we also trim everything before the last space before the last ".py("
+            index_last_dotpyparen = index_of_last_substring_in_string(traceline, ".py(")
+            index_space_for_cut = None
+            for ii in range(index_last_dotpyparen-1, -1, -1):   # Walk backward until we find a space
+                if traceline[ii] == " ":
+                    index_space_for_cut = ii
+                    break
+            if index_space_for_cut == None:
+                index_space_for_cut = -1
+            traceline = traceline[index_space_for_cut+1:]
+            # Set important variants and indices
+            traceline_until_colon = traceline[:traceline.index(":")]
+            traceline_after_colon = traceline[traceline.index(":") + 1:]
+            # Get file_with_extension, file_no_extension, line_number, and line_content
+            index_period_closest_before_first_colon = len(traceline_until_colon) - traceline_until_colon[::-1].index(".") - 1
+            index_open_paren_closest_before_first_colon = len(traceline_until_colon) - traceline_until_colon[::-1].index("(") - 1
+            index_closed_paren_closest_before_first_colon = len(traceline_until_colon) - traceline_until_colon[::-1].index(")") - 1
+            file_no_extension = traceline_until_colon[:index_period_closest_before_first_colon]
+            file_with_extension = traceline_until_colon[:index_open_paren_closest_before_first_colon]
+            line_number = int(traceline_until_colon[index_open_paren_closest_before_first_colon + 1: index_closed_paren_closest_before_first_colon])
+            if len(traceline_after_colon) > 1:
+                line_content = traceline_after_colon[1:]
+            else:
+                line_content = ""
+            details = (file_no_extension, file_with_extension, line_number, line_content)
+    elif traceline == "":
+        category = "blank"
+
+    # Return!
+    return category, traceline, details
+
+
+def add_exit_lines_to_trace(input_trace, exit_remaining_functions=False):
     """Return the following:
     1. A version of input_trace with a line added to indicate each exit of a function
     2. A list of indices of linelog lines that are descended from non-ignored user code.
     3. A list of all user-written and py-holmes modules seen.  Holmesignored user modules are not excluded from this list.
     This function also alters importbootstrap lines and generally makes the trace cleaner and more legible.
+    input_trace may be either the text of a trace, or a list of ParsedTraceline objects that have already been built
+    (such as by an EventTrace).
+    If exit_remaining_functions == True, an exit line is added at the end of the trace for every function that hasn't
+    been exited yet.  Use this for traces that stop as soon as the test method returns (ie with --trace_gated), since
+    no later lines exist to show those exits.
+    If input_trace contains lines of category functionexit (ie exits recorded by the tracer, as with
+    --trace_granularity function), those exits are used, and no others are inferred.
     """
-    global function_stack
+    # Handle errors
+    # input_trace not a string or list
+    if not isinstance(input_trace, (str, list)):
+        raise TypeError("input_trace must be a string or a list of ParsedTraceline objects")
+
+    # Add the exit lines
+    if isinstance(input_trace, str):
+        input_trace = input_trace.split("\n")
+    output_trace, output_non_ignored_user_descendant_indices, user_and_py_holmes_modules_seen = add_exit_lines_to_lines(input_trace, exit_remaining_functions=exit_remaining_functions)
+
+    # Convert output to string and return
+    output_trace_string = "".join(entry + "\n" for entry in output_trace)
+    return output_trace_string, output_non_ignored_user_descendant_indices, user_and_py_holmes_modules_seen
 
-    # Convert input to list
-    input_trace = input_trace.split("\n")
+
+def crop_and_add_exit_lines_to_trace(input_trace, function_to_crop_to: str, function_filename_no_extension: str, exit_remaining_functions=False):
+    """Do in a single pass what remove_before_function_runtime(), add_exit_lines_to_trace(), and
+    remove_after_function_runtime() do one after the other, without building the text of the trace in between.  Lines
+    before the first entry into function_to_crop_to are skipped without being parsed, and lines after that entry's exit
+    are never reached.
+    Return the following:
+    1. The lines of the cropped trace with exit lines added, ending with an empty line, so that "\n".join() of them gives
+    the same text as the three functions above would
+    2. A list of indices of linelog lines that are descended from non-ignored user code
+    3. A list of all user-written and py-holmes modules seen, as in add_exit_lines_to_trace()
+    :param input_trace:                         the text of the execution trace, or a list of ParsedTraceline objects (such as from an EventTrace)
+    :param function_to_crop_to:                 the name of the function whose runtime to crop the trace to
+    :param function_filename_no_extension:      the filename of the aforementioned function.  This should not be a path; it should not include mention of the folders containing this file.
+    :param exit_remaining_functions:            as in add_exit_lines_to_trace()
+    """
+    # Handle errors
+    # input_trace not a string or list
+    if not isinstance(input_trace, (str, list)):
+        raise TypeError("input_trace must be a string or a list of ParsedTraceline objects")
+    # input_trace empty
+    if len(input_trace) == 0:
+        raise ValueError("input_trace must not be empty")
+    # function_to_crop_to not a string
+    if not isinstance(function_to_crop_to, str):
+        raise TypeError("function_to_crop_to must be a string")
+    # function_to_crop_to empty
+    if len(function_to_crop_to) == 0:
+        raise ValueError("function_to_crop_to must not be empty")
+    # function_filename_no_extension not a string
+    if not isinstance(function_filename_no_extension, str):
+        raise TypeError("function_filename_no_extension must be a string")
+    # function_filename_no_extension empty
+    if len(function_filename_no_extension) == 0:
+        raise ValueError("function_filename_no_extension must not be empty")
+
+    # Split the text into lines, leaving them unparsed for now
+    if isinstance(input_trace, str):
+        input_trace = input_trace.split("\n")
+
+    # Get index of first entry into function_to_crop_to
+    index_first_entry = None
+    entry_prefix = f" --- modulename: {function_filename_no_extension}, "
+    for ll in range(len(input_trace)):
+        this_line = input_trace[ll] if isinstance(input_trace[ll], str) else input_trace[ll].traceline
+        if this_line.startswith(entry_prefix):
+            if get_funcname_from_functioncall(this_line) == function_to_crop_to:
+                index_first_entry = ll
+                break
+    if index_first_entry is None:
+        raise RuntimeError(f"no entry into '{function_to_crop_to}' in '{function_filename_no_extension}' found")
+
+    # Add exit lines from the entry onward, stopping once the function is exited.  The function is the first one on the
+    # stack, so it's the last one left on it
+    output_trace, output_non_ignored_user_descendant_indices, user_and_py_holmes_modules_seen = add_exit_lines_to_lines(input_trace[index_first_entry:], exit_remaining_functions=exit_remaining_functions, stop_once_first_function_exits=True)
+    if len(function_stack) > 0:
+        raise RuntimeError(f"no exit from '{function_to_crop_to}' in '{function_filename_no_extension}' found")
+
+    # Return all
+    output_trace.append("")     # For the newline that ends the text of the trace
+    return output_trace, output_non_ignored_user_descendant_indices, user_and_py_holmes_modules_seen
+
+
+def add_exit_lines_to_lines(input_lines: list, exit_remaining_functions=False, stop_once_first_function_exits=False) -> tuple:
+    """Do the work of add_exit_lines_to_trace() on a list of lines, each of which may be text or a ParsedTraceline
+    object, and return the output trace as a list of lines rather than as text.  Lines of text are parsed as they're
+    reached, so none are parsed past the point where the loop stops.
+    If stop_once_first_function_exits == True, no more lines are looked at once the function called on the first line
+    is exited, leaving function_stack empty.
+    """
+    global function_stack
 
     # Create outputs (blank for now)
     output_trace = []
     output_non_ignored_user_descendant_indices = []
 
-    # Parse every line of the input trace
-    parsed_lines = [ParsedTraceline(line) for line in input_trace]
+    # Exits are only ever recorded in lists that were already parsed, such as by an EventTrace
+    exits_recorded = any(not isinstance(line, str) and line.category == "functionexit" for line in input_lines)
 
     # Looping through all lines:
     function_stack = []     # Contains sublists of length 3, where the first subentry is a modulename, the second is a funcname, and the third is True if non-ignored user code, else False
     ll_including_added_lines = -1    # Gets incremented an extra time each time we add an exit line.  Helps generate output_non_ignored_user_descendant_indices
-    for ll in range(len(input_trace)):
+    next_line_parsed = None
+    for ll in range(len(input_lines)):
         ll_including_added_lines += 1
-        line_parsed = parsed_lines[ll]
+        # Parse this line, unless it was already parsed, either beforehand or as the next line of the last iteration
+        if next_line_parsed is not None:
+            line_parsed = next_line_parsed
+            next_line_parsed = None
+        elif isinstance(input_lines[ll], str):
+            line_parsed = ParsedTraceline(input_lines[ll])
+        else:
+            line_parsed = input_lines[ll]
         # Add the cleaned-up version of the line to the output.  In a moment, we might add an exit line after it
-        output_trace.append(line_parsed.traceline)
+        if line_parsed.category == "functionexit":
+            output_trace.append(exit_line(line_parsed.funcname, line_parsed.modulename + ".py"))
+        else:
+            output_trace.append(line_parsed.traceline)
 
         # Append to the function stack if appropriate
         if line_parsed.category == "functioncall":
-            line_parsed_is_non_ignored_user_file = (line_parsed.modulename + ".py" in FILES_ALREADY_READ and FILES_ALREADY_READ[line_parsed.modulename + ".py"][2])
+            line_parsed_is_non_ignored_user_file = is_found_non_ignored_user_file(line_parsed.modulename + ".py")
             function_stack.append([line_parsed.modulename, line_parsed.funcname, line_parsed_is_non_ignored_user_file])
 
         # If this line is a linelog and is a descendant of non-ignored user code, add its index to output_ignored_user_descendant_indices
@@ -226,9 +383,9 @@ def add_exit_lines_to_trace(input_trace: str):
                     output_non_ignored_user_descendant_indices.append(ll_including_added_lines)
                     break
 
-        # If there is a line after this one:
-        if ll+1 != len(input_trace):
-            next_line_parsed = parsed_lines[ll+1]
+        # If there is a line after this one, and exits need inferring:
+        if ll+1 != len(input_lines) and not exits_recorded:
+            next_line_parsed = ParsedTraceline(input_lines[ll+1]) if isinstance(input_lines[ll+1], str) else input_lines[ll+1]
             # If both this and the next line are of linelog category and have a different innermost function/class/module container, UNLESS (one is a function or class definition (starting with "def " or "class ") and is immediately contained by the other, OR they are both definition lines), add as many lines as it takes to get back to this module
             # (Handles functions ending in a normal way, including by returns that don't call anything)
             one_is_definition_immediately_contained_by_the_other = None
@@ -254,21 +411,22 @@ def add_exit_lines_to_trace(input_trace: str):
                 while len(function_stack) > 0 and next_line_parsed.innermost_container != function_stack[-1][1]:
                     output_trace.append(exit_line(function_stack[-1][1], function_stack[-1][0] + ".py"))  # Even if line_parsed isn't a .py file, this doesn't make a difference; exit_line() will just remove the .py extension
                     ll_including_added_lines += 1  # Because we've just added an extra line beyond the default
-        # Else, this is the last line of the trace.
-        else:
-            pass
+        # Elif this is the last line of the trace, exit every function still on the stack, if requested
+        elif ll+1 == len(input_lines):
+            if exit_remaining_functions:
+                while len(function_stack) > 0:
+                    output_trace.append(exit_line(function_stack[-1][1], function_stack[-1][0] + ".py"))
+                    ll_including_added_lines += 1  # Because we've just added an extra line beyond the default
+
+        # Stop if the first function has been exited, if requested
+        if stop_once_first_function_exits and len(function_stack) == 0:
+            break
 
     # Grab the list of user_modules_seen (holmesignored files are not excluded from this list)
-    user_and_py_holmes_modules_seen = []
-    for key in FILES_ALREADY_READ:
-        if FILES_ALREADY_READ[key][3]:  # If the file is a user file:
-            user_and_py_holmes_modules_seen.append(strip_file_extension(key))
+    user_and_py_holmes_modules_seen = [strip_file_extension(filename) for filename in get_found_user_filenames()]
 
-    # Convert output to string and return
-    output_trace_string = ""
-    for entry in output_trace:
-        output_trace_string += entry + "\n"
-    return output_trace_string, output_non_ignored_user_descendant_indices, user_and_py_holmes_modules_seen
+    # Return all
+    return output_trace, output_non_ignored_user_descendant_indices, user_and_py_holmes_modules_seen
 
 
 def exit_line(func_name: str, module_with_extension: str):
@@ -340,9 +498,7 @@ def remove_before_user_runtime(tracer_result_: str) -> str:
     tracer_result_ = tracer_result_[index_first_entry:]
 
     # Turn tracer_result into a string again
-    new_tracer_result = ""
-    for entry in tracer_result_:
-        new_tracer_result += entry + "\n"
+    new_tracer_result = "".join(entry + "\n" for entry in tracer_result_)
 
     # Return
     return new_tracer_result
@@ -393,9 +549,7 @@ def remove_after_user_runtime(tracer_result_: str, non_ignored_user_code_indices
     new_non_ignored_user_code_indices = [element for element in non_ignored_user_code_indices_ if element < len(tracer_result_)]
 
     # Turn tracer_result into a string again
-    new_tracer_result = ""
-    for entry in tracer_result_:
-        new_tracer_result += entry + "\n"
+    new_tracer_result = "".join(entry + "\n" for entry in tracer_result_)
 
     # Return all
     return new_tracer_result, new_non_ignored_user_code_indices
@@ -446,9 +600,7 @@ def remove_before_function_runtime(tracer_result_: str, function_to_crop_to: str
     tracer_result_ = tracer_result_[index_first_entry:]
 
     # Turn tracer_result into a string again
-    new_tracer_result = ""
-    for entry in tracer_result_:
-        new_tracer_result += entry + "\n"
+    new_tracer_result = "".join(entry + "\n" for entry in tracer_result_)
 
     # Return
     return new_tracer_result
@@ -499,9 +651,7 @@ def remove_after_function_runtime(tracer_result_: str, function_to_crop_to: str,
     tracer_result_ = tracer_result_[:index_last_exit+1]
 
     # Turn tracer_result into a string again
-    new_tracer_result = ""
-    for entry in tracer_result_:
-        new_tracer_result += entry + "\n"
+    new_tracer_result = "".join(entry + "\n" for entry in tracer_result_)
 
     # Return all
     return new_tracer_result
@@ -0,0 +1,94 @@
+"""Classes and functions for comparing post-processed execution traces whose line events were sampled, so that the
+distance between two traces reflects how many lines each one ran rather than how many of them happened to be recorded.
+"""
+
+
+from collections import Counter
+from difflib import SequenceMatcher
+
+
+#
+# CLASSES
+#
+class SampledTrace(str):
+    """A post-processed execution trace in which only some of the line events were recorded.  All function calls and
+    exits are still present, so the trace behaves like any other string trace wherever its calls are what matter.
+    Attributes are as follows:
+    self.line_weight: float.    The number of line events that each line of the trace stands for, on average.
+    """
+
+    def __new__(cls, trace: str, line_weight=1.0):
+        """
+        :param trace:       execution trace post-processed by trace_exit_line_adders.add_exit_lines_to_trace()
+        :param line_weight: number of line events that each line of trace stands for, as returned by event_tracers.EventTrace.line_weight()
+        """
+        # Handle errors
+        # trace not a string
+        if not isinstance(trace, str):
+            raise TypeError("trace must be a string")
+        # line_weight not a number
+        if not isinstance(line_weight, (int, float)):
+            raise TypeError("line_weight must be a number")
+        # line_weight less than 1
+        if line_weight < 1:
+            raise ValueError("line_weight must be at least 1")
+
+        self = super().__new__(cls, trace)
+        self.line_weight = float(line_weight)
+        return self
+
+
+#
+# HELPER FUNCTIONS
+#
+def line_weight_of(trace) -> float:
+    """Return the number of line events that each line of trace stands for, which is 1 unless trace is a SampledTrace."""
+    if isinstance(trace, SampledTrace):
+        return trace.line_weight
+    return 1.0
+
+
+def sampled_trace_distance(trace_new: str, trace_old: str) -> int:
+    """Return the distance between two post-processed execution traces, either of which may be a SampledTrace, using
+    the same weights as variant_test_runners.distance_between_execution_traces().  Since sampled traces record every
+    function call, calls are diffed in order, and each one added or removed adds 10 distance.  Since they only record
+    some lines, the order of lines can't be relied on, so lines are compared by how many times each one is estimated to
+    have run: each line's count is scaled by its trace's line weight, and the differences are summed.  Exit lines add no
+    distance.
+    """
+    calls_new, line_counts_new = calls_and_line_counts_of(trace_new)
+    calls_old, line_counts_old = calls_and_line_counts_of(trace_old)
+
+    # Function calls
+    distance = 0
+    matcher = SequenceMatcher(None, calls_old, calls_new, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag != "equal":
+            distance += 10 * ((old_end - old_start) + (new_end - new_start))
+
+    # Other lines
+    weight_new = line_weight_of(trace_new)
+    weight_old = line_weight_of(trace_old)
+    for line in line_counts_new.keys() | line_counts_old.keys():
+        distance += abs(line_counts_new[line]*weight_new - line_counts_old[line]*weight_old)
+
+    # Return!
+    return round(distance)
+
+
+def calls_and_line_counts_of(trace: str) -> tuple:
+    """Return the function call lines of trace in order, along with a Counter of its other lines, leaving out exit
+    lines.
+    """
+    calls = []
+    line_counts = Counter()
+    for line in trace.split("\n"):
+        line = " " + line   # distance_between_execution_traces() checks lines after ndiff has prefixed them
+        if " ||| exiting modulename: " in line:
+            continue
+        if " --- modulename: " in line:
+            calls.append(line)
+        else:
+            line_counts[line] += 1
+    return calls, line_counts
+
@@ -0,0 +1,137 @@
+"""Classes and functions for holding post-processed execution traces as arrays of integer tokens, one per line, that
+index into a string table shared by every trace.  Test variants tend to run mostly the same lines, so each distinct line
+is stored once no matter how many traces it appears in, and traces can be compared by token rather than by text.
+"""
+
+
+from array import array
+from difflib import SequenceMatcher
+
+
+#
+# GLOBAL VARIABLES
+#
+TRACE_LINES = []                # The string table: the text of each distinct trace line, indexed by its token
+TOKENS_OF_TRACE_LINES = {}      # Maps the text of each trace line in TRACE_LINES to its token
+DISTANCE_WEIGHTS_OF_TOKENS = []     # The distance that adding or removing each token's line contributes, indexed by token
+
+
+#
+# CLASSES
+#
+class TokenTrace:
+    """A post-processed execution trace held as an array of tokens, one per line, each of which indexes the line's text
+    in TRACE_LINES.  The text of the trace is only built when it's asked for.
+    Attributes are as follows:
+    self.tokens: array.             The token of each line of the trace, in order, as an array of typecode "I".
+    self.distinct_tokens: frozenset.    The tokens that appear in self.tokens, or None until they're first needed.
+    """
+
+    def __init__(self, tokens: array) -> None:
+        """
+        :param tokens:  array of typecode "I" as described in the class docstring
+        """
+        # Handle errors
+        # tokens not an array of unsigned ints
+        if not isinstance(tokens, array) or tokens.typecode != "I":
+            raise TypeError("tokens must be an array of typecode 'I'")
+
+        self.tokens = tokens
+        self.distinct_tokens = None
+
+    def __str__(self) -> str:
+        return "\n".join(self.lines())
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, TokenTrace) and self.tokens == other.tokens
+
+    def __contains__(self, s: str) -> bool:
+        """Return whether s appears in the text of the trace, so that the checks done on string traces also work on
+        tokenized ones.  Substrings without newlines are looked for in each distinct line, and a lone newline is found
+        from the number of lines, so that the text of the trace is only built for other substrings with newlines.
+        """
+        if s == "\n":
+            return len(self.tokens) > 1     # Lines never contain newlines themselves
+        if "\n" in s:
+            return s in str(self)
+        if self.distinct_tokens is None:
+            self.distinct_tokens = frozenset(self.tokens)
+        return any(s in TRACE_LINES[token] for token in self.distinct_tokens)
+
+    def lines(self) -> list:
+        """Return the lines of the trace as a list of strings."""
+        return [TRACE_LINES[token] for token in self.tokens]
+
+    def number_of_lines(self) -> int:
+        """Return the number of lines in the trace."""
+        return len(self.tokens)
+
+
+#
+# HELPER FUNCTIONS
+#
+def tokenize_trace(trace) -> TokenTrace:
+    """Return a TokenTrace of trace, adding any lines not seen before to the shared string table.
+    :param trace:   execution trace post-processed by trace_exit_line_adders.add_exit_lines_to_trace() as a string, a list of its lines as returned by trace_exit_line_adders.crop_and_add_exit_lines_to_trace(), or a TokenTrace, which is returned as is
+    :return:        a TokenTrace of trace
+    """
+    # Handle errors
+    # trace is already tokenized
+    if isinstance(trace, TokenTrace):
+        return trace
+    # trace not a string or list
+    if not isinstance(trace, (str, list)):
+        raise TypeError("trace must be a string, a list of lines, or a TokenTrace")
+
+    if isinstance(trace, str):
+        trace = trace.split("\n")
+    return TokenTrace(array("I", [token_of_line(line) for line in trace]))
+
+
+def token_of_line(line: str) -> int:
+    """Return the token of line, adding line to the shared string table if it isn't there yet."""
+    token = TOKENS_OF_TRACE_LINES.get(line)
+    if token is None:
+        token = len(TRACE_LINES)
+        TRACE_LINES.append(line)
+        TOKENS_OF_TRACE_LINES[line] = token
+        DISTANCE_WEIGHTS_OF_TOKENS.append(distance_weight_of_line(line))
+    return token
+
+
+def distance_weight_of_line(line: str) -> int:
+    """Return the distance that adding or removing line contributes to token_trace_distance().  As in
+    variant_test_runners.distance_between_execution_traces(), function calls weigh 10, exit lines weigh nothing, and
+    every other line weighs 1.
+    """
+    line = " " + line   # distance_between_execution_traces() checks lines after ndiff has prefixed them
+    if " ||| exiting modulename: " in line:
+        return 0
+    if " --- modulename: " in line:
+        return 10
+    return 1
+
+
+def lines_of_trace(trace) -> list:
+    """Return the lines of trace, a string or TokenTrace, as a list of strings."""
+    if isinstance(trace, TokenTrace):
+        return trace.lines()
+    return trace.split("\n")
+
+
+def token_trace_distance(trace_new: TokenTrace, trace_old: TokenTrace) -> int:
+    """Return the distance between two TokenTrace objects, using the same weights as
+    variant_test_runners.distance_between_execution_traces(), by diffing their tokens rather than their text.  Every line
+    outside the matching stretches adds distance.  Unlike ndiff, which treats lines that are very common in long traces
+    as junk and can then pair them up inside changed stretches, every line is matched on equal terms, as in
+    trace_compressors.compressed_trace_distance().
+    """
+    distance = 0
+    matcher = SequenceMatcher(None, trace_old.tokens, trace_new.tokens, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag != "equal":
+            distance += sum(DISTANCE_WEIGHTS_OF_TOKENS[token] for token in trace_old.tokens[old_start:old_end])
+            distance += sum(DISTANCE_WEIGHTS_OF_TOKENS[token] for token in trace_new.tokens[new_start:new_end])
+
+    # Return!
+    return distance
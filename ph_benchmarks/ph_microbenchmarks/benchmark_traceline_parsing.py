@@ -0,0 +1,51 @@
+"""Time how long it takes to parse the lines of the fibonacci traces in ph_assets_for_test_py_holmes_0, piece by piece,
+with the precompiled regexes, and with the results memoized as ParsedTraceline does.
+Run from anywhere with: python ph_benchmarks/ph_microbenchmarks/benchmark_traceline_parsing.py
+"""
+
+
+import os
+import sys
+from glob import glob
+from timeit import repeat
+from functools import lru_cache
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT_DIR)   # So that we can import other files even when this file is called from the command line
+
+from ph_basic_processing.trace_exit_line_adders import parse_traceline, parse_traceline_piece_by_piece, PARSED_TRACELINES_MAX_SIZE
+
+
+REPEATS = 5
+NUMBER = 200    # Times each parser goes through all the lines, per repeat
+
+
+def parse_all_piece_by_piece(lines: list) -> None:
+    for line in lines:
+        parse_traceline_piece_by_piece(line)
+
+
+def parse_all_with_regexes(lines: list) -> None:
+    for line in lines:
+        parse_traceline(line)
+
+
+def parse_all_memoized(lines: list) -> None:
+    parse = lru_cache(maxsize=PARSED_TRACELINES_MAX_SIZE)(parse_traceline)
+    for line in lines:
+        parse(line)
+
+
+# Get the lines of every fibonacci trace
+lines = []
+for filepath in sorted(glob(os.path.join(ROOT_DIR, "ph_assets_for_test_py_holmes_0", "fibonacci_trace*.txt"))):
+    with open(filepath, "r") as file:
+        lines.extend(file.read().split("\n"))
+print(f"{len(lines)} lines ({len(set(lines))} distinct), parsed {NUMBER} times per repeat, best of {REPEATS} repeats")
+
+# Time each parser, and show how it compares to parsing piece by piece
+baseline = None
+for name, parse_all in [("piece by piece", parse_all_piece_by_piece), ("regexes", parse_all_with_regexes), ("regexes, memoized", parse_all_memoized)]:
+    seconds = min(repeat(lambda: parse_all(lines), repeat=REPEATS, number=NUMBER))
+    if baseline is None:
+        baseline = seconds
+    print(f"{name:<20}{seconds*1e6/(NUMBER*len(lines)):8.3f} us per line{baseline/seconds:8.1f}x")
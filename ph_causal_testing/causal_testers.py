@@ -61,7 +61,7 @@ def run_causal_testing(original_test_result: OriginalUnitTestResult, use_dev_onl
         # For dl, we don't look for scope-similar tests.
         pass
     else:
-        # Find the set of existing tests in the user's project that test the same file/class
+        # Find the existing tests in the user's project that test the same file/class, in order of filepath and line
         found_similar_tests = find_tests_of_same_files_methods_and_classes(original_test, use_dev_only_test_mode)
 
     # Cut found similar tests that aren't call-similar
@@ -69,7 +69,6 @@ def run_causal_testing(original_test_result: OriginalUnitTestResult, use_dev_onl
         # For dl, we don't look for call-similar tests.
         pass
     else:
-        found_similar_tests = list(found_similar_tests)
         found_similar_tests = cut_found_tests(found_similar_tests, original_test, use_dev_only_test_mode)
 
     # Fuzzing
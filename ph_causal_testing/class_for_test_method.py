@@ -2,11 +2,14 @@
 
 
 from ph_variable_sharing import shared_variables
-from ph_basic_processing.parsers import get_method_name_from_definition_line, find_class_containing_method, leading_spaces_of, is_just_whitespace, get_module_level_only_from_file_content, remove_trailing_comment, get_class_name_from_definition_line, token_appears_in_method, strip_file_extension, strip_trailing_newline
+from ph_basic_processing.parsers import get_method_name_from_definition_line, get_class_name_from_definition_line, token_appears_in_method
 from ph_basic_processing.stripping import strip_custom
+from ph_original_test_result_generation.ph_dir_and_file_finders.module_resolvers import leads_matching_dotted_name
+from ph_basic_processing.module_exports import get_exported_names
+from ph_causal_testing.file_analyzers_for_tests import TestFileAnalysis, get_import_lines
 
 from _warnings import warn
-from os import path, listdir
+from os import path
 from sys import platform
 
 
@@ -31,6 +34,9 @@ class TestMethod:
     all_imports: set.                           set of strings: filenames, method names, and class names that this function references.  Entries are aboslute.  Within each entry, a dot is used as a separator.
     files_methods_and_classes_testing: set.     all_imports except only containing content from user-written files.
     requisite_import_lines: set.                all_imports except every entry has been rephrased from "foo.bar.baz" to "from foo.bar import baz"
+    star_imported_filepaths: list.              absolute filepaths of the files whose names are brought in by asterisk imports ("from foo import *") that the test could use
+    call_sequence: list.                        names of the functions the test calls, in order, as found by unit_test_cutters.get_call_sequence().  None until it's first needed, unless the test was found by way of indexes_of_found_tests.py
+    call_sequence_signature: str.               stable hash of call_sequence, as found by unit_test_cutters.get_call_sequence_signature(), so that tests with the same call sequence can be grouped by it.  None until it's first needed, unless the test was found by way of indexes_of_found_tests.py
     starting_test_lineno: int.                  first line of the test (the definition line), starting counting at 1
     starting_test_lineno_as_index: int.         like starting_test_lineno, but starting counting at 0
     ending_test_lineno: int.                    last line of the test (exclusive; really the line after the last line), starting counting at 1
@@ -45,8 +51,11 @@ class TestMethod:
     is_dummy: bool.                             should only be enabled for debugging/testing py-holmes itself.  Renders the object mostly inert by bypassing most of self.__init__()
     """
 
-    def __init__(self, origin: str, test_filepath: str, starting_test_lineno: int, is_fuzzed: bool, is_original=False, is_dummy=False) -> None:
-        """For parameters, see docstring for class TestMethod."""
+    def __init__(self, origin: str, test_filepath: str, starting_test_lineno: int, is_fuzzed: bool, is_original=False, is_dummy=False, analysis=None) -> None:
+        """For parameters, see docstring for class TestMethod.  analysis is a file_analyzers_for_tests.TestFileAnalysis of
+        test_filepath, which should be shared between every TestMethod built from the same file; if it's None, the file is
+        analysed anew.
+        """
         # Handle errors
         if not isinstance(is_dummy, bool):
             raise TypeError("is_dummy must be a bool")
@@ -79,6 +88,9 @@ class TestMethod:
             # is_original not a bool
             if not isinstance(is_original, bool):
                 raise TypeError("is_original must be a bool")
+            # analysis not a TestFileAnalysis of test_filepath
+            if analysis is not None and (not isinstance(analysis, TestFileAnalysis) or analysis.filepath != test_filepath):
+                raise ValueError("analysis must be None or a TestFileAnalysis of test_filepath")
 
             # Run
             self.test_filepath = test_filepath
@@ -87,11 +99,10 @@ class TestMethod:
             self.is_fuzzed = is_fuzzed
             self.is_original = is_original
 
-            # Get the content of the entire file
-            with open(test_filepath, "r", encoding="utf-8") as file:
-                file_content = file.readlines()
-            for ii in range(len(file_content)):
-                file_content[ii] = strip_trailing_newline(file_content[ii])
+            # Get the content of the entire file, read and parsed once for every test method in it
+            if analysis is None:
+                analysis = TestFileAnalysis(test_filepath)
+            file_content = analysis.file_content
 
             # Set self.origin
             self.origin = origin
@@ -101,62 +112,43 @@ class TestMethod:
             self.test_name = get_method_name_from_definition_line(def_line)
 
             # Set self.test_class, self.starting_class_lineno, and self.starting_class_lineno_as_index
-            self.test_class, self.starting_class_lineno = find_class_containing_method(self.starting_test_lineno, file_content)
+            self.test_class, self.starting_class_lineno = analysis.class_containing(self.starting_test_lineno)
             self.starting_class_lineno_as_index = self.starting_class_lineno - 1
 
             # Set self.ending_test_lineno and self.ending_test_lineno_as_index
-            # Get the number of indentations on the definition line
-            num_method_definition_indents = leading_spaces_of(def_line)
-            # Search downward from starting_test_lineno_as_index until a nonempty line is found that's <= indented than the definition
-            # line.  When this occurs, set self.ending_test_lineno accordingly
-            for ll in range(self.starting_test_lineno_as_index + 1, len(file_content) + 1):
-                if ll == len(file_content):     # If we've already checked the last line in the file:
-                    break
-                this_line = file_content[ll]
-                if leading_spaces_of(this_line) <= num_method_definition_indents and not is_just_whitespace(this_line):
-                    break
-            self.ending_test_lineno_as_index = ll
-            self.ending_test_lineno = ll + 1
+            # The test ends at the first nonempty line after the definition line that's <= indented than the definition line
+            num_method_definition_indents = analysis.leading_spaces[self.starting_test_lineno_as_index]
+            self.ending_test_lineno_as_index = analysis.end_of_block(self.starting_test_lineno_as_index + 1, num_method_definition_indents)
+            self.ending_test_lineno = self.ending_test_lineno_as_index + 1
 
             # Set self.test_content
             self.test_content = file_content[self.starting_test_lineno_as_index:self.ending_test_lineno_as_index]
 
             # Set self.ending_class_lineno and self.ending_class_lineno_as_index
-            num_class_definition_indents = leading_spaces_of(file_content[self.starting_class_lineno_as_index])
-            for ll in range(self.ending_test_lineno_as_index, len(file_content) + 1):
-                if ll == len(file_content):     # If we've already checked the last line in the file:
-                    break
-                this_line = file_content[ll]
-                if leading_spaces_of(this_line) <= num_class_definition_indents and not is_just_whitespace(this_line):
-                    break
-            self.ending_class_lineno_as_index = ll
-            self.ending_class_lineno = ll + 1
+            # The class ends at the first nonempty line after the test that's <= indented than the class definition line
+            num_class_definition_indents = analysis.leading_spaces[self.starting_class_lineno_as_index]
+            self.ending_class_lineno_as_index = analysis.end_of_block(self.ending_test_lineno_as_index, num_class_definition_indents)
+            self.ending_class_lineno = self.ending_class_lineno_as_index + 1
 
             # Set self.class_content
             self.class_content = file_content[self.starting_class_lineno_as_index:self.ending_class_lineno_as_index]
 
             # Set self.files_methods_and_classes_testing and self.requisite_import_lines, unless this is a fuzzed test method
+            self.star_imported_filepaths = []
+            self.call_sequence = None
+            self.call_sequence_signature = None
             if self.origin != "fuzzed":
-                self.all_imports, self.files_methods_and_classes_testing = self.calculate_all_imports_and_files_methods_and_classes_testing(file_content)
+                self.all_imports, self.files_methods_and_classes_testing = self.calculate_all_imports_and_files_methods_and_classes_testing(analysis)
                 self.requisite_import_lines = self.calculate_requisite_import_lines()
 
-    def calculate_all_imports_and_files_methods_and_classes_testing(self, file_content_in) -> list:
+    def calculate_all_imports_and_files_methods_and_classes_testing(self, analysis: TestFileAnalysis) -> list:
         """Return the set that is to become self.all_imports, followed by the set that is to become self.files_methods_and_classes_testing.
-        :param file_content_in: list.   newline-separated list of strings comprising the content of the test.  Should include leading whitespace.
+        :param analysis:    file_analyzers_for_tests.TestFileAnalysis of the file containing the test
         """
         # Get all_import_lines, a list of all import lines that occur at the module level, at the level of the class
-        # containing the method, or at the level of the method in question.
-        all_import_lines = []
-        module_lines = get_module_level_only_from_file_content(file_content_in)
-        class_lines = self.class_content
-        method_lines = self.test_content
-        for these_lines in [module_lines, class_lines, method_lines]:
-            for this_line in these_lines:
-                this_line_no_whitespace = strip_custom(this_line, ["\t", " "], "head")
-                # TODO: Make the below robust to docstringed lines that begin with "from" or "import"
-                this_line_no_whitespace_no_trailing_comment = strip_custom(remove_trailing_comment(this_line_no_whitespace), ["\t", " "], "tail")
-                if this_line_no_whitespace_no_trailing_comment.startswith("import ") or (this_line_no_whitespace_no_trailing_comment.startswith("from ") and " import " in remove_trailing_comment(this_line_no_whitespace_no_trailing_comment)):
-                    all_import_lines.append(this_line_no_whitespace_no_trailing_comment)
+        # containing the method, or at the level of the method in question.  Those at the module and class levels are
+        # shared with every other test method in the same file and class, so they're only found once
+        all_import_lines = analysis.import_lines_in(None) + analysis.import_lines_in((self.starting_class_lineno_as_index, self.ending_class_lineno_as_index)) + get_import_lines(self.test_content)
 
         # Get all_imported_vars_classes_functions_verbatim, a list of all imported vars, classes, and functions that *could* be
         # used by the method, verbatim to the way that the method would use them.
@@ -196,20 +188,13 @@ class TestMethod:
                         leads_from_file_directory = []
                     # Combine these results
                     combined_results = leads_from_top_of_project + leads_from_file_directory
-                    # Search each file in combined_results for classes and functions, and add all of them to all_imported_vars_classes_functions_verbatim
+                    # Add the names that each file in combined_results exports (its outermost classes and functions, or its __all__) to all_imported_vars_classes_functions_verbatim, and store both the verbatim and absolute reference in verbatim_to_absolute_for_asterisk_imports
                     for result in combined_results:
                         if result[0] == "file":
-                            with open(result[1], "r", encoding="utf-8") as result_wrapper:
-                                result_content = result_wrapper.readlines()
-                            for line in result_content:
-                                # If begins with no whitespace (indicating outermost) and is a class or function definition, add it, and store both the verbatim and absolute reference in verbatim_to_absolute_for_asterisk_imports
-                                if len(line) > 0 and line[0] not in ["\t", " ", "\n"]:
-                                    if line.startswith("class "):   # TODO: Make robust to docstringed "class " with no leading whitespace
-                                        all_imported_vars_classes_functions_verbatim.append(get_class_name_from_definition_line(line))
-                                        verbatim_to_absolute_for_asterisk_imports[all_imported_vars_classes_functions_verbatim[-1]] = between_from_and_import + "." + all_imported_vars_classes_functions_verbatim[-1]
-                                    elif line.startswith("def "):   # TODO: Make robust to docstringed "def " with no leading whitespace
-                                        all_imported_vars_classes_functions_verbatim.append(get_method_name_from_definition_line(line))
-                                        verbatim_to_absolute_for_asterisk_imports[all_imported_vars_classes_functions_verbatim[-1]] = between_from_and_import + "." + all_imported_vars_classes_functions_verbatim[-1]
+                            self.star_imported_filepaths.append(result[1])
+                            for exported_name in get_exported_names(result[1]):
+                                all_imported_vars_classes_functions_verbatim.append(exported_name)
+                                verbatim_to_absolute_for_asterisk_imports[exported_name] = between_from_and_import + "." + exported_name
                 else:   # "from" import with no asterisk; append each thing imported after the first " import " on the line, shaving trailing commas, handling "as" aliases as appropriate
                     index_first_import = element.index(" import ")
                     after_imports = element[index_first_import+8:].split(" ")
@@ -234,7 +219,7 @@ class TestMethod:
         all_imported_vars_classes_functions_verbatim = list(set(all_imported_vars_classes_functions_verbatim))
 
         # Create imports_used, the subset of all_imported_vars_classes_functions_verbatim that actually appears in the test content
-        imports_used = [element for element in all_imported_vars_classes_functions_verbatim if token_appears_in_method(element, method_lines)]
+        imports_used = [element for element in all_imported_vars_classes_functions_verbatim if token_appears_in_method(element, self.test_content)]
 
         # Create imports_used_absolute, which matches imports_used except each import is named in absolute terms.  Within each entry, "." is used as a separator.
         imports_used_absolute = []
@@ -424,6 +409,22 @@ class TestMethod:
         # Return!
         return [imports_used_absolute_folder_normalized, user_written_imports_used_absolute_folder_normalized]
 
+    @classmethod
+    def from_descriptor(cls, descriptor: dict):
+        """Build a TestMethod from descriptor, a dict of its attributes as returned by TestMethod.descriptor(), such as
+        one kept in the test index (see indexes_of_found_tests.py), without reading or analysing its file.
+        """
+        test_method = cls.__new__(cls)
+        for attribute, value in descriptor.items():
+            setattr(test_method, attribute, value.copy() if isinstance(value, (list, set)) else value)
+        return test_method
+
+    def descriptor(self) -> dict:
+        """Return a dict of this TestMethod's attributes, containing only plain values, from which
+        TestMethod.from_descriptor() can build it again.
+        """
+        return {attribute: value.copy() if isinstance(value, (list, set)) else value for attribute, value in vars(self).items()}
+
     def calculate_requisite_import_lines(self) -> set:
         """Convert each absolute import from self.all_imports to actual import commands
         (eg 'import foo', 'from foo import bar', or 'from foo.bar import baz')
@@ -450,6 +451,8 @@ class TestMethod:
         :param directory        absolute filepath to a directory
         :param name             filename with no file extension.  MAY ALSO BE A SERIES OF CHUNKS CONNECTED BY DOTS, BUT SHOULD STILL HAVE NO FILE EXTENSIONS.
         :param files_only       set to true to only get files, not directories
+        Names are resolved by module_resolvers.leads_matching_dotted_name(), which every TestMethod shares, so that each
+        folder is only listed once.
         """
         # Handle errors
         # directory not a string
@@ -469,53 +472,4 @@ class TestMethod:
             warn("name should not have a file extension, but ends with '.py'")
 
         # Run!
-        matches = []
-        if "." not in name:
-            folder_contents = listdir(directory)
-            for contained in folder_contents:
-                # Check for contained being a matching file
-                if contained.endswith(".py"):
-                    contained_no_file_extension = strip_file_extension(contained)
-                    if contained_no_file_extension == name:
-                        matches.append(("file", path.join(directory, contained), path.join(directory, contained)))
-                # check for contained being a matching directory
-                elif contained == name:
-                    matches.append(("dir", path.join(directory, contained), path.join(directory, contained)))
-        elif "." in name and files_only:
-            chunks = name.split(".")
-            for cc in range(len(chunks)):
-                this_chunk = chunks[cc]
-                is_first_chunk = (cc == 0)
-                is_last_chunk = (cc == len(chunks) - 1)
-                if is_first_chunk:
-                    if is_last_chunk:
-                        # Add all files with the chunk name to matches
-                        for contained in listdir(directory):
-                            if contained.endswith(".py") and strip_file_extension(contained) == this_chunk:
-                                matches.append(("file", path.join(directory, contained), path.join(directory, contained)))
-                    else:   # Not the last chunk:
-                        # Add all directories with the chunk name to matches
-                        for contained in listdir(directory):
-                            if contained == this_chunk:
-                                matches.append(("dir", path.join(directory, contained), path.join(directory, contained)))
-                else:   # elif not is_first_chunk:
-                    old_matches = matches.copy()
-                    matches = []
-                    if is_last_chunk:
-                        # Search all directories in old_matches for one or more files with the chunk name
-                        for old_match in old_matches:
-                            if old_match[0] == "dir":
-                                for contained in listdir(old_match[1]):
-                                    if contained.endswith(".py") and strip_file_extension(contained) == this_chunk:
-                                        matches.append(("file", path.join(old_match[1], contained), path.join(old_match[1], contained)))
-                    else:   # Not the last chunk:
-                        # Search all directories in old_matches for one or more directories with the chunk name
-                        for old_match in old_matches:
-                            if old_match[0] == "dir":
-                                for contained in listdir(old_match[1]):
-                                    if contained == this_chunk:
-                                        matches.append(("dir", path.join(old_match[1], contained), path.join(old_match[1], contained)))
-        else:
-            raise NotImplementedError("not yet designed to handle names with '.'s when directories are desired in addition to files")
-
-        return matches
+        return leads_matching_dotted_name(directory, name, files_only=files_only)
@@ -0,0 +1,138 @@
+"""Classes and functions for analysing a test file once, so that every TestMethod built from it can share the results,
+rather than each reading and scanning the whole file anew.
+"""
+
+
+#
+# IMPORTS
+#
+from ph_basic_processing.parsers import leading_spaces_of, is_just_whitespace, get_class_name_from_definition_line, get_module_level_only_from_file_content, remove_trailing_comment, strip_trailing_newline
+from ph_basic_processing.stripping import strip_custom
+
+
+#
+# CLASSES
+#
+class TestFileAnalysis:
+    """The content of a test file, read once, along with what's found from it for its test methods.  Anything found
+    from the whole file is only worked out the first time it's needed.
+    Classes, and the spans of test methods and their classes, are found by the same line-by-line rules that
+    parsers.find_class_containing_method() and TestMethod have always used, so that tests are found exactly as before.
+    Attributes are as follows:
+    self.filepath: str.                 Absolute path to the file.
+    self.file_content: list.            Newline-separated list of strings comprising the content of the file, without newlines.
+    self.leading_spaces: list.          The number of leading spaces of each line, as parsers.leading_spaces_of() counts them.
+    self.classes_of_lines: list.        For each line index, the (name, definition line number) of the class that parsers.find_class_containing_method() finds containing the line, or None if there's none.  Built the first time it's needed.
+    self.ends_of_blocks: dict.          Keys are numbers of leading spaces.  Values are lists giving, for each line index, the index of the first line at or after it that isn't just whitespace and has no more than that many leading spaces (or the number of lines, if there's none).  Each is built the first time it's needed.
+    self.import_lines_of_spans: dict.   For caching results of self.import_lines_in().  Keys are (starting line index, ending line index) tuples, or None for the module level.  Values are lists of import lines.
+    """
+
+    def __init__(self, filepath: str) -> None:
+        """
+        :param filepath:    absolute path to the file to analyse
+        """
+        # Handle errors
+        # filepath not a string
+        if not isinstance(filepath, str):
+            raise TypeError("filepath must be a string")
+
+        # Read the file
+        self.filepath = filepath
+        with open(filepath, "r", encoding="utf-8") as file:
+            file_content = file.readlines()
+        self.file_content = [strip_trailing_newline(line) for line in file_content]
+
+        # Count leading spaces, with tabs counting for as many spaces as leading_spaces_of() says a tab does
+        spaces_per_tab = leading_spaces_of("\t")
+        self.leading_spaces = []
+        for line in self.file_content:
+            indentation = line[:len(line) - len(line.lstrip(" \t"))]
+            self.leading_spaces.append(len(indentation) + (spaces_per_tab - 1) * indentation.count("\t"))
+
+        self.classes_of_lines = None
+        self.ends_of_blocks = {}
+        self.import_lines_of_spans = {}
+
+    def test_method_line_numbers(self) -> list:
+        """Return the line numbers, starting counting at 1, of every line that starts with "def test" and ends with ":"
+        after removing whitespace and trailing comments.  These are the definition lines of the file's test methods.
+        """
+        line_numbers = []
+        for ll in range(len(self.file_content)):
+            this_line_no_whitespace_or_trailing_comments = remove_trailing_comment(self.file_content[ll])
+            this_line_no_whitespace_or_trailing_comments = strip_custom(this_line_no_whitespace_or_trailing_comments, ["\t", " "], "head")
+            this_line_no_whitespace_or_trailing_comments = strip_custom(this_line_no_whitespace_or_trailing_comments, ["\t", " "], "tail")
+            if this_line_no_whitespace_or_trailing_comments.startswith("def test") and this_line_no_whitespace_or_trailing_comments.endswith(":"):
+                line_numbers.append(ll + 1)
+        return line_numbers
+
+    def class_containing(self, line_number: int) -> tuple:
+        """Return the name of the class that contains the method on line_number, as well as its definition line number,
+        starting counting at 1, as parsers.find_class_containing_method() does.  Raise ValueError if there's none.
+        """
+        if self.classes_of_lines is None:
+            # For each line, find the last class definition line above it with fewer leading spaces.  Only the last
+            # class definition line with each number of leading spaces can ever be found, so only those are kept, in
+            # order of both their leading spaces and their position
+            self.classes_of_lines = []
+            class_lines = []    # (leading spaces, line index) of each class definition line that can still be found
+            for ii, line in enumerate(self.file_content):
+                class_of_line = None
+                for leading_spaces, class_index in reversed(class_lines):
+                    if leading_spaces < self.leading_spaces[ii]:
+                        class_of_line = (get_class_name_from_definition_line(self.file_content[class_index]), class_index + 1)
+                        break
+                self.classes_of_lines.append(class_of_line)
+                if strip_custom(line, ["\t", " "], "head").startswith("class "):
+                    while len(class_lines) > 0 and class_lines[-1][0] >= self.leading_spaces[ii]:
+                        class_lines.pop()
+                    class_lines.append((self.leading_spaces[ii], ii))
+
+        class_of_line = self.classes_of_lines[line_number - 1]
+        if class_of_line is None:
+            raise ValueError("No class found containing line " + str(line_number))
+        return class_of_line
+
+    def end_of_block(self, start_index: int, leading_spaces: int) -> int:
+        """Return the index of the first line at or after start_index that isn't just whitespace and has no more than
+        leading_spaces leading spaces, or the number of lines in the file if there's none.  This is where a test method
+        or class whose definition line has leading_spaces leading spaces ends.
+        """
+        if leading_spaces not in self.ends_of_blocks:
+            ends = [len(self.file_content)] * (len(self.file_content) + 1)
+            for ii in range(len(self.file_content) - 1, -1, -1):
+                if self.leading_spaces[ii] <= leading_spaces and not is_just_whitespace(self.file_content[ii]):
+                    ends[ii] = ii
+                else:
+                    ends[ii] = ends[ii + 1]
+            self.ends_of_blocks[leading_spaces] = ends
+        return self.ends_of_blocks[leading_spaces][start_index]
+
+    def import_lines_in(self, span=None) -> list:
+        """Return the import lines, without leading whitespace or trailing comments, among the lines in span, a
+        (starting line index, ending line index) tuple, or at the module level if span is None.
+        """
+        if span not in self.import_lines_of_spans:
+            if span is None:
+                lines = get_module_level_only_from_file_content(self.file_content)
+            else:
+                lines = self.file_content[span[0]:span[1]]
+            self.import_lines_of_spans[span] = get_import_lines(lines)
+        return self.import_lines_of_spans[span]
+
+
+#
+# HELPER FUNCTIONS
+#
+def get_import_lines(lines: list) -> list:
+    """Return the lines among lines that are import lines ("import foo" or "from foo import bar"), without leading
+    whitespace or trailing comments.
+    """
+    import_lines = []
+    for this_line in lines:
+        this_line_no_whitespace = strip_custom(this_line, ["\t", " "], "head")
+        # TODO: Make the below robust to docstringed lines that begin with "from" or "import"
+        this_line_no_whitespace_no_trailing_comment = strip_custom(remove_trailing_comment(this_line_no_whitespace), ["\t", " "], "tail")
+        if this_line_no_whitespace_no_trailing_comment.startswith("import ") or (this_line_no_whitespace_no_trailing_comment.startswith("from ") and " import " in remove_trailing_comment(this_line_no_whitespace_no_trailing_comment)):
+            import_lines.append(this_line_no_whitespace_no_trailing_comment)
+    return import_lines
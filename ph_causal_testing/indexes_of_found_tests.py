@@ -0,0 +1,242 @@
+"""Classes and functions for keeping an index of every test method found in the user's project, so that test discovery
+only analyses the test files that have changed since the last run of py-holmes.
+For each test file, the index keeps a descriptor of each of its test methods (see TestMethod.descriptor()): its location,
+the span of its body and class, its resolved imports, the files, methods, and classes it tests, and its call sequence
+along with its signature.
+Entries are keyed by the hash of their file's content.  A file's entry is also only reused while the names exported by
+the modules it star-imports are unchanged, and while no folder or .py file has been added to or removed from the project
+directory since the index was saved, since either of these can change what its imports resolve to.
+Test files that do have to be analysed are analysed in parallel by a pool of worker processes, one file at a time, and
+the worker processes send back descriptors of their test methods.
+"""
+
+
+#
+# IMPORTS
+#
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from ph_variable_sharing import shared_variables
+from ph_basic_processing.module_exports import get_exported_names
+from ph_basic_processing.persistent_caches import load_persistent_cache, save_persistent_cache
+from ph_causal_testing.class_for_test_method import TestMethod
+from ph_causal_testing.unit_test_cutters import get_call_sequence_signature
+from ph_original_test_result_generation.ph_dir_and_file_finders.filename_indexes import get_filename_index
+
+
+#
+# GLOBAL VARIABLES
+#
+TEST_INDEX_CACHE_NAME = "test_index"    # The name of the persistent cache that TEST_INDEX is kept in
+TEST_INDEX = {}     # Keys are absolute filepaths of test files.  Values are a tuple containing (the file's (modification time in nanoseconds, size in bytes) when it was analysed, the SHA-1 hash of its content, a dict whose keys are the absolute filepaths of the modules it star-imports and whose values are the names they exported, a list of descriptors of its test methods or None if the file couldn't be analysed, the message of the ValueError raised while analysing it or None)
+test_index_tree_signature = None    # The signature of the project directory (see get_tree_signature()) that TEST_INDEX describes, or None if TEST_INDEX hasn't been loaded from its persistent cache yet
+test_index_unsaved = False  # Whether TEST_INDEX has changed since it was last saved to its persistent cache
+MIN_FILES_TO_ANALYSE_IN_PARALLEL = 8    # Fewer test files than this are analysed in this process, since starting worker processes would take longer
+
+shared_variables.initialize()
+ROOT_DIR = shared_variables.ROOT_DIR
+
+
+#
+# HELPER FUNCTIONS
+#
+def get_indexed_test_methods_in_files(filepaths: list, max_workers=None) -> list:
+    """Return a list of all test methods within the files at filepaths, absolute paths, as TestMethod objects, in the
+    order of filepaths, as get_indexed_test_methods_in_file() finds them for each file.  Files whose test methods can't
+    be found are skipped.  The files that have to be analysed anew are analysed in parallel by analyse_test_files().
+    :param filepaths:       list of absolute filepaths of test files
+    :param max_workers:     the most worker processes to analyse files with.  If None, the number of CPUs is used
+    """
+    checks_of_files = {filepath: check_index_entry(filepath) for filepath in filepaths}
+    analyses_of_files = analyse_test_files([filepath for filepath in filepaths if checks_of_files[filepath][2] is None], max_workers=max_workers)
+    all_test_methods = []
+    for filepath in filepaths:
+        try:    # We use a try-except block here because the file may not contain unittests despite its name
+            all_test_methods += get_indexed_test_methods_in_file(filepath, analyses_of_files.get(filepath), checks_of_files[filepath])
+        except ValueError as err:
+            pass
+    return all_test_methods
+
+
+def get_indexed_test_methods_in_file(filepath: str, analysis=None, check=None) -> list:
+    """Return a list of all test methods within the file at filepath, an absolute path, as TestMethod objects, and post
+    them to shared_variables, as unit_test_finders.find_all_test_methods_in_file() does.  They're built from the file's
+    entry in the test index if it's still valid.  Otherwise, the file is analysed anew by analyse_test_file(), unless
+    analysis is what it returned already, and the index is updated.  Call load_test_index() before discovering tests.
+    Like find_all_test_methods_in_file(), raise ValueError if the file's test methods can't be found.
+    check is what check_index_entry() returned for the file, if it's been called already.
+    """
+    global test_index_unsaved
+
+    # Files outside the project directory may import from folders the project directory's signature doesn't cover
+    if not is_indexable(filepath):
+        return test_methods_from_analysis(analysis or analyse_test_file(filepath))
+
+    # Use the file's entry if it's still valid
+    version, content_hash, entry = check or check_index_entry(filepath)
+    if entry is not None:
+        return test_methods_from_analysis(entry[3:])
+
+    # Otherwise, analyse the file, and index the results
+    if content_hash is None:
+        content_hash = get_content_hash(filepath)
+    if analysis is None:
+        analysis = analyse_test_file(filepath)
+    descriptors = analysis[0]
+    star_imported_filepaths = {star_imported_filepath for descriptor in descriptors or [] for star_imported_filepath in descriptor.get("star_imported_filepaths", [])}
+    exported_names_of_modules = {star_imported_filepath: get_exported_names(star_imported_filepath) for star_imported_filepath in star_imported_filepaths}
+    TEST_INDEX[filepath] = (version, content_hash, exported_names_of_modules) + tuple(analysis)
+    test_index_unsaved = True
+    return test_methods_from_analysis(analysis)
+
+
+def is_indexable(filepath: str) -> bool:
+    """Return whether the test methods of the file at filepath can be kept in the test index."""
+    return test_index_tree_signature is not None and filepath.startswith(ROOT_DIR + os.sep)
+
+
+def check_index_entry(filepath: str) -> tuple:
+    """Return a tuple containing (the file at filepath's (modification time in nanoseconds, size in bytes), the SHA-1
+    hash of its content if that had to be found, or None, and its entry in the test index if it's still valid, or None).
+    The entry of a file that was touched without changing its content is brought up to date with it.  The entries of
+    files that can't be indexed (see is_indexable()) are never valid.
+    """
+    global test_index_unsaved
+    if not is_indexable(filepath):
+        return None, None, None
+    stat_result = os.stat(filepath)
+    version = (stat_result.st_mtime_ns, stat_result.st_size)
+    entry = TEST_INDEX.get(filepath)
+    if entry is None:
+        return version, None, None
+    content_hash = get_content_hash(filepath) if entry[0] != version else None
+    if not entry_is_valid(filepath, entry, version, content_hash):
+        return version, content_hash, None
+    if entry[0] != version:     # The file was touched without changing its content
+        entry = (version,) + entry[1:]
+        TEST_INDEX[filepath] = entry
+        test_index_unsaved = True
+    return version, content_hash, entry
+
+
+def analyse_test_files(filepaths: list, max_workers=None) -> dict:
+    """Return a dict whose keys are filepaths, absolute paths of test files, and whose values are what
+    analyse_test_file() returns for them.  If there are at least MIN_FILES_TO_ANALYSE_IN_PARALLEL files, they're
+    analysed by a pool of up to max_workers worker processes (by default, one per CPU), one file at a time.  If worker
+    processes can't be started, they're analysed in this process instead.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(filepaths))
+    if max_workers > 1 and len(filepaths) >= MIN_FILES_TO_ANALYSE_IN_PARALLEL:
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=initialize_worker, initargs=(getattr(shared_variables, "tatosp", None),)) as executor:
+                return dict(zip(filepaths, executor.map(analyse_test_file, filepaths)))
+        except (OSError, BrokenProcessPool) as err:   # Eg where processes can't be started, or a worker process is killed
+            pass
+    return {filepath: analyse_test_file(filepath) for filepath in filepaths}
+
+
+def initialize_worker(tatosp) -> None:
+    """Share how many spaces a tab is worth with a worker process of analyse_test_files(), since worker processes that
+    aren't forked from this one don't inherit it.
+    """
+    if tatosp is not None:
+        shared_variables.initialize(tatosp_in=tatosp)
+
+
+def analyse_test_file(filepath: str) -> tuple:
+    """Find all test methods within the file at filepath, an absolute path, along with their call sequences and their
+    signatures, and return a tuple containing a list of descriptors of them (see TestMethod.descriptor()), followed by
+    None.  If they can't be found, return a tuple containing None, followed by the message of the ValueError raised.
+    Only plain values are returned, so that this can be run by a worker process.
+    """
+    from ph_causal_testing.unit_test_finders import find_all_test_methods_in_file
+    try:
+        test_methods = find_all_test_methods_in_file(filepath)
+    except ValueError as err:
+        return None, str(err)
+    for test_method in test_methods:
+        try:
+            get_call_sequence_signature(test_method)
+        except (SyntaxError, ValueError, AttributeError) as err:
+            pass    # The call sequence is left to be found later, if it's needed
+    return [test_method.descriptor() for test_method in test_methods], None
+
+
+def test_methods_from_analysis(analysis: tuple) -> list:
+    """Return a list of TestMethod objects built from analysis, a tuple as returned by analyse_test_file(), and post
+    them to shared_variables.  Raise ValueError if analysis holds the message of a ValueError instead.
+    """
+    descriptors, error_message = analysis
+    if descriptors is None:
+        raise ValueError(error_message)
+    test_methods = [TestMethod.from_descriptor(descriptor) for descriptor in descriptors]
+    shared_variables.initialize(user_test_method_objects_in=test_methods)
+    return test_methods
+
+
+def entry_is_valid(filepath: str, entry: tuple, version: tuple, content_hash=None) -> bool:
+    """Return whether entry, the entry of the file at filepath in the test index, still describes the file, whose
+    version is now version.  content_hash is the SHA-1 hash of the file's content, if it's been found already.
+    """
+    if entry[0] != version and entry[1] != (content_hash or get_content_hash(filepath)):
+        return False
+    for star_imported_filepath, exported_names in entry[2].items():
+        try:
+            if get_exported_names(star_imported_filepath) != exported_names:
+                return False
+        except (OSError, ValueError) as err:
+            return False
+    return True
+
+
+def get_content_hash(filepath: str) -> str:
+    """Return the SHA-1 hash of the content of the file at filepath."""
+    with open(filepath, "rb") as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def get_tree_signature() -> str:
+    """Return a hash of the names of every folder and .py file in the project directory (along with any other entry
+    whose name has no ".", which an import could also resolve to), which changes whenever one is added or removed.
+    """
+    signature = hashlib.sha1()
+    for directory, (mtime_ns, entries) in get_filename_index(ROOT_DIR, refresh=True).entries_of_dirs.items():
+        names = sorted(name for name, kind in entries if name.endswith(".py") or "." not in name)
+        signature.update((directory + "\0" + "\0".join(names) + "\0\0").encode("utf-8", "surrogateescape"))
+    return signature.hexdigest()
+
+
+def load_test_index() -> None:
+    """Bring TEST_INDEX up to date with the project directory before discovering tests: load it from its persistent
+    cache the first time, or drop it if a folder or .py file has been added to or removed from the project directory
+    since.  The saved index is likewise only used if the project directory is as it was when the index was saved.
+    """
+    global test_index_tree_signature
+    tree_signature = get_tree_signature()
+    if test_index_tree_signature is None:
+        saved = load_persistent_cache(TEST_INDEX_CACHE_NAME)
+        if isinstance(saved, tuple) and len(saved) == 2 and saved[0] == tree_signature and isinstance(saved[1], dict):
+            TEST_INDEX.update(saved[1])
+    elif tree_signature != test_index_tree_signature:
+        TEST_INDEX.clear()
+    test_index_tree_signature = tree_signature
+
+
+def save_test_index() -> None:
+    """Save TEST_INDEX to its persistent cache, if it's changed since it was last saved.  If a folder or .py file has
+    been added to or removed from the project directory while discovering tests, some entries may describe the project
+    as it was before, so the index is dropped rather than saved.
+    """
+    global test_index_unsaved
+    if not test_index_unsaved:
+        return
+    if get_tree_signature() != test_index_tree_signature:
+        TEST_INDEX.clear()
+    else:
+        save_persistent_cache(TEST_INDEX_CACHE_NAME, (test_index_tree_signature, TEST_INDEX))
+    test_index_unsaved = False
@@ -2,6 +2,7 @@
 
 
 from ast import parse, NodeVisitor, NodeTransformer, AST, iter_fields, Name, Store, arg, Constant
+from hashlib import sha1
 
 from ph_causal_testing.class_for_test_method import TestMethod
 from ph_basic_processing.parsers import minimize_indents, concatenate_list_to_string
@@ -87,6 +88,57 @@ class SimilarityChecker(NodeVisitor):
 #
 # HELPER FUNCTIONS
 #
+def get_call_sequence(test_method) -> list:
+    """Return the names of the functions that test_method (a TestMethod object) calls, in the order SimilarityChecker
+    visits them.  The sequence is kept as test_method.call_sequence, so each test's content is only parsed for it once.
+    """
+    if getattr(test_method, "call_sequence", None) is None:
+        test_ast = parse(concatenate_list_to_string(minimize_indents(test_method.test_content), between="\n"))
+        test_method.call_sequence = call_sequence_of(test_ast)
+    return test_method.call_sequence
+
+
+def get_call_sequence_signature(test_method) -> str:
+    """Return the signature of the call sequence of test_method (a TestMethod object), as found by
+    signature_of_call_sequence().  The signature is kept as test_method.call_sequence_signature, so that tests found by
+    way of the test index (see indexes_of_found_tests.py) don't need their call sequences found again.
+    """
+    if getattr(test_method, "call_sequence_signature", None) is None:
+        test_method.call_sequence_signature = signature_of_call_sequence(get_call_sequence(test_method))
+    return test_method.call_sequence_signature
+
+
+def signature_of_call_sequence(call_sequence: list) -> str:
+    """Return a hash of call_sequence, a list of the names of called functions, that's the same in every run of
+    py-holmes.  Tests with equal call sequences have equal signatures.
+    """
+    return sha1("\0".join(call_sequence).encode("utf-8", "surrogateescape")).hexdigest()
+
+
+def call_sequence_of(node) -> list:
+    """Return the names of the functions called within node, an AST node, in the same order that
+    SimilarityChecker.generic_visit() adds them to a call sequence.
+    """
+    call_sequence = []
+    nodes_to_visit = [node]
+    while len(nodes_to_visit) > 0:
+        this_node = nodes_to_visit.pop()
+        if type(this_node).__name__ == "Call":
+            try:
+                call_sequence.append(this_node.func.id)
+            except AttributeError as err:
+                call_sequence.append(this_node.func.attr)  # This line is used if the call is a method, eg "self.assertEqual()"
+        # Visit children depth-first, in the order of their fields
+        children = []
+        for field, value in iter_fields(this_node):
+            if isinstance(value, list):
+                children += [item for item in value if isinstance(item, AST)]
+            elif isinstance(value, AST):
+                children.append(value)
+        nodes_to_visit += reversed(children)
+    return call_sequence
+
+
 def cut_found_tests(found_tests: list, original_test, dev_only_test_mode: bool) -> list:
     """Given a list of found tests, return only those tests that are 'call-similar' to the original test.
     We define 'call-similar' as having the same sequence of function calls, regardless of those function calls'
@@ -110,15 +162,23 @@ def cut_found_tests(found_tests: list, original_test, dev_only_test_mode: bool)
     if not isinstance(dev_only_test_mode, bool):
         raise TypeError("dev_only_test_mode must be a bool")
 
-    # Get ast for original test
-    original_test_ast = parse(concatenate_list_to_string(minimize_indents(original_test.test_content), between="\n"))
-
-    # Check similarity of each test, potentially adding it to extremely_similar_tests
-    extremely_similar_tests = []
+    # Get the call sequence of the original test from shared_variables, as SimilarityChecker does.  If it isn't there,
+    # calculate it and post it to save time in the future.
+    shared_variables.initialize_original_call_sequence()
+    try:
+        original_call_sequence = shared_variables.original_call_sequence
+    except AttributeError as err:
+        original_call_sequence = list(get_call_sequence(original_test))
+        shared_variables.initialize_original_call_sequence(original_call_sequence)
+
+    # Group the found tests by the signatures of their call sequences.  Only those with the original test's signature
+    # can be call-similar to it, and their call sequences are compared to make sure, adding them to extremely_similar_tests
+    tests_of_signatures = {}
     for test in found_tests:
-        test_ast = parse(concatenate_list_to_string(minimize_indents(test.test_content), between="\n"))
-        checker = SimilarityChecker(test_ast, original_test_ast)
-        if checker.extremely_similar:
+        tests_of_signatures.setdefault(get_call_sequence_signature(test), []).append(test)
+    extremely_similar_tests = []
+    for test in tests_of_signatures.get(signature_of_call_sequence(original_call_sequence), []):
+        if get_call_sequence(test) == original_call_sequence:
             extremely_similar_tests.append(test)
 
     # If in dev-only test mode, print a few attributes of each TestMethod object in output_tests
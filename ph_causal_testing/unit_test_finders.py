@@ -3,19 +3,54 @@
 
 from ph_causal_testing.class_for_test_method import TestMethod
 from ph_variable_sharing import shared_variables
-from ph_basic_processing.parsers import remove_trailing_comment, strip_file_extension, strip_trailing_newline
-from ph_basic_processing.stripping import strip_custom
+from ph_basic_processing.parsers import strip_file_extension
+from ph_basic_processing.module_exports import save_exported_names
+from ph_causal_testing.indexes_of_found_tests import load_test_index, save_test_index, get_indexed_test_methods_in_files
+from ph_causal_testing.file_analyzers_for_tests import TestFileAnalysis
 
 from os import walk, path
 from sys import executable
 
 
+#
+# CLASSES
+#
+class SymbolIndex:
+    """An inverted index from each user-written file, method, and class that found tests reference (as in
+    TestMethod.files_methods_and_classes_testing) to the tests that reference it, so that the tests referencing a subset
+    of some symbols can be found by looking only at the tests that reference any of them.
+    Attributes are as follows:
+    self.tests_of_symbols: dict.    Keys are symbols.  Values are lists of the TestMethod objects that reference them, in the order they were added.
+    """
+
+    def __init__(self) -> None:
+        self.tests_of_symbols = {}
+
+    def add(self, test_method: TestMethod) -> None:
+        """Add test_method to the posting list of each symbol it references."""
+        for symbol in test_method.files_methods_and_classes_testing:
+            self.tests_of_symbols.setdefault(symbol, []).append(test_method)
+
+    def tests_referencing_subset_of(self, symbols: set) -> list:
+        """Return the tests that reference a nonempty subset of symbols, sorted by filepath and then by line.  A test is
+        one of these if and only if it appears in the posting lists of as many of symbols as it references in all.
+        """
+        matches_of_tests = {}   # Keys are ids of tests in the posting lists of symbols.  Values are lists containing the test and the number of these posting lists it's in
+        for symbol in symbols:
+            for test_method in self.tests_of_symbols.get(symbol, []):
+                match = matches_of_tests.setdefault(id(test_method), [test_method, 0])
+                match[1] += 1
+        tests = [test_method for test_method, matches in matches_of_tests.values() if matches == len(test_method.files_methods_and_classes_testing)]
+        return sorted(tests, key=lambda test_method: (test_method.test_filepath, test_method.starting_test_lineno))
+
+
 #
 # HELPER FUNCTIONS
 #
-def find_tests_of_same_files_methods_and_classes(original_test, dev_only_test_mode: bool):
-    """Return the set of all TestMethod objects that reference a nonempty subset of the user-written
-    files/methods/classes referenced by the original test, and are not the exact same test.
+def find_tests_of_same_files_methods_and_classes(original_test, dev_only_test_mode: bool) -> list:
+    """Return a list of all TestMethod objects that reference a nonempty subset of the user-written
+    files/methods/classes referenced by the original test, and are not the exact same test, sorted by filepath and then
+    by line.
     :param original_test:           TestMethod object for the user's original test
     :param dev_only_test_mode:      whether --dev_only_test_mode was set to True when py-holmes was called from the command line
     """
@@ -27,12 +62,13 @@ def find_tests_of_same_files_methods_and_classes(original_test, dev_only_test_mo
     if not isinstance(dev_only_test_mode, bool):
         raise TypeError("dev_only_test_mode must be a bool")
 
-    # Search the project folder (excluding the Python executable's folder) to get all_tests, a list of absolute paths to Python files in the project that begin or end with "test"
-    all_tests = []
+    # Search the project folder (excluding the Python executable's folder) to get test_filepaths, a list of absolute paths to Python files in the project that begin or end with "test"
+    test_filepaths = []
     shared_variables.initialize_all_dirs_to_search()    # TODO: Added this line for easier testing.  In the future, should remove to save time and accomplish testing some other way
     dirs_to_search = shared_variables.all_dirs_to_search.copy()
     del dirs_to_search[1:3]     # Remove default python install location and executable location; we don't want to search these.
     executable_outermost_folder = path.dirname(path.dirname(executable))
+    load_test_index()   # Test files that haven't changed since they were last analysed are looked up in the test index instead (see indexes_of_found_tests.py)
     for this_root_dir in dirs_to_search:
         for root, dirs, files in walk(this_root_dir):
             for this_dir in dirs:
@@ -42,21 +78,22 @@ def find_tests_of_same_files_methods_and_classes(original_test, dev_only_test_mo
                 if this_file.endswith(".py"):
                     this_file_no_extension = strip_file_extension(this_file)
                     if this_file_no_extension.startswith("test") or this_file_no_extension.endswith("test"):
-                        # Add all test methods from this file to all_tests
-                        try:    # We use a try-except block here because the file may not contain unittests despite its name
-                            test_methods_in_this_file = find_all_test_methods_in_file(path.join(root, this_file), post_as_user_test_method_objects=True)
-                            all_tests += test_methods_in_this_file.copy()
-                        except ValueError as err:
-                            pass
-
-    # For each test in all_tests, if this test's files_methods_and_classes_testing is a nonempty subset of
-    # original_test.files_methods_and_classes_testing, and it is not the exact same test,
-    # then add this test to output_tests
+                        test_filepaths.append(path.join(root, this_file))
+
+    # Get the test methods in every test file, analysing those that have changed in parallel, and index them by the
+    # files/methods/classes they reference
+    symbol_index = SymbolIndex()
+    for this_test in get_indexed_test_methods_in_files(test_filepaths):
+        symbol_index.add(this_test)
+    save_exported_names()   # So that the next run doesn't parse the modules that were star-imported again
+    save_test_index()       # So that the next run doesn't analyse the test files that haven't changed again
+
+    # For each test whose files_methods_and_classes_testing is a nonempty subset of
+    # original_test.files_methods_and_classes_testing, if it is not the exact same test, then add this test to output_tests
     output_tests = []
-    for this_test in all_tests:
-        if len(this_test.files_methods_and_classes_testing) != 0 and this_test.files_methods_and_classes_testing <= original_test.files_methods_and_classes_testing:
-            if not (this_test.test_filepath == original_test.test_filepath and this_test.test_name == original_test.test_name):
-                output_tests.append(this_test)
+    for this_test in symbol_index.tests_referencing_subset_of(original_test.files_methods_and_classes_testing):
+        if not (this_test.test_filepath == original_test.test_filepath and this_test.test_name == original_test.test_name):
+            output_tests.append(this_test)
 
     # If in dev-only test mode, print a few attributes of each TestMethod object in output_tests
     if dev_only_test_mode:
@@ -72,7 +109,7 @@ def find_tests_of_same_files_methods_and_classes(original_test, dev_only_test_mo
         print("END ATTRIBUTES OF FOUND TESTMETHOD OBJECTS BEFORE CUTTING")
 
     # Return!
-    return set(output_tests)
+    return output_tests
 
 
 def find_all_test_methods_in_file(filepath: str, post_as_user_test_method_objects=False, origin="found") -> list:
@@ -93,25 +130,14 @@ def find_all_test_methods_in_file(filepath: str, post_as_user_test_method_object
     if filepath != path.abspath(filepath):
         raise ValueError("filepath must be an absolute filepath")
 
-    # Get the contents of the file and strip ending newlines
-    with open(filepath, "r", encoding="utf-8") as file:
-        file_content = file.readlines()
-    for ii in range(len(file_content)):
-        file_content[ii] = strip_trailing_newline(file_content[ii])
+    # Read and analyse the file once, to be shared by every TestMethod built from it
+    analysis = TestFileAnalysis(filepath)
 
     # For each line that starts with "def test" and ends with ":" (after removing whitespace and trailing comments), create a TestMethod
     # object and append to all_test_methods
     all_test_methods = []
-    for ll in range(len(file_content)):
-        this_line = file_content[ll]
-        # Strip
-        this_line_no_whitespace_or_trailing_comments = remove_trailing_comment(this_line)
-        this_line_no_whitespace_or_trailing_comments = strip_custom(this_line_no_whitespace_or_trailing_comments, ["\t", " "], "head")
-        this_line_no_whitespace_or_trailing_comments = strip_custom(this_line_no_whitespace_or_trailing_comments, ["\t", " "], "tail")
-
-        # If a def line whose function starts with "test", build and append a TestMethod object
-        if this_line_no_whitespace_or_trailing_comments.startswith("def test") and this_line_no_whitespace_or_trailing_comments.endswith(":"):
-            all_test_methods.append(TestMethod(origin, filepath, ll + 1, False, False))
+    for line_number in analysis.test_method_line_numbers():
+        all_test_methods.append(TestMethod(origin, filepath, line_number, False, False, analysis=analysis))
 
     # Save these objects for future use     # TODO: Should this instead be done in find_tests_of_same_files_methods_and_classes?
     if post_as_user_test_method_objects:
@@ -5,7 +5,6 @@ from datetime import datetime, timedelta
 import unittest
 import os
 import pickle
-import trace
 import io
 from io import StringIO
 from contextlib import redirect_stdout
@@ -21,7 +20,11 @@ import torch
 from ph_original_test_result_generation.ph_original_test_running.original_test_runners import OriginalUnitTestResult
 from ph_causal_testing.class_for_test_method import TestMethod
 from ph_original_test_result_generation.ph_original_test_running.importers import import_by_string
-from ph_basic_processing.trace_exit_line_adders import add_exit_lines_to_trace, remove_before_function_runtime, remove_after_function_runtime
+from ph_original_test_result_generation.ph_original_test_running.event_tracers import make_event_tracer, get_trace_backend, get_trace_scope, get_trace_granularity, get_trace_gated, get_trace_max_events, get_trace_max_bytes, get_trace_sample_every, get_trace_sample_interval, gate_tracing_to_test_method, TextTracer, BoundedTraceBuffer, USER_OUTPUT_MAX_BYTES
+from ph_basic_processing.trace_exit_line_adders import crop_and_add_exit_lines_to_trace
+from ph_basic_processing.trace_compressors import CompressedTrace, compress_trace, compressed_trace_distance, get_trace_compress
+from ph_basic_processing.trace_samplers import SampledTrace, sampled_trace_distance
+from ph_basic_processing.trace_tokenizers import TokenTrace, tokenize_trace, token_trace_distance, lines_of_trace
 from ph_basic_processing.parsers import indices_of_all_occurrences_of_character_in_string, minimize_indents, is_just_whitespace, is_linelog, concatenate_list_to_string, get_folder_delimiter, remove_leading_substring, remove_whitespace_only_lines_from_extremes_of_list, count_indentation_in_spaces, get_indices_containing_function_body_and_indentation_of_definition, starts_with_one_of
 from ph_basic_processing.stripping import strip_custom
 from ph_variable_sharing import shared_variables
@@ -33,19 +36,20 @@ from ph_variable_sharing import shared_variables
 class FuzzedUnitTestResult:
     """Container for those results of a fuzzed unit test that are relevant for causal testing."""
 
-    def __init__(self, execution_path=None, failed=None, test_method=None, activations=None) -> None:
+    def __init__(self, execution_path=None, failed=None, test_method=None, activations=None, truncated=False) -> None:
         """
-        :param execution_path:  execution trace in string form, unless we're in dl mode, in which case it should be None.  SHOULD ALREADY BE POSTPROCESSED USING ADD_EXIT_LINES_TO_TRACE().  SHOULD ONLY INCLUDE THE LINES RUN DURING THE TEST'S RUNTIME
+        :param execution_path:  execution trace in string form or as a CompressedTrace or TokenTrace, unless we're in dl mode, in which case it should be None.  SHOULD ALREADY BE POSTPROCESSED USING ADD_EXIT_LINES_TO_TRACE().  SHOULD ONLY INCLUDE THE LINES RUN DURING THE TEST'S RUNTIME
         :param failed:          boolean.  True if one or more assert calls in the test failed, else False.
         :param test_method:     TestMethod object for this test
         :param activations:     Only for use when py-holmes is being used with the --dl flag.  Dictionary of tensors representing the activation of each layer.
+        :param truncated:       boolean.  True if execution_path was cut short or coarsened because it hit the limit set by --trace_max_events or --trace_max_bytes, else False.
         """
         # Handle errors
-        # execution_path not a string or None
-        if not isinstance(execution_path, str) and execution_path is not None:
-            raise TypeError("execution_path must be a string or None")
-        # execution_path is a string but doesn't look like a post-processed execution trace
-        if isinstance(execution_path, str) and ("\n" not in execution_path or "modulename: " not in execution_path or "---" not in execution_path or "|||" not in execution_path):
+        # execution_path not a string, CompressedTrace, TokenTrace, or None
+        if not isinstance(execution_path, (str, CompressedTrace, TokenTrace)) and execution_path is not None:
+            raise TypeError("execution_path must be a string, CompressedTrace, TokenTrace, or None")
+        # execution_path doesn't look like a post-processed execution trace
+        if execution_path is not None and ("\n" not in execution_path or "modulename: " not in execution_path or "---" not in execution_path or "|||" not in execution_path):
             raise ValueError("execution_path doesn't look like a post-processed execution trace")
         # failed not a bool
         if not isinstance(failed, bool):
@@ -56,11 +60,15 @@ class FuzzedUnitTestResult:
         # activations not a dict or None
         if not isinstance(activations, dict) and activations is not None:
             raise TypeError("activations must be a dict or None")
+        # truncated not a bool
+        if not isinstance(truncated, bool):
+            raise TypeError("truncated must be a bool")
 
         self.execution_path = execution_path
         self.failed = failed
         self.test_method = test_method
         self.activations = activations
+        self.truncated = truncated
 
 
 #
@@ -72,7 +80,7 @@ def show_report(failing_results_for_showing: list, passing_results_for_showing:
     :param failing_results_for_showing:         list of failing FuzzedUnitTestResult objects to account for in the report
     :param passing_results_for_showing:         list of passing FuzzedUnitTestResult objects to account for in the report
     :param original_test_method:                TestMethod object for the original test
-    :param original_execution_trace:            string representing the execution trace of the original user-written test.
+    :param original_execution_trace:            string, CompressedTrace, or TokenTrace representing the execution trace of the original user-written test.
     """
     # Handle errors
     # failing_results_for_showing not a list
@@ -92,9 +100,9 @@ def show_report(failing_results_for_showing: list, passing_results_for_showing:
     # no elements in both failing_results_for_showing and passing_results_for_showing
     if len(failing_results_for_showing) == 0 and len(passing_results_for_showing) == 0:
         raise ValueError("failing_results_for_showing and passing_results_for_showing must not both be empty")
-    # original_execution_trace not a string
-    if not isinstance(original_execution_trace, str):
-        raise TypeError("original_execution_trace must be a string")
+    # original_execution_trace not a string, CompressedTrace, or TokenTrace
+    if not isinstance(original_execution_trace, (str, CompressedTrace, TokenTrace)):
+        raise TypeError("original_execution_trace must be a string, CompressedTrace, or TokenTrace")
     # running in dl mode
     from ph_variable_sharing import shared_variables
     shared_variables.initialize()
@@ -112,6 +120,8 @@ def show_report(failing_results_for_showing: list, passing_results_for_showing:
             print(f"{Fore.RED}{'/'*24} FAILING TEST {'/'*24}{Style.RESET_ALL}")
         else:
             print(f"{Fore.GREEN}{'/'*24} PASSING TEST {'/'*24}{Style.RESET_ALL}")
+        if result.truncated:
+            print("(The execution trace of this test hit the limit set by --trace_max_events or --trace_max_bytes, so it's incomplete)")
 
         # Create a standardized version of the original and new test content so that they can be more meaningfully compared
         # Standardize text of original test by converting to ast and back again.  This also removes comments, which
@@ -196,8 +206,13 @@ def show_report(failing_results_for_showing: list, passing_results_for_showing:
         # Convert traces to newline-separated lists
         if not shared_variables.execution_path_suppress:
             print(f"{Fore.BLUE}{'~' * 16} Execution Path Changes {'~' * 16}{Style.RESET_ALL}")
-            original_execution_trace_list = original_execution_trace.split("\n")
-            result_execution_path_list = result.execution_path.split("\n")
+            if isinstance(original_execution_trace, CompressedTrace) or isinstance(result.execution_path, CompressedTrace):
+                # Diff repeated blocks as they're shown, rather than every repeat of them
+                original_execution_trace_list = compress_trace(original_execution_trace).rendered_lines()
+                result_execution_path_list = compress_trace(result.execution_path).rendered_lines()
+            else:
+                original_execution_trace_list = lines_of_trace(original_execution_trace)
+                result_execution_path_list = lines_of_trace(result.execution_path)
             # Remove all pre-colon content from linelog lines in both original_execution_trace_list and result_execution_path_list
             for this_trace in [original_execution_trace_list, result_execution_path_list]:
                 for ll in range(len(this_trace)):
@@ -329,27 +344,48 @@ def distance_between_neuron_activations(activations_new: dict, activations_old:
         raise ValueError("invalid mode requested")
 
 
-def distance_between_execution_traces(trace_new: str, trace_old: str) -> int:
+def distance_between_execution_traces(trace_new, trace_old) -> int:
     """Given two execution traces that have been post-processed by trace_exit_line_adders.add_exit_lines_to_trace(),
-    return a value representing the distance between them
-    :param trace_new:           execution trace post-processed by trace_exit_line_adders.add_exit_lines_to_trace()
-    :param trace_old:           execution trace post-processed by trace_exit_line_adders.add_exit_lines_to_trace()
+    return a value representing the distance between them.  If either trace is a CompressedTrace, both are compared in
+    compressed form with trace_compressors.compressed_trace_distance().  If either trace is a SampledTrace, both are
+    compared with trace_samplers.sampled_trace_distance(), which accounts for the lines that sampling left out.  Otherwise,
+    if either trace is a TokenTrace, both are compared by token with trace_tokenizers.token_trace_distance().
+    :param trace_new:           execution trace post-processed by trace_exit_line_adders.add_exit_lines_to_trace(), as a string, CompressedTrace, or TokenTrace
+    :param trace_old:           execution trace post-processed by trace_exit_line_adders.add_exit_lines_to_trace(), as a string, CompressedTrace, or TokenTrace
     :return:                    an integer representing the distance between the two traces
     """
     # Handle errors
-    # trace_new not a string
-    if not isinstance(trace_new, str):
-        raise TypeError("trace_new must be a string")
+    # trace_new not a string, CompressedTrace, or TokenTrace
+    if not isinstance(trace_new, (str, CompressedTrace, TokenTrace)):
+        raise TypeError("trace_new must be a string, CompressedTrace, or TokenTrace")
     # trace_new doesn't look like a post-processed execution trace
     if "\n" not in trace_new or "modulename: " not in trace_new or "---" not in trace_new or "|||" not in trace_new:
         raise ValueError("trace_new doesn't look like a post-processed execution trace")
-    # trace_old not a string
-    if not isinstance(trace_old, str):
-        raise TypeError("trace_old must be a string")
+    # trace_old not a string, CompressedTrace, or TokenTrace
+    if not isinstance(trace_old, (str, CompressedTrace, TokenTrace)):
+        raise TypeError("trace_old must be a string, CompressedTrace, or TokenTrace")
     # trace_old doesn't look like a post-processed execution trace
     if "\n" not in trace_old or "modulename: " not in trace_old or "---" not in trace_old or "|||" not in trace_old:
         raise ValueError("trace_old doesn't look like a post-processed execution trace")
 
+    # Compare tokenized traces by token, unless the other trace is compressed or sampled, in which case both are compared
+    # in that form instead
+    if isinstance(trace_new, TokenTrace) or isinstance(trace_old, TokenTrace):
+        if not isinstance(trace_new, (CompressedTrace, SampledTrace)) and not isinstance(trace_old, (CompressedTrace, SampledTrace)):
+            return token_trace_distance(tokenize_trace(trace_new), tokenize_trace(trace_old))
+        if isinstance(trace_new, TokenTrace):
+            trace_new = str(trace_new)
+        if isinstance(trace_old, TokenTrace):
+            trace_old = str(trace_old)
+
+    # Compare compressed traces without expanding them
+    if isinstance(trace_new, CompressedTrace) or isinstance(trace_old, CompressedTrace):
+        return compressed_trace_distance(compress_trace(trace_new), compress_trace(trace_old))
+
+    # Compare sampled traces by how often each line is estimated to have run
+    if isinstance(trace_new, SampledTrace) or isinstance(trace_old, SampledTrace):
+        return sampled_trace_distance(trace_new, trace_old)
+
     # Convert both traces to newline-separated lists of strings
     trace_new = trace_new.split("\n")
     trace_old = trace_old.split("\n")
@@ -382,9 +418,10 @@ def distance_between_execution_traces(trace_new: str, trace_old: str) -> int:
 
 def filter_for_minimally_different_passing_and_failing_tests(results: list, original_execution_trace=None, original_activations=None) -> list:
     """Given a list of FuzzedUnitTestResult objects, return a list with just the 3 passing and 3 failing tests are
-    minimally different from the original.
+    minimally different from the original.  Tests with truncated execution traces rank after all others, since their
+    distances understate how much they differ.
     :param results:                     list of FuzzedUnitTestResult objects to be filtered
-    :param original_execution_trace:    execution trace from original test, in string form.  If py-holmes is in dl mode, this must be None instead
+    :param original_execution_trace:    execution trace from original test, in string form or as a CompressedTrace or TokenTrace.  If py-holmes is in dl mode, this must be None instead
     :param original_activations:        dictionary of activations as tensors.  If py-holmes is NOT in dl mode, this must be None instead
     :return:                            list of two sublists, where the first sublist is the FuzzedUnitTestResult objects for the 3 most similar failing tests, and the second sublist is the FuzzedUnitTestResult objects for the 3 most similar passing tests
     """
@@ -399,9 +436,9 @@ def filter_for_minimally_different_passing_and_failing_tests(results: list, orig
     # results empty
     if len(results) == 0:
         raise ValueError("results must not be empty")
-    # original_execution_trace not a string or None
-    if not isinstance(original_execution_trace, str) and original_execution_trace is not None:
-        raise TypeError("original_execution_trace must be a string or None")
+    # original_execution_trace not a string, CompressedTrace, TokenTrace, or None
+    if not isinstance(original_execution_trace, (str, CompressedTrace, TokenTrace)) and original_execution_trace is not None:
+        raise TypeError("original_execution_trace must be a string, CompressedTrace, TokenTrace, or None")
     # original_activations not a dict or None
     if not isinstance(original_activations, dict) and original_activations is not None:
         raise TypeError("original_activations must be a dict or None")
@@ -432,36 +469,94 @@ def filter_for_minimally_different_passing_and_failing_tests(results: list, orig
         filtered_failing = failing_results
     else:
         if dl:
-            distances_failing = [distance_between_neuron_activations(element.activations, original_activations) for element in failing_results]  # Beware: The 3 smallest distances will later be set to +inf
+            distances_failing = [(element.truncated, distance_between_neuron_activations(element.activations, original_activations)) for element in failing_results]  # Beware: The 3 smallest distances will later be set to +inf
         else:
-            distances_failing = [distance_between_execution_traces(element.execution_path, original_execution_trace) for element in failing_results]  # Beware: The 3 smallest distances will later be set to +inf
+            distances_failing = [(element.truncated, distance_between_execution_traces(element.execution_path, original_execution_trace)) for element in failing_results]  # Beware: The 3 smallest distances will later be set to +inf
         failing_least_distant_indices = []
         for ii in range(3):
             failing_least_distant_index = distances_failing.index(min(distances_failing))
             failing_least_distant_indices.append(failing_least_distant_index)
-            distances_failing[failing_least_distant_index] = float("inf")
+            distances_failing[failing_least_distant_index] = (True, float("inf"))
         filtered_failing = [failing_results[index] for index in failing_least_distant_indices]
     if len(passing_results) <= 3:
         filtered_passing = passing_results
     else:
         if dl:
-            distances_passing = [distance_between_neuron_activations(element.activations, original_activations) for element in passing_results]    # Beware: The 3 smallest distances will later be set to +inf
+            distances_passing = [(element.truncated, distance_between_neuron_activations(element.activations, original_activations)) for element in passing_results]    # Beware: The 3 smallest distances will later be set to +inf
         else:
-            distances_passing = [distance_between_execution_traces(element.execution_path, original_execution_trace) for element in passing_results]    # Beware: The 3 smallest distances will later be set to +inf
+            distances_passing = [(element.truncated, distance_between_execution_traces(element.execution_path, original_execution_trace)) for element in passing_results]    # Beware: The 3 smallest distances will later be set to +inf
         passing_least_distant_indices = []
         for ii in range(3):
             passing_least_distant_index = distances_passing.index(min(distances_passing))
             passing_least_distant_indices.append(passing_least_distant_index)
-            distances_passing[passing_least_distant_index] = float("inf")
+            distances_passing[passing_least_distant_index] = (True, float("inf"))
         filtered_passing = [passing_results[index] for index in passing_least_distant_indices]
 
     # Return!
     return [filtered_failing, filtered_passing]
 
 
-def build_and_run_fuzzed_test_suite() -> None:
+def filter_with_line_level_tiebreaks(results: list, original_execution_trace, original_test_method: TestMethod, dev_only_test_mode: bool) -> list:
+    """For use with --trace_granularity function, --trace_sample_every, or --trace_sample_interval.  Given a list of
+    FuzzedUnitTestResult objects with function-level or sampled execution traces, return the 3 passing and 3 failing tests that are minimally different from the original, as
+    filter_for_minimally_different_passing_and_failing_tests() does, truncated traces included.  Where several tests tie for the last of those
+    places, only the tied tests (and the original) are re-run with full line-level tracing, and the tie is broken by
+    their line-level distances.  The tests returned are then re-run at full line level as well, so that the report can
+    show which lines changed.
+    :param results:                     list of FuzzedUnitTestResult objects to be filtered, with function-level or sampled execution traces
+    :param original_execution_trace:    function-level or sampled execution trace from original test, in string form or as a CompressedTrace or TokenTrace
+    :param original_test_method:        TestMethod object for the original test
+    :param dev_only_test_mode:          whether --dev_only_test_mode was set to True when py-holmes was called from the command line
+    :return:                            list of three entries, where the first is a list of line-level FuzzedUnitTestResult objects for the 3 most similar failing tests, the second is the same for the 3 most similar passing tests, and the third is the line-level execution trace of the original test
+    """
+    # Handle errors
+    # results not a list
+    if not isinstance(results, list):
+        raise TypeError("results must be a list")
+    # results contains non-FuzzedUnitTestResult element
+    for element in results:
+        if not isinstance(element, FuzzedUnitTestResult):
+            raise TypeError("results contains non-FuzzedUnitTestResult element")
+    # results empty
+    if len(results) == 0:
+        raise ValueError("results must not be empty")
+    # original_execution_trace not a string, CompressedTrace, or TokenTrace
+    if not isinstance(original_execution_trace, (str, CompressedTrace, TokenTrace)):
+        raise TypeError("original_execution_trace must be a string, CompressedTrace, or TokenTrace")
+    # original_test_method not a TestMethod object
+    if not isinstance(original_test_method, TestMethod):
+        raise TypeError("original_test_method must be a TestMethod object")
+
+    # Re-run the original test at line level, and each other test only once it's needed at line level
+    original_line_level_trace = get_variant_test_result(original_test_method, dev_only_test_mode, full_line_level=True).execution_path
+    line_level_results = {}     # Maps the id of each function-level result to its line-level counterpart
+    def line_level_result_of(result: FuzzedUnitTestResult) -> FuzzedUnitTestResult:
+        if id(result) not in line_level_results:
+            line_level_results[id(result)] = get_variant_test_result(result.test_method, dev_only_test_mode, full_line_level=True)
+        return line_level_results[id(result)]
+
+    # For each of failing and passing, rank by function-level distance, and break any tie for third place at line level
+    output = []
+    for category_results in [[result for result in results if result.failed], [result for result in results if not result.failed]]:
+        distances = [(result.truncated, distance_between_execution_traces(result.execution_path, original_execution_trace)) for result in category_results]
+        ranked_indices = sorted(range(len(category_results)), key=lambda index: distances[index])
+        if len(ranked_indices) > 3 and distances[ranked_indices[2]] == distances[ranked_indices[3]]:
+            cutoff_distance = distances[ranked_indices[2]]
+            tied_indices = [index for index in ranked_indices if distances[index] == cutoff_distance]
+            tied_indices.sort(key=lambda index: (line_level_result_of(category_results[index]).truncated, distance_between_execution_traces(line_level_result_of(category_results[index]).execution_path, original_line_level_trace)))
+            ranked_indices = [index for index in ranked_indices if distances[index] < cutoff_distance] + tied_indices
+        output.append([line_level_result_of(category_results[index]) for index in ranked_indices[:3]])
+
+    # Return!
+    output.append(original_line_level_trace)
+    return output
+
+
+def build_and_run_fuzzed_test_suite(gated_tracer=None) -> None:
     """To be traced by the python trace module, called by get_variant_test_result().
     Build a test suite containing a fuzzed variant, run, and return test results by creating a .pickle file.
+    If gated_tracer is given, this function should not itself be traced.  Instead, gated_tracer is switched on only
+    while the test method runs, so that imports and the unittest runner are never traced.
     """
     # Get inputs via globaling, to get around NameError: name 'foo' is not defined
     global test_case_as_string
@@ -497,7 +592,10 @@ def build_and_run_fuzzed_test_suite() -> None:
     test_module = import_module(test_filepath_temp_from_rootdir_with_dots_no_file_extension)
     importlib.reload(test_module)
     suite = unittest.TestSuite()
-    suite.addTest(test_class(test_case_as_string))
+    test_instance = test_class(test_case_as_string)
+    if gated_tracer is not None:
+        gate_tracing_to_test_method(gated_tracer, test_instance)
+    suite.addTest(test_instance)
 
     # Run test and get results
     stream = StringIO()
@@ -538,10 +636,11 @@ def build_and_run_fuzzed_test_suite() -> None:
         pickle.dump(dictionary, pickle_file)
 
 
-def get_variant_test_result(test_method: TestMethod, dev_only_test_mode: bool) -> FuzzedUnitTestResult:
+def get_variant_test_result(test_method: TestMethod, dev_only_test_mode: bool, full_line_level=False) -> FuzzedUnitTestResult:
     """Return a FuzzedUnitTestResult object for the TestMethod object given.
     :param test_method:             a TestMethod object representing the test to be run
     :param dev_only_test_mode:      whether --dev_only_test_mode was set to True when py-holmes was called from the command line
+    :param full_line_level:         whether to record every line regardless of --trace_granularity, --trace_sample_every, and --trace_sample_interval
     """
     # Handle errors
     # test_method not a TestMethod object
@@ -550,6 +649,9 @@ def get_variant_test_result(test_method: TestMethod, dev_only_test_mode: bool) -
     # dev_only_test_mode not a bool
     if not isinstance(dev_only_test_mode, bool):
         raise TypeError("dev_only_test_mode must be a bool")
+    # full_line_level not a bool
+    if not isinstance(full_line_level, bool):
+        raise TypeError("full_line_level must be a bool")
     # We're in dl mode
     from ph_variable_sharing import shared_variables
     shared_variables.initialize()
@@ -612,14 +714,38 @@ def get_variant_test_result(test_method: TestMethod, dev_only_test_mode: bool) -
         importstring = f"from {test_filename_without_file_extension} import {class_as_string}"
 
     # Run test and get results, simultaneously tracing execution.
-    # Getting tracer results involves redirecting stdout to a buffer and capturing it later as a variable.
+    # The tracer keeps the execution trace on its own channel: events in memory, or, with the "trace" backend, text in
+    # tracer.stream.  Whatever the test prints is caught separately, in output_buffer, by redirecting stdout, so it never
+    # goes through trace parsing.
     # Getting unittest runner results requires reading the important results from a pickle
     # that build_and_run_fuzzed_test_suite() writes
-    tracer = trace.Trace(count=0, trace=1, countfuncs=0, countcallers=0, ignoremods=(), ignoredirs=(), infile=None, outfile=None, timing=False)
-    trace_buffer = io.StringIO()
+    # If --trace_max_events or --trace_max_bytes was given, the trace may be cut short (or, for event backends, coarsened
+    # to function-level) partway through the test, in which case the result is marked as truncated.
+    # If --trace_sample_every or --trace_sample_interval was given, only some line events are recorded, so the trace is
+    # kept as a SampledTrace that knows how many lines each of its lines stands for.
+    trace_backend = get_trace_backend()
+    trace_gated = get_trace_gated()
+    if full_line_level:
+        trace_granularity = "line"
+        sample_every = sample_interval = None
+    else:
+        trace_granularity = get_trace_granularity()
+        sample_every = get_trace_sample_every()
+        sample_interval = get_trace_sample_interval()
+    trace_sampled = sample_every is not None or sample_interval is not None
+    if trace_backend == "trace":
+        tracer = TextTracer(max_bytes=get_trace_max_bytes())
+    else:
+        tracer = make_event_tracer(trace_backend, scope=get_trace_scope(), granularity=trace_granularity, max_events=get_trace_max_events(), sample_every=sample_every, sample_interval=sample_interval)
+    output_buffer = BoundedTraceBuffer(max_bytes=USER_OUTPUT_MAX_BYTES)
     try:
-        with redirect_stdout(trace_buffer):   # To prevent the execution trace from getting printed to the screen
-            tracer.run("build_and_run_fuzzed_test_suite()")   # Unit test result.  Running this line leads to warning about using PyDev debugger with sys.settrace()
+        with redirect_stdout(output_buffer):   # To keep whatever the test prints off the screen
+            if trace_gated:
+                build_and_run_fuzzed_test_suite(gated_tracer=tracer)
+            elif trace_backend == "trace":
+                tracer.run("build_and_run_fuzzed_test_suite()")   # Unit test result.  Running this line leads to warning about using PyDev debugger with sys.settrace()
+            else:
+                tracer.runfunc(build_and_run_fuzzed_test_suite)
         with open(pickle_filename, "rb") as pickle_file:
             runner_result = pickle.load(pickle_file)
     finally:
@@ -630,14 +756,27 @@ def get_variant_test_result(test_method: TestMethod, dev_only_test_mode: bool) -
     test_failed = (runner_result["length_of_failures_list"] != 0)
 
     # Get the execution trace, regardless of whether the test passed or failed
-    tracer_result = trace_buffer.getvalue()
-    tracer_result = remove_before_function_runtime(tracer_result, test_method.test_name, test_filename_without_file_extension)
-    tracer_result, _, _ = add_exit_lines_to_trace(tracer_result)  # Add exit lines to tracer_result for every time we exit a function or class, and do some other touch-ups as well
-    # Remove all but the user's runtime from the execution trace
-    tracer_result = remove_after_function_runtime(tracer_result, test_method.test_name, test_filename_without_file_extension)
+    if trace_backend == "trace":
+        trace_truncated = tracer.stream.truncated
+        tracer_result = tracer.stream.getvalue()
+    else:
+        # Truncated and sampled traces are missing lines, so their exits are taken from their return events
+        trace_truncated = tracer.results().truncated
+        tracer_result = tracer.results().parsed_tracelines_from_entry(test_filename_without_file_extension, test_method.test_name, function_level=(trace_granularity == "function" or trace_truncated or trace_sampled))
+    # Crop the execution trace to the user's runtime, adding exit lines to it for every time we exit a function or class,
+    # and doing some other touch-ups as well
+    tracer_lines, _, _ = crop_and_add_exit_lines_to_trace(tracer_result, test_method.test_name, test_filename_without_file_extension, exit_remaining_functions=(trace_gated or trace_truncated))
+    # Collapse repeated blocks of lines, if requested.  Otherwise, unless the trace was sampled, hold it as tokens, so
+    # that the lines it shares with other variants' traces are only stored once
+    if trace_sampled:
+        tracer_result = SampledTrace("\n".join(tracer_lines), line_weight=tracer.results().line_weight())
+    elif get_trace_compress():
+        tracer_result = compress_trace("\n".join(tracer_lines))
+    else:
+        tracer_result = tokenize_trace(tracer_lines)
 
     # Create a FuzzedUnitTestResult object with the information that we need for causal testing
-    output = FuzzedUnitTestResult(execution_path=tracer_result, failed=test_failed, test_method=test_method)
+    output = FuzzedUnitTestResult(execution_path=tracer_result, failed=test_failed, test_method=test_method, truncated=trace_truncated)
 
     # If in dev-only testing mode, print the attributes of this object
     if dev_only_test_mode:
@@ -773,11 +912,20 @@ def run_variants_and_show_results(original_test_result: OriginalUnitTestResult,
     if dl:
         failing_results_to_show, passing_results_to_show = filter_for_minimally_different_passing_and_failing_tests(test_results, original_activations=original_test_result.activations)
     else:
-        failing_results_to_show, passing_results_to_show = filter_for_minimally_different_passing_and_failing_tests(test_results, original_execution_trace=original_test_result.execution_path)
+        original_execution_trace = original_test_result.execution_path
+        if get_trace_compress():
+            original_execution_trace = compress_trace(original_execution_trace)
+        elif not isinstance(original_execution_trace, SampledTrace):
+            original_execution_trace = tokenize_trace(original_execution_trace)
+        if get_trace_granularity() == "function" or get_trace_sample_every() is not None or get_trace_sample_interval() is not None:
+            # Rank on function-level or sampled traces, and only go back to line-level traces for the tests that get shown
+            failing_results_to_show, passing_results_to_show, original_execution_trace = filter_with_line_level_tiebreaks(test_results, original_execution_trace, original_test_method, dev_only_test_mode)
+        else:
+            failing_results_to_show, passing_results_to_show = filter_for_minimally_different_passing_and_failing_tests(test_results, original_execution_trace=original_execution_trace)
 
     # Show a report in which the differences in literals are highlighted, and execution traces are cropped so that only
     # the parts that differ remain
     if dl:
         show_report(failing_results_to_show, passing_results_to_show, original_test_method, original_activations=original_test_result.activations)
     else:
-        show_report(failing_results_to_show, passing_results_to_show, original_test_method, original_execution_trace=original_test_result.execution_path)
+        show_report(failing_results_to_show, passing_results_to_show, original_test_method, original_execution_trace=original_execution_trace)
@@ -0,0 +1,168 @@
+"""Classes and functions for looking files up by name within a directory tree, without walking the whole tree every time.
+An index of the tree is built with one os.scandir() pass over each of its folders, kept on disk between runs of
+py-holmes, and brought up to date by rescanning only the folders whose modification times have changed.
+"""
+
+
+#
+# IMPORTS
+#
+import hashlib
+import os
+
+from ph_basic_processing.persistent_caches import load_persistent_cache, save_persistent_cache
+
+
+#
+# GLOBAL VARIABLES
+#
+FILENAME_INDEXES = {}   # For caching FilenameIndex objects.  Keys are absolute paths of the root directories they index.  Values are the FilenameIndex objects
+FILE_ENTRY = 0      # An entry that os.walk() would list among a folder's files
+DIR_ENTRY = 1       # An entry that os.walk() would list among a folder's dirs, and descend into
+LINKED_DIR_ENTRY = 2    # A symbolic link to a folder, which os.walk() lists among a folder's dirs, but doesn't descend into
+
+
+#
+# CLASSES
+#
+class FilenameIndex:
+    """Index of every file and folder in the directory tree under a root directory.
+    Attributes are as follows:
+    self.root: str.                 Absolute path of the root directory.
+    self.entries_of_dirs: dict.     Keys are the absolute paths of every folder in the tree, in the order that os.walk() visits them.  Values are a tuple containing (the folder's modification time in nanoseconds, a list of (name, kind) tuples for its entries in the order that os.listdir() gives them, where kind is one of FILE_ENTRY, DIR_ENTRY, or LINKED_DIR_ENTRY).
+    self.paths_of_names: dict.      Keys are filenames (with file extension).  Values are lists of the absolute paths of every file by that name in the tree, in the order that os.walk() finds them.  Built the first time it's needed.
+    """
+
+    def __init__(self, root: str, entries_of_dirs=None) -> None:
+        """
+        :param root:                absolute path of the root directory
+        :param entries_of_dirs:     entries_of_dirs as described in the class docstring, such as from an index saved earlier, which refresh() then brings up to date
+        """
+        # Handle errors
+        # root not a string
+        if not isinstance(root, str):
+            raise TypeError("root must be a string")
+        # root not absolute
+        if not os.path.isabs(root):
+            raise ValueError("root must be an absolute path")
+
+        self.root = root
+        self.entries_of_dirs = entries_of_dirs if entries_of_dirs is not None else {}
+        self.paths_of_names = None
+
+    def refresh(self) -> bool:
+        """Bring the index up to date with the directory tree, rescanning only the folders whose modification times have
+        changed since they were last scanned, along with any new folders.  Return whether anything changed.
+        """
+        old_entries_of_dirs = self.entries_of_dirs
+        self.entries_of_dirs = {}
+        changed = False
+        dirs_to_visit = [self.root]
+        while len(dirs_to_visit) > 0:
+            this_dir = dirs_to_visit.pop()
+            try:
+                mtime_ns = os.stat(this_dir).st_mtime_ns
+            except OSError as err:
+                changed = changed or this_dir in old_entries_of_dirs
+                continue
+            old_entry = old_entries_of_dirs.get(this_dir)
+            if old_entry is not None and old_entry[0] == mtime_ns:
+                entries = old_entry[1]
+            else:
+                entries = scan_dir(this_dir)
+                changed = True
+            self.entries_of_dirs[this_dir] = (mtime_ns, entries)
+            # Visit subfolders next, in the order they're listed, as os.walk() does
+            dirs_to_visit.extend(os.path.join(this_dir, name) for name, kind in reversed(entries) if kind == DIR_ENTRY)
+        changed = changed or len(self.entries_of_dirs) != len(old_entries_of_dirs)
+        if changed:
+            self.paths_of_names = None
+        return changed
+
+    def paths_of(self, name: str) -> list:
+        """Return the absolute paths of every file named name (including file extension) in the tree, in the order that
+        os.walk() would find them.
+        """
+        if self.paths_of_names is None:
+            self.paths_of_names = {}
+            for this_dir, (mtime_ns, entries) in self.entries_of_dirs.items():
+                for entry_name, kind in entries:
+                    if kind == FILE_ENTRY:
+                        self.paths_of_names.setdefault(entry_name, []).append(os.path.join(this_dir, entry_name))
+        return self.paths_of_names.get(name, [])
+
+    def names_in(self, directory: str) -> list:
+        """Return the names of the entries of directory, a folder in the tree, in the order that os.listdir() gives them.
+        If the folder has changed since it was last scanned, rescan it first.
+        """
+        mtime_ns = os.stat(directory).st_mtime_ns
+        entry = self.entries_of_dirs.get(directory)
+        if entry is None or entry[0] != mtime_ns:
+            entry = (mtime_ns, scan_dir(directory))
+            self.entries_of_dirs[directory] = entry
+            self.paths_of_names = None
+        return [name for name, kind in entry[1]]
+
+
+#
+# HELPER FUNCTIONS
+#
+def scan_dir(directory: str) -> list:
+    """Return a list of (name, kind) tuples for the entries of directory, as described in FilenameIndex, in the order that
+    os.listdir() gives them.  Folders that can't be read are taken to be empty, as os.walk() does.
+    """
+    entries = []
+    try:
+        with os.scandir(directory) as dir_entries:
+            for dir_entry in dir_entries:
+                try:
+                    is_dir = dir_entry.is_dir()
+                except OSError as err:
+                    is_dir = False
+                if not is_dir:
+                    entries.append((dir_entry.name, FILE_ENTRY))
+                elif dir_entry.is_symlink():
+                    entries.append((dir_entry.name, LINKED_DIR_ENTRY))
+                else:
+                    entries.append((dir_entry.name, DIR_ENTRY))
+    except OSError as err:
+        pass
+    return entries
+
+
+def get_filename_index(root: str, refresh=False) -> FilenameIndex:
+    """Return the FilenameIndex of the directory tree under root, an absolute path.  The first time a root is asked for
+    in a run of py-holmes, its index is loaded from disk, brought up to date, and saved again if anything changed.  Later
+    calls return the same index as is, unless refresh == True, in which case it's brought up to date again.
+    """
+    root = os.path.abspath(root)
+    cache_name = get_cache_name_of_root(root)
+    filename_index = FILENAME_INDEXES.get(root)
+    if filename_index is None:
+        saved = load_persistent_cache(cache_name)
+        filename_index = FilenameIndex(root, entries_of_dirs=saved if isinstance(saved, dict) else None)
+        FILENAME_INDEXES[root] = filename_index
+        refresh = True
+    if refresh and filename_index.refresh():
+        save_persistent_cache(cache_name, filename_index.entries_of_dirs)
+    return filename_index
+
+
+def get_cache_name_of_root(root: str) -> str:
+    """Return the name of the persistent cache that the FilenameIndex of the tree under root, an absolute path, is kept
+    in.
+    """
+    return "filename_index_" + hashlib.sha1(root.encode("utf-8")).hexdigest()
+
+
+def names_in_directory(directory: str, root=None) -> list:
+    """Return the names of the entries of directory, an absolute path, in the order that os.listdir() gives them.
+    If directory is in the index of the tree under root (or of any tree indexed already), it's looked up there, and only
+    rescanned if it's changed.  Any other folder is listed directly.
+    """
+    if root is not None:
+        get_filename_index(root)
+    for filename_index in FILENAME_INDEXES.values():
+        if directory in filename_index.entries_of_dirs:
+            return filename_index.names_in(directory)
+    return os.listdir(directory)
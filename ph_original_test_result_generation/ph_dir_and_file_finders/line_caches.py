@@ -0,0 +1,160 @@
+"""Classes and functions for reading lines of source files on demand, while holding only a bounded amount of them in
+memory.  Each file is mapped into memory with mmap just long enough to find the offset of each of its lines, and only
+those offsets are kept; lines are then read from the file with ordinary reads, so no file is held open or mapped between
+reads.  Files are evicted least-recently-used first once their line offsets take up more than a set number of bytes.
+"""
+
+
+#
+# IMPORTS
+#
+import mmap
+import os
+from array import array
+from collections import OrderedDict
+
+
+#
+# GLOBAL VARIABLES
+#
+LINE_CACHE_MAX_BYTES = 64 * 1024 * 1024     # Most bytes of line offsets held by LINE_CACHE at once
+
+
+#
+# CLASSES
+#
+class CachedFile:
+    """A source file held by a LineCache.
+    Attributes are as follows:
+    self.path: str.             The absolute path of the file.
+    self.version: tuple.        The file's (modification time in nanoseconds, size in bytes, inode number) when it was read, which changes whenever the file does.
+    self.size: int.             The size of the file in bytes when it was read.
+    self.line_offsets: array.   The byte offset at which each line starts, followed by the size of the file, so that line n (counting from 1) spans line_offsets[n-1] to line_offsets[n].
+    self.nbytes: int.           The number of bytes counted against the LineCache's budget for this file.
+    """
+
+    __slots__ = ("path", "version", "size", "line_offsets", "nbytes")
+
+    def __init__(self, path: str) -> None:
+        """Read the file at path, an absolute path, finding where each of its lines starts."""
+        self.path = path
+        with open(path, "rb") as file:
+            stat_result = os.fstat(file.fileno())
+            self.version = (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+            self.size = stat_result.st_size
+            self.line_offsets = array("Q", [0])
+            if self.size > 0:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+                    position = mapping.find(b"\n")
+                    while position != -1:
+                        self.line_offsets.append(position + 1)
+                        position = mapping.find(b"\n", position + 1)
+        if self.line_offsets[-1] != self.size:
+            self.line_offsets.append(self.size)     # The last line has no newline
+        self.nbytes = self.line_offsets.itemsize * len(self.line_offsets)
+
+    def number_of_lines(self) -> int:
+        """Return the number of lines in the file."""
+        return len(self.line_offsets) - 1
+
+    def getline(self, line_number: int) -> str:
+        """Return line line_number of the file (counting from 1), with its newline, or "" if there's no such line.  As
+        when reading a file in text mode, a line ending in "\r\n" is given as ending in "\n".
+        """
+        if not 1 <= line_number < len(self.line_offsets):
+            return ""
+        start = self.line_offsets[line_number - 1]
+        end = self.line_offsets[line_number]
+        with open(self.path, "rb") as file:
+            file.seek(start)
+            line_bytes = file.read(end - start)
+        return decoded_line(line_bytes)
+
+    def lines(self) -> list:
+        """Return every line of the file, with their newlines, as getline() gives them, reading the file only once."""
+        with open(self.path, "rb") as file:
+            content = file.read(self.size)
+        offsets = self.line_offsets
+        return [decoded_line(content[offsets[index]:offsets[index + 1]]) for index in range(len(offsets) - 1)]
+
+
+class LineCache:
+    """Least-recently-used cache of CachedFile objects, keyed by absolute path, holding at most max_bytes bytes of them
+    (though always at least the file most recently used).
+    Attributes are as follows:
+    self.max_bytes: int.        The budget described above.
+    self.files: OrderedDict.    Keys are absolute filepaths.  Values are CachedFile objects.  Ordered from least to most recently used.
+    self.bytes_used: int.       The sum of the nbytes of every CachedFile held.
+    """
+
+    def __init__(self, max_bytes=LINE_CACHE_MAX_BYTES) -> None:
+        # Handle errors
+        # max_bytes not a positive int
+        if not isinstance(max_bytes, int) or max_bytes <= 0:
+            raise ValueError("max_bytes must be a positive int")
+
+        self.max_bytes = max_bytes
+        self.files = OrderedDict()
+        self.bytes_used = 0
+
+    def get(self, path: str, revalidate=False) -> CachedFile:
+        """Return the CachedFile for path, an absolute path, reading the file if it isn't held.  If revalidate == True,
+        the file is also read again if it's changed in any way since it was read.
+        """
+        cached_file = self.files.get(path)
+        if cached_file is not None:
+            if revalidate and file_version_of(path) != cached_file.version:
+                self.forget(path)
+                cached_file = None
+            else:
+                self.files.move_to_end(path)
+        if cached_file is None:
+            cached_file = CachedFile(path)
+            self.files[path] = cached_file
+            self.bytes_used += cached_file.nbytes
+            while self.bytes_used > self.max_bytes and len(self.files) > 1:
+                self.forget(next(iter(self.files)))
+        return cached_file
+
+    def getline(self, path: str, line_number: int, revalidate=False) -> str:
+        """Return line line_number of the file at path (counting from 1), as in CachedFile.getline()."""
+        return self.get(path, revalidate=revalidate).getline(line_number)
+
+    def lines(self, path: str) -> list:
+        """Return every line of the file at path, with their newlines, as file.readlines() would."""
+        return self.get(path).lines()
+
+    def version_of(self, path: str) -> tuple:
+        """Return the version of the file at path, as held in the cache, which changes whenever the file is read anew."""
+        return self.get(path).version
+
+    def forget(self, path: str) -> None:
+        """Stop holding the file at path, if it's held."""
+        cached_file = self.files.pop(path, None)
+        if cached_file is not None:
+            self.bytes_used -= cached_file.nbytes
+
+
+#
+# HELPER FUNCTIONS
+#
+def decoded_line(line_bytes: bytes) -> str:
+    """Return line_bytes, a line of a file, decoded as UTF-8, with a "\r\n" ending given as "\n"."""
+    line = line_bytes.decode("utf-8")
+    if line.endswith("\r\n"):
+        line = line[:-2] + "\n"
+    return line
+
+
+def file_version_of(path: str) -> tuple:
+    """Return the (modification time in nanoseconds, size in bytes, inode number) of the file at path, as in
+    CachedFile.version.
+    """
+    stat_result = os.stat(path)
+    return stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino
+
+
+#
+# GLOBAL CACHE
+#
+LINE_CACHE = LineCache()    # The line cache shared by all of py-holmes
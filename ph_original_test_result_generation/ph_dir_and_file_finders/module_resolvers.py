@@ -0,0 +1,68 @@
+"""Functions for resolving dotted module names, as they appear in import lines, to the folders and .py files they could
+refer to.  Each folder is listed once per run of py-holmes, and every name resolved (including names that resolve to
+nothing) is remembered, so that every TestMethod resolves its imports from the same shared lookups.
+"""
+
+
+#
+# IMPORTS
+#
+from os import path
+
+from ph_variable_sharing import shared_variables
+from ph_original_test_result_generation.ph_dir_and_file_finders.filename_indexes import names_in_directory
+
+
+#
+# GLOBAL VARIABLES
+#
+LEADS_IN_DIRECTORIES = {}   # For caching results of leads_in_directory().  Keys are absolute paths of folders.  Values are dicts whose keys are names that a chunk of an import could match (a .py file's name without its file extension, or the full name of anything else) and whose values are lists of the lead tuples matching that name, in the order that os.listdir() gives them
+LEADS_OF_DOTTED_NAMES = {}  # For caching results of leads_matching_dotted_name().  Keys are tuples containing (an absolute folder path, a dotted name, files_only).  Values are tuples of lead tuples, which are empty for names matching nothing
+
+shared_variables.initialize()
+ROOT_DIR = shared_variables.ROOT_DIR
+
+
+#
+# HELPER FUNCTIONS
+#
+def leads_in_directory(directory: str) -> dict:
+    """Return a dict mapping each name that a chunk of an import could match in directory, an absolute path, to the lead
+    tuples (described in TestMethod.calculate_all_imports_and_files_methods_and_classes_testing()) matching it.
+    Each .py file is matched by its name without its file extension, as a "file" lead, and anything else by its full
+    name, as a "dir" lead.  directory is only listed the first time it's asked about.
+    """
+    leads_of_names = LEADS_IN_DIRECTORIES.get(directory)
+    if leads_of_names is None:
+        leads_of_names = {}
+        for contained in names_in_directory(directory, root=ROOT_DIR):
+            contained_path = path.join(directory, contained)
+            if contained.endswith(".py"):
+                leads_of_names.setdefault(contained[:-3], []).append(("file", contained_path, contained_path))
+            else:
+                leads_of_names.setdefault(contained, []).append(("dir", contained_path, contained_path))
+        LEADS_IN_DIRECTORIES[directory] = leads_of_names
+    return leads_of_names
+
+
+def leads_matching_dotted_name(directory: str, name: str, files_only=False) -> list:
+    """Return a list of all folders and .py files in directory matching name, after removing .py file extension, as
+    TestMethod.python_files_and_folders_in_directory_matching_name() describes.  If name is a series of chunks connected
+    by dots, each chunk but the last is followed into the folders matching it, and only .py files matching the last chunk
+    are returned, so files_only must be True.
+    """
+    key = (directory, name, files_only)
+    leads = LEADS_OF_DOTTED_NAMES.get(key)
+    if leads is None:
+        if "." not in name:
+            leads = tuple(leads_in_directory(directory).get(name, []))
+        elif files_only:
+            chunks = name.split(".")
+            directories = [directory]
+            for this_chunk in chunks[:-1]:
+                directories = [lead[1] for this_directory in directories for lead in leads_in_directory(this_directory).get(this_chunk, []) if lead[0] == "dir"]
+            leads = tuple(lead for this_directory in directories for lead in leads_in_directory(this_directory).get(chunks[-1], []) if lead[0] == "file")
+        else:
+            raise NotImplementedError("not yet designed to handle names with '.'s when directories are desired in addition to files")
+        LEADS_OF_DOTTED_NAMES[key] = leads
+    return list(leads)
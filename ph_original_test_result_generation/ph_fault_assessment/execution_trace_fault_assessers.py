@@ -6,13 +6,14 @@ fault, or is a separate package they're using (eg numpy) at fault instead?
 #
 # HELPER FUNCTIONS
 #
-def user_at_fault(post_processed_trace: str, non_ignored_user_descendant_lines: list, original_test_module: str, user_and_py_holmes_modules: list) -> bool:
+def user_at_fault(post_processed_trace: str, non_ignored_user_descendant_lines: list, original_test_module: str, user_and_py_holmes_modules: list, failure_stack=None) -> bool:
     """Return True if a piece of user code not in .holmesignore is responsible for a failure.
     Else return False.
     post_processed_trace is the full execution trace.
     non_ignored_user_descendant_lines is a list of indices of the linelogs in post_processed_trace that are descendants of user code not in .holmesignore.
     original_test_module is the filename of the user's unit test module, with or without a file extension
     user_and_py_holmes_modules is a list of module names belonging to the user or py-holmes that were used
+    failure_stack, if given, is the stack at the point of failure as recorded by the tracer, as a list of (modulename, funcname, is_user, is_ignored) tuples starting from the test method.  The fault is then assessed from failure_stack alone, without scanning post_processed_trace.
     """
     # Handle errors
     # post_processed_trace not a string
@@ -28,10 +29,18 @@ def user_at_fault(post_processed_trace: str, non_ignored_user_descendant_lines:
     if not isinstance(original_test_module, str):
         raise TypeError("original_test_module must be a string")
 
+    # failure_stack not a list or None
+    if not isinstance(failure_stack, list) and failure_stack is not None:
+        raise TypeError("failure_stack must be a list or None")
+
     # Remove the ".py" file extension from the end of original_test_module if it is there.
     if original_test_module.endswith(".py"):
         original_test_module = original_test_module[:-3]
 
+    # If the tracer recorded the stack at the point of failure, there's no need to search the trace
+    if failure_stack is not None:
+        return user_at_fault_from_failure_stack(failure_stack, original_test_module)
+
     # Find the failure (not error) line in the execution trace (Python source code, not a user-written line).
     trace_as_list = post_processed_trace.split("\n")
     index_of_failing_line = find_index_of_failing_line(trace_as_list)
@@ -78,6 +87,26 @@ def user_at_fault(post_processed_trace: str, non_ignored_user_descendant_lines:
         raise RuntimeError("Reached top of execution trace without finding a user function.  Perhaps failure happened due to a fundamental Python file?")
 
 
+def user_at_fault_from_failure_stack(failure_stack: list, original_test_module: str) -> bool:
+    """Return True if a piece of user code not in .holmesignore is responsible for a failure, judging by failure_stack,
+    the stack at the point of failure as described in user_at_fault().  Else return False.
+    This makes the same judgment as user_at_fault() does from a trace, since the functions that the trace shows as
+    entered but not yet exited at the failing line are exactly those on the stack.
+    original_test_module is the filename of the user's unit test module, without a file extension
+    """
+    # If the failure is a call-descendant of at least one non-ignored user function, it's the user's fault
+    if any(is_user and not is_ignored for modulename, funcname, is_user, is_ignored in failure_stack):
+        return True
+    # Else, work outward from the failure until reaching either the original test file, in which case it's the user's
+    # fault anyway, or some other user module, in which case it isn't
+    for modulename, funcname, is_user, is_ignored in reversed(failure_stack):
+        if modulename == original_test_module:
+            return True
+        elif is_user:
+            return False
+    raise RuntimeError("Reached top of failure stack without finding a user function.  Perhaps failure happened due to a fundamental Python file?")
+
+
 def find_index_of_failing_line(trace_list: list) -> int:
     """Given a post-processed execution trace as a list, get the index of the failing line.
     This line is a *failing* line (ie causes a unit test to fail), not an error line (which causes a code crash).
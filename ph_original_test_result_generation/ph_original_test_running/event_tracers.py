@@ -0,0 +1,902 @@
+"""Classes and functions for tracing the execution of a test as a stream of structured events, rather than as text
+printed by the trace module, and for keeping execution traces apart from whatever the traced test prints.
+"""
+
+
+#
+# IMPORTS
+#
+import functools
+import io
+import linecache
+import os
+import sys
+import threading
+import trace
+from time import perf_counter
+from warnings import warn
+
+from ph_basic_processing.parsers import matches_an_ignore_pattern
+from ph_basic_processing.trace_exit_line_adders import ParsedTraceline
+from ph_original_test_result_generation.ph_dir_and_file_finders.pathfinders import FILES_ALREADY_FOUND, PLATFORM_PYTHON_PATH, file_contains_content_on_line, note_path_of_running_file, classify_path
+from ph_variable_sharing import shared_variables
+
+
+#
+# GLOBAL VARIABLES
+#
+TRACE_BACKENDS = ["trace", "settrace", "monitoring"]  # Tracing backends that can be chosen with --trace_backend.  "trace" prints text with the trace module; every other backend records events.  "monitoring" falls back to "settrace" where sys.monitoring is unavailable (before Python 3.12).
+TRACE_SCOPES = ["all", "user"]  # Which frames are traced line by line, chosen with --trace_scope.  "all" traces every frame; "user" traces only frames of user, py-holmes, and .holmessearchextend files, and records calls into anything else as opaque call/return pairs.
+TRACE_GRANULARITIES = ["line", "function"]   # What gets recorded within traced frames, chosen with --trace_granularity.  "line" records every line; "function" records only calls and returns, plus the lines that exceptions are raised in or propagate through.
+CALL_EVENT = 0
+LINE_EVENT = 1
+RETURN_EVENT = 2
+EXCEPTION_EVENT = 3
+FAILURE_RAISING_FILENAME = "case.py"     # unittest's case.py, where a failing assert raises the test's failureException
+USER_OUTPUT_MAX_BYTES = 1000000     # Most characters of whatever a traced test prints that are kept.  Anything it prints after that is dropped.
+FILES_OF_CODE_CHECKED = {}  # Keys are absolute co_filenames that cache_file_of_code() has checked.  Values are whether the file could be added to FILES_ALREADY_FOUND, so that no file is checked twice
+
+
+#
+# CLASSES
+#
+class EventTrace:
+    """An execution trace held as a list of compact event tuples, rather than as printed text.
+    Attributes are as follows:
+    self.events: list.          Tuples of the form (event kind, file id, line number, code object), in the order they happened.  The event kind is one of CALL_EVENT, LINE_EVENT, RETURN_EVENT, or EXCEPTION_EVENT.
+    self.filenames: list.       Absolute filepaths indexed by file id, or pseudo-filenames such as "<string>" for code that isn't from a file.  For call events, the file id refers to the __file__ of the module that the function was called in, which is what the trace module reports as the modulename.  For all other events, it refers to the co_filename of the code object.
+    self.truncated: bool.       Whether the tracer hit its event limit, so that part of the run was recorded at a coarser granularity or not at all.
+    self.failure_stack: list.   The stack at the moment the test's failureException was first raised, as returned by failure_stack_at(), or None if it never was.
+    self.line_events_seen: int. With sampling, the number of line events that happened, recorded or not.
+    self.line_events_sampled: int.  With sampling, the number of line events that were recorded.
+    """
+
+    def __init__(self) -> None:
+        self.events = []
+        self.filenames = []
+        self.truncated = False
+        self.failure_stack = None
+        self.line_events_seen = 0
+        self.line_events_sampled = 0
+
+    def modulename_of(self, file_id: int) -> str:
+        """Return the modulename that the trace module would print for the file with id file_id."""
+        return os.path.splitext(os.path.basename(self.filenames[file_id]))[0]
+
+    def index_of_first_entry(self, modulename: str, funcname: str) -> int:
+        """Return the index of the first call event into funcname within modulename.
+        Raise a RuntimeError if there is no such event.
+        """
+        for ee, (kind, file_id, line_number, code) in enumerate(self.events):
+            if kind == CALL_EVENT and code.co_name == funcname and self.modulename_of(file_id) == modulename:
+                return ee
+        raise RuntimeError(f"no entry into '{funcname}' in '{modulename}' found")
+
+    def tracelines(self, start=0):
+        """Yield the lines that trace.Trace(trace=1) would have printed for the events from index start onward, one line
+        at a time and without trailing newlines.
+        """
+        # Make sure that linecache doesn't serve stale content for files that changed since they were last cached, such
+        # as regenerated files of fuzzed tests
+        for filename in self.filenames:
+            linecache.checkcache(filename)
+
+        for kind, file_id, line_number, code in self.events[start:]:
+            if kind == CALL_EVENT:
+                yield f" --- modulename: {self.modulename_of(file_id)}, funcname: {code.co_name}"
+            elif kind == LINE_EVENT:
+                filename = self.filenames[file_id]
+                line_content = linecache.getline(filename, line_number)
+                if line_content.endswith("\n"):
+                    line_content = line_content[:-1]
+                yield f"{os.path.basename(filename)}({line_number}): {line_content}"
+
+    def parsed_tracelines(self, start=0, function_level=False) -> list:
+        """Return a list of ParsedTraceline objects for the events from index start onward, built directly from the
+        events rather than by parsing printed text.
+        If function_level == True, the events are taken to be from a tracer with granularity "function", which records
+        too few lines for exits to be inferred from them.  Return events then become functionexit lines, and the file of
+        each called function is looked up, so that whether it's user code is known without any of its lines.
+        """
+        # Make sure that linecache doesn't serve stale content for files that changed since they were last cached
+        for filename in self.filenames:
+            linecache.checkcache(filename)
+
+        parsed_lines = []
+        modulenames_entered = []    # Modulenames of the calls not yet returned from, for labelling return events like the calls they return from
+        for kind, file_id, line_number, code in self.events[start:]:
+            if kind == CALL_EVENT:
+                modulename = self.modulename_of(file_id)
+                parsed_lines.append(ParsedTraceline.from_functioncall(modulename, code.co_name))
+                if function_level:
+                    modulenames_entered.append(modulename)
+                    cache_file_of_code(code)
+            elif kind == RETURN_EVENT:
+                if function_level and modulenames_entered:   # Returns from calls made before start are skipped
+                    parsed_lines.append(ParsedTraceline.from_functionexit(modulenames_entered.pop(), code.co_name))
+            elif kind == LINE_EVENT:
+                filename = self.filenames[file_id]
+                line_content = linecache.getline(filename, line_number)
+                if line_content.endswith("\n"):
+                    line_content = line_content[:-1]
+                parsed_lines.append(ParsedTraceline.from_linelog(os.path.basename(filename), line_number, line_content))
+        return parsed_lines
+
+    def line_weight(self) -> float:
+        """Return the number of line events that each recorded line event stands for, which is 1 unless lines were
+        sampled.
+        """
+        if self.line_events_sampled == 0:
+            return 1.0
+        return self.line_events_seen / self.line_events_sampled
+
+    def parsed_tracelines_from_entry(self, modulename: str, funcname: str, function_level=False) -> list:
+        """Return a list of ParsedTraceline objects for all events from the first entry into funcname within modulename
+        onward.  This is the event-based equivalent of remove_before_user_runtime() and
+        remove_before_function_runtime().  function_level is as in parsed_tracelines().
+        """
+        return self.parsed_tracelines(start=self.index_of_first_entry(modulename, funcname), function_level=function_level)
+
+
+class EventTracer:
+    """Tracer built on sys.settrace() that records call, line, return, and exception events into an EventTrace.
+    With scope "all", which frames get traced matches trace.Trace(count=0, trace=1, countfuncs=0, countcallers=0,
+    ignoremods=(), ignoredirs=()), so that the lines rendered from the events are the lines that the trace module would
+    have printed.
+    With scope "user", only frames whose code is in scope (see is_in_trace_scope()) are traced line by line.  A frame
+    whose code is out of scope but whose caller is in scope is recorded as an opaque call/return pair, with line events
+    disabled inside it.  Out-of-scope frames called from other out-of-scope frames are not recorded at all.
+    With granularity "function", line events are disabled in every frame, so only calls, returns, and exceptions are
+    recorded, along with the line of each frame that an exception is raised in or propagates through.
+    If max_events is given, a run that records max_events events switches to granularity "function" for the rest of the
+    run, and one that records max_events more stops being recorded altogether.  Either way, the trace is marked as
+    truncated.
+    If sample_every or sample_interval is given, line events are sampled per code object: either every sample_every-th
+    line event of each code object is recorded, starting with the first, or at most one line event per sample_interval
+    seconds is.  Calls, returns, and exceptions are still all recorded, as is the line of each frame that an exception
+    is raised in or propagates through.
+    """
+
+    def __init__(self, scope="all", granularity="line", max_events=None, sample_every=None, sample_interval=None) -> None:
+        # Handle errors
+        # scope not a known scope
+        if scope not in TRACE_SCOPES:
+            raise ValueError("scope must be one of " + str(TRACE_SCOPES))
+        # granularity not a known granularity
+        if granularity not in TRACE_GRANULARITIES:
+            raise ValueError("granularity must be one of " + str(TRACE_GRANULARITIES))
+        # max_events not a positive int or None
+        if max_events is not None and (not isinstance(max_events, int) or max_events <= 0):
+            raise ValueError("max_events must be a positive int or None")
+        # sample_every not a positive int or None
+        if sample_every is not None and (not isinstance(sample_every, int) or sample_every <= 0):
+            raise ValueError("sample_every must be a positive int or None")
+        # sample_interval not a positive number or None
+        if sample_interval is not None and (not isinstance(sample_interval, (int, float)) or sample_interval <= 0):
+            raise ValueError("sample_interval must be a positive number or None")
+        # both sample_every and sample_interval given
+        if sample_every is not None and sample_interval is not None:
+            raise ValueError("at most one of sample_every and sample_interval may be given")
+        # sampling lines that aren't traced
+        if granularity != "line" and (sample_every is not None or sample_interval is not None):
+            raise ValueError("line events can only be sampled with granularity 'line'")
+
+        self.trace = EventTrace()
+        self.file_ids = {}      # Maps each filename seen so far to its index in self.trace.filenames
+        self.scope = scope
+        self.granularity = granularity
+        self.trace_lines = granularity == "line"    # Whether line events are switched on in traced frames
+        self.max_events = max_events
+        self.event_limit = max_events if max_events is not None else sys.maxsize    # Number of events at which the tracer next coarsens or stops
+        self.code_in_scope = {}     # Maps each code object seen so far to whether it's in scope, so that each code object is only classified once
+        self.sample_every = sample_every
+        self.sample_interval = sample_interval
+        self.sampling = sample_every is not None or sample_interval is not None
+        self.line_events_seen_of_code = {}  # With sample_every, maps each code object to the number of its line events so far
+        self.last_sample_time_of_code = {}  # With sample_interval, maps each code object to when its last line event was recorded
+        if scope == "user":
+            self.globaltrace = self.globaltrace_user_scope
+            self.searchextend_patterns = shared_variables.get_searchextend_patterns()
+        if granularity == "function":
+            self.localtrace = self.functiontrace
+        elif self.sampling:
+            self.localtrace = self.sampledtrace
+
+    def file_id_of(self, filename: str) -> int:
+        """Return the file id for filename, adding its absolute path to the trace's filenames if it hasn't been seen yet.
+        The path is also noted as that of a running file, so that the file can be found later without searching for it.
+        """
+        file_id = self.file_ids.get(filename)
+        if file_id is None:
+            file_id = len(self.trace.filenames)
+            self.file_ids[filename] = file_id
+            if not filename.startswith("<"):
+                note_path_of_running_file(filename)
+                filename = os.path.abspath(filename)
+            self.trace.filenames.append(filename)
+        return file_id
+
+    def globaltrace(self, frame, why, arg):
+        """Handler for call events.  Frames of modules without a __file__ (eg frozen modules and exec'd strings) are not
+        traced, just as with the trace module.
+        """
+        if why == "call":
+            filename = frame.f_globals.get("__file__", None)
+            if filename:
+                self.trace.events.append((CALL_EVENT, self.file_id_of(filename), frame.f_lineno, frame.f_code))
+                if len(self.trace.events) >= self.event_limit:
+                    self.on_event_limit(frame)
+                frame.f_trace_lines = self.trace_lines
+                return self.localtrace
+        return None
+
+    def globaltrace_user_scope(self, frame, why, arg):
+        """Handler for call events when tracing with scope "user".  Frames of modules without a __file__ are not traced,
+        just as with globaltrace().
+        """
+        if why == "call":
+            filename = frame.f_globals.get("__file__", None)
+            if filename:
+                if self.is_code_in_scope(frame.f_code):
+                    self.trace.events.append((CALL_EVENT, self.file_id_of(filename), frame.f_lineno, frame.f_code))
+                    if len(self.trace.events) >= self.event_limit:
+                        self.on_event_limit(frame)
+                    frame.f_trace_lines = self.trace_lines
+                    return self.localtrace
+                caller = frame.f_back
+                if caller is None or self.is_code_in_scope(caller.f_code):
+                    self.trace.events.append((CALL_EVENT, self.file_id_of(filename), frame.f_lineno, frame.f_code))
+                    frame.f_trace_lines = False
+                    return self.opaquetrace
+        return None
+
+    def is_code_in_scope(self, code) -> bool:
+        """Return whether frames running code should be traced line by line, classifying code if it hasn't been seen
+        yet.
+        """
+        in_scope = self.code_in_scope.get(code)
+        if in_scope is None:
+            in_scope = is_in_trace_scope(code.co_filename, self.searchextend_patterns)
+            self.code_in_scope[code] = in_scope
+        return in_scope
+
+    def localtrace(self, frame, why, arg):
+        """Handler for line, return, and exception events within a traced frame."""
+        code = frame.f_code
+        if why == "line":
+            self.trace.events.append((LINE_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+            if len(self.trace.events) >= self.event_limit:
+                self.on_event_limit(frame)
+        elif why == "return":
+            self.trace.events.append((RETURN_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+        elif why == "exception":
+            self.trace.events.append((EXCEPTION_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+            if self.trace.failure_stack is None:
+                self.trace.failure_stack = failure_stack_at(frame, arg[1], arg[2])
+        return self.localtrace
+
+    def sampledtrace(self, frame, why, arg):
+        """Handler for line, return, and exception events within a traced frame, when sampling line events."""
+        code = frame.f_code
+        if why == "line":
+            if self.is_line_sampled(code):
+                self.trace.events.append((LINE_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+                if len(self.trace.events) >= self.event_limit:
+                    self.on_event_limit(frame)
+        elif why == "return":
+            self.trace.events.append((RETURN_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+        elif why == "exception":
+            self.record_unsampled_raise_line(frame, code, arg[1])
+            self.trace.events.append((EXCEPTION_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+            if self.trace.failure_stack is None:
+                self.trace.failure_stack = failure_stack_at(frame, arg[1], arg[2])
+        return self.sampledtrace
+
+    def is_line_sampled(self, code) -> bool:
+        """Return whether the line event now happening in code should be recorded, keeping count of line events either
+        way.
+        """
+        self.trace.line_events_seen += 1
+        if self.sample_every is not None:
+            line_events_seen = self.line_events_seen_of_code.get(code, 0)
+            self.line_events_seen_of_code[code] = line_events_seen + 1
+            sampled = line_events_seen % self.sample_every == 0
+        else:
+            now = perf_counter()
+            sampled = now - self.last_sample_time_of_code.get(code, float("-inf")) >= self.sample_interval
+            if sampled:
+                self.last_sample_time_of_code[code] = now
+        if sampled:
+            self.trace.line_events_sampled += 1
+        return sampled
+
+    def record_unsampled_raise_line(self, frame, code, exception) -> None:
+        """Record the line of frame that exception was raised in or propagated through, unless it was sampled already, so
+        that the failing line of a test appears in sampled traces too.  StopIteration is left out, as in functiontrace().
+        """
+        line_event = (LINE_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code)
+        if not isinstance(exception, StopIteration) and self.trace.events[-1:] != [line_event]:
+            self.trace.events.append(line_event)
+
+    def stoppedtrace(self, frame, why, arg):
+        """Handler for any event once the tracer has stopped recording.  Returning None switches tracing off for the
+        frame.
+        """
+        return None
+
+    def on_event_limit(self, frame) -> None:
+        """Handle the trace reaching self.event_limit events while frame runs.  The first time, switch to granularity
+        "function" for the rest of the run, if not there already.  Otherwise, stop recording.
+        """
+        self.trace.truncated = True
+        if self.trace_lines:
+            self.switch_to_function_granularity(frame)
+            self.event_limit = len(self.trace.events) + self.max_events
+        else:
+            self.stop_recording(frame)
+
+    def switch_to_function_granularity(self, frame) -> None:
+        """Switch off line events, both for frames called from now on and for frame and the frames that called it."""
+        line_level_localtrace = self.localtrace
+        self.trace_lines = False
+        self.granularity = "function"
+        self.localtrace = self.functiontrace
+        while frame is not None:
+            if frame.f_trace == line_level_localtrace:
+                frame.f_trace_lines = False
+                frame.f_trace = self.functiontrace
+            frame = frame.f_back
+
+    def stop_recording(self, frame) -> None:
+        """Stop recording events, both for frames called from now on and for frame and the frames that called it."""
+        sys.settrace(None)
+        self.globaltrace = self.localtrace = self.functiontrace = self.opaquetrace = self.stoppedtrace
+        stop_tracing_frames(frame)
+
+    def functiontrace(self, frame, why, arg):
+        """Handler for return and exception events within a traced frame, when tracing with granularity "function".
+        Line events are disabled, but the line that an exception is raised in or propagates through is still recorded,
+        so that the failing line of a test (eg the self._raiseFailure() call in unittest's case.py) appears in the trace.
+        StopIteration is left out, since it only signals the end of an iterator.
+        """
+        code = frame.f_code
+        if why == "return":
+            self.trace.events.append((RETURN_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+            if len(self.trace.events) >= self.event_limit:
+                self.on_event_limit(frame)
+        elif why == "exception":
+            if not issubclass(arg[0], StopIteration):
+                self.trace.events.append((LINE_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+            self.trace.events.append((EXCEPTION_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+            if self.trace.failure_stack is None:
+                self.trace.failure_stack = failure_stack_at(frame, arg[1], arg[2])
+        return self.functiontrace
+
+    def opaquetrace(self, frame, why, arg):
+        """Handler for return and exception events within an opaque frame, ie an out-of-scope frame called from an
+        in-scope one.  Line events are disabled for such frames.
+        When an exception raised entirely within out-of-scope code reaches an opaque frame, the path it took from the
+        opaque frame to the line that raised it is recorded as call and line events.  This way, the failing line of a
+        test (eg the self._raiseFailure() call in unittest's case.py) still appears in the trace.
+        """
+        code = frame.f_code
+        if why == "return":
+            self.trace.events.append((RETURN_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+        elif why == "exception":
+            self.record_raise_path(arg[2])
+            self.trace.events.append((EXCEPTION_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+            if self.trace.failure_stack is None:
+                self.trace.failure_stack = failure_stack_at(frame, arg[1], arg[2])
+        return self.opaquetrace
+
+    def record_raise_path(self, traceback) -> None:
+        """Given the traceback of an exception as it reaches an opaque frame, record the path the exception took from that
+        frame down to the line that raised it, as call and line events, followed by a return event for each of those calls.
+        Nothing is recorded if any frame below the opaque frame is in scope, since then those frames were traced already.
+        """
+        # Collect the traceback entries from the opaque frame down to the line that raised the exception
+        raise_path = []
+        this_traceback = traceback
+        while this_traceback is not None:
+            raise_path.append(this_traceback)
+            this_traceback = this_traceback.tb_next
+        # If any frame below the opaque frame is in scope, the raise path was already traced
+        if any(self.is_code_in_scope(this_traceback.tb_frame.f_code) for this_traceback in raise_path[1:]):
+            return
+        codes_called = []
+        for tt, this_traceback in enumerate(raise_path):
+            this_frame = this_traceback.tb_frame
+            this_code = this_frame.f_code
+            if tt > 0:
+                filename = this_frame.f_globals.get("__file__", None)
+                if not filename:
+                    break
+                self.trace.events.append((CALL_EVENT, self.file_id_of(filename), this_code.co_firstlineno, this_code))
+                codes_called.append(this_code)
+            self.trace.events.append((LINE_EVENT, self.file_id_of(this_code.co_filename), this_traceback.tb_lineno, this_code))
+        # Those frames have all been exited by the time the exception reaches the opaque frame
+        for this_code in reversed(codes_called):
+            self.trace.events.append((RETURN_EVENT, self.file_id_of(this_code.co_filename), this_code.co_firstlineno, this_code))
+
+    def runfunc(self, func, *args, **kwargs):
+        """Call func(*args, **kwargs) while tracing, and return whatever it returns."""
+        threading.settrace(self.globaltrace)
+        sys.settrace(self.globaltrace)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sys.settrace(None)
+            threading.settrace(None)
+
+    def results(self) -> EventTrace:
+        """Return the EventTrace recorded so far."""
+        return self.trace
+
+
+class MonitoringEventTracer(EventTracer):
+    """Tracer built on sys.monitoring (Python 3.12+) that records the same events into an EventTrace as EventTracer does.
+    Start, throw, raise, and unwind events are monitored globally.  Line, return, yield, and resume events are only switched
+    on for the code objects that need them, so code that isn't traced line by line runs without any line callbacks at
+    all.  Code of modules without a __file__ is disabled entirely after its first call.
+    """
+
+    def __init__(self, scope="all", granularity="line", max_events=None, sample_every=None, sample_interval=None) -> None:
+        super().__init__(scope=scope, granularity=granularity, max_events=max_events, sample_every=sample_every, sample_interval=sample_interval)
+        self.code_with_local_events = {}    # Maps each code object that has had local events switched on to those events
+        self.opaque_frames = set()  # Frames currently recorded as opaque calls, ie out-of-scope frames called from in-scope frames
+        self.tool_id = None
+
+    def is_frame_traced(self, frame) -> bool:
+        """Return whether frame is traced line by line."""
+        return self.scope == "all" or self.is_code_in_scope(frame.f_code)
+
+    def switch_on_local_events(self, code, events: int) -> None:
+        """Switch on events for code, in addition to any already switched on for it."""
+        current_events = self.code_with_local_events.get(code, 0)
+        if current_events | events != current_events:
+            self.code_with_local_events[code] = current_events | events
+            sys.monitoring.set_local_events(self.tool_id, code, current_events | events)
+
+    def on_start(self, code, instruction_offset):
+        """Handler for PY_START and PY_RESUME events, the equivalent of EventTracer.globaltrace()."""
+        if not self.record_start(sys._getframe(1), code):
+            return sys.monitoring.DISABLE
+        if len(self.trace.events) >= self.event_limit:
+            self.on_event_limit(sys._getframe(1))
+
+    def on_throw(self, code, instruction_offset, exception):
+        """Handler for PY_THROW events, ie a generator being resumed by throw().  settrace reports these as calls."""
+        self.record_start(sys._getframe(1), code)
+
+    def record_start(self, frame, code) -> bool:
+        """Record the start or resumption of frame, which is running code, and switch on whichever local events code
+        needs from now on.  Return False if frame belongs to a module without a __file__, which is never traced.
+        """
+        filename = frame.f_globals.get("__file__", None)
+        if not filename:
+            return False
+        events = sys.monitoring.events
+        if self.is_frame_traced(frame):
+            self.trace.events.append((CALL_EVENT, self.file_id_of(filename), frame.f_lineno, code))
+            if self.trace_lines:
+                self.switch_on_local_events(code, events.LINE | events.PY_RETURN | events.PY_YIELD | events.PY_RESUME)
+            else:
+                self.switch_on_local_events(code, events.PY_RETURN | events.PY_YIELD | events.PY_RESUME)
+        else:
+            caller = frame.f_back
+            if caller is None or self.is_frame_traced(caller):
+                self.trace.events.append((CALL_EVENT, self.file_id_of(filename), frame.f_lineno, code))
+                self.opaque_frames.add(frame)
+                self.switch_on_local_events(code, events.PY_RETURN | events.PY_YIELD | events.PY_RESUME)
+        return True
+
+    def on_line(self, code, line_number):
+        """Handler for LINE events, which are only switched on for code that's traced line by line."""
+        if self.sampling and not self.is_line_sampled(code):
+            return
+        self.trace.events.append((LINE_EVENT, self.file_id_of(code.co_filename), line_number, code))
+        if len(self.trace.events) >= self.event_limit:
+            self.on_event_limit(sys._getframe(1))
+
+    def on_return(self, code, instruction_offset, retval):
+        """Handler for PY_RETURN and PY_YIELD events."""
+        frame = sys._getframe(1)
+        if frame in self.opaque_frames:
+            self.opaque_frames.discard(frame)
+        elif not self.is_frame_traced(frame):
+            return
+        self.trace.events.append((RETURN_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+        if len(self.trace.events) >= self.event_limit:
+            self.on_event_limit(frame)
+
+    def on_raise(self, code, instruction_offset, exception):
+        """Handler for RAISE events, which happen in every frame that an exception is raised in or propagates into."""
+        frame = sys._getframe(1)
+        if self.trace.failure_stack is None:
+            self.trace.failure_stack = failure_stack_at(frame, exception, exception.__traceback__)
+        if frame in self.opaque_frames:
+            self.record_raise_path(exception.__traceback__)
+        elif not (frame.f_globals.get("__file__", None) and self.is_frame_traced(frame)):
+            return
+        elif self.sampling:
+            self.record_unsampled_raise_line(frame, code, exception)
+        elif not (self.trace_lines or isinstance(exception, StopIteration)):
+            self.trace.events.append((LINE_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+        self.trace.events.append((EXCEPTION_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+
+    def on_unwind(self, code, instruction_offset, exception):
+        """Handler for PY_UNWIND events, ie a frame being exited by an exception.  settrace reports these as returns."""
+        frame = sys._getframe(1)
+        if frame in self.opaque_frames:
+            self.opaque_frames.discard(frame)
+        elif not (frame.f_globals.get("__file__", None) and self.is_frame_traced(frame)):
+            return
+        self.trace.events.append((RETURN_EVENT, self.file_id_of(code.co_filename), frame.f_lineno, code))
+
+    def switch_to_function_granularity(self, frame) -> None:
+        """Switch off line events for every code object, both those that have them already and those started from now
+        on.
+        """
+        self.trace_lines = False
+        self.granularity = "function"
+        for code, events in self.code_with_local_events.items():
+            if events & sys.monitoring.events.LINE:
+                self.code_with_local_events[code] = events & ~sys.monitoring.events.LINE
+                sys.monitoring.set_local_events(self.tool_id, code, events & ~sys.monitoring.events.LINE)
+
+    def stop_recording(self, frame) -> None:
+        """Switch off every event, for every code object."""
+        sys.monitoring.set_events(self.tool_id, sys.monitoring.events.NO_EVENTS)
+        for code in self.code_with_local_events:
+            sys.monitoring.set_local_events(self.tool_id, code, sys.monitoring.events.NO_EVENTS)
+        self.code_with_local_events = {}
+
+    def runfunc(self, func, *args, **kwargs):
+        """Call func(*args, **kwargs) while tracing, and return whatever it returns."""
+        monitoring = sys.monitoring
+        events = monitoring.events
+        self.tool_id = get_free_monitoring_tool_id()
+        monitoring.use_tool_id(self.tool_id, "py-holmes")
+        handlers = {
+            events.PY_START: self.on_start,
+            events.PY_RESUME: self.on_start,
+            events.PY_THROW: self.on_throw,
+            events.LINE: self.on_line,
+            events.PY_RETURN: self.on_return,
+            events.PY_YIELD: self.on_return,
+            events.RAISE: self.on_raise,
+            events.PY_UNWIND: self.on_unwind,
+        }
+        for event, handler in handlers.items():
+            monitoring.register_callback(self.tool_id, event, handler)
+        monitoring.restart_events()     # Undo any DISABLEs left over from an earlier run
+        monitoring.set_events(self.tool_id, events.PY_START | events.PY_THROW | events.RAISE | events.PY_UNWIND)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            monitoring.set_events(self.tool_id, events.NO_EVENTS)
+            for code in self.code_with_local_events:
+                monitoring.set_local_events(self.tool_id, code, events.NO_EVENTS)
+            for event in handlers:
+                monitoring.register_callback(self.tool_id, event, None)
+            monitoring.free_tool_id(self.tool_id)
+            self.code_with_local_events = {}
+            self.opaque_frames = set()
+
+
+class TextTracer(trace.Trace):
+    """trace.Trace(count=0, trace=1, countfuncs=0, countcallers=0, ignoremods=(), ignoredirs=()) that prints the same
+    lines, but into its own buffer, self.stream, rather than to sys.stdout.  This way, whatever the traced test prints can
+    be captured separately, and never ends up in the execution trace.
+    Once self.stream holds max_bytes characters, tracing stops, and self.stream is marked as truncated.
+    As with EventTrace, the stack at the moment the test's failureException is first raised is kept in
+    self.failure_stack.
+    """
+
+    def __init__(self, max_bytes=None) -> None:
+        super().__init__(count=0, trace=1, countfuncs=0, countcallers=0, ignoremods=(), ignoredirs=(), infile=None, outfile=None, timing=False)
+        self.stream = BoundedTraceBuffer(max_bytes=max_bytes, tracer=self)
+        self.failure_stack = None
+        self.filenames_seen = set()     # co_filenames of the code traced so far, each of which is noted as that of a running file
+
+    def globaltrace_lt(self, frame, why, arg):
+        """Handler for call events, as in trace.Trace, but writing to self.stream.  The file of each traced function is
+        noted as that of a running file, so that it can be found later without searching for it.
+        """
+        if why == "call":
+            filename = frame.f_globals.get("__file__", None)
+            if filename:
+                modulename = trace._modname(filename)
+                if modulename is not None and not self.ignore.names(filename, modulename):
+                    self.stream.write(f" --- modulename: {modulename}, funcname: {frame.f_code.co_name}\n")
+                    code_filename = frame.f_code.co_filename
+                    if code_filename not in self.filenames_seen:
+                        self.filenames_seen.add(code_filename)
+                        note_path_of_running_file(code_filename)
+                    return self.localtrace
+        return None
+
+    def localtrace_trace(self, frame, why, arg):
+        """Handler for line events, as in trace.Trace, but writing to self.stream.  Also handles exception events, to
+        keep self.failure_stack.
+        """
+        if why == "line":
+            filename = frame.f_code.co_filename
+            line_number = frame.f_lineno
+            self.stream.write(f"{os.path.basename(filename)}({line_number}): {linecache.getline(filename, line_number)}")
+        elif why == "exception" and self.failure_stack is None:
+            self.failure_stack = failure_stack_at(frame, arg[1], arg[2])
+        return self.localtrace
+
+
+class BoundedTraceBuffer(io.StringIO):
+    """Buffer that holds at most max_bytes characters.  Anything written after that is dropped, and the buffer is marked
+    as truncated.
+    If tracer is a trace.Trace object, which prints the trace into this buffer, tracing is also stopped once the buffer
+    is full, since none of the rest of the trace could be kept anyway.
+    """
+
+    def __init__(self, max_bytes=None, tracer=None) -> None:
+        # Handle errors
+        # max_bytes not a positive int or None
+        if max_bytes is not None and (not isinstance(max_bytes, int) or max_bytes <= 0):
+            raise ValueError("max_bytes must be a positive int or None")
+
+        super().__init__()
+        self.max_bytes = max_bytes if max_bytes is not None else sys.maxsize
+        self.tracer = tracer
+        self.truncated = False
+
+    def write(self, s: str) -> int:
+        if self.truncated:
+            return len(s)
+        if self.tell() + len(s) > self.max_bytes:
+            self.truncated = True
+            if self.tracer is not None:
+                # trace.Trace hands each frame self.localtrace as its next local trace function, so None switches it off
+                sys.settrace(None)
+                self.tracer.globaltrace = self.tracer.localtrace = None
+                stop_tracing_frames(sys._getframe(1))
+            return len(s)
+        return super().write(s)
+
+
+#
+# HELPER FUNCTIONS
+#
+def failure_stack_at(frame, exception, traceback):
+    """Given an exception event in frame, return the stack at the point where the exception was raised, if it was a
+    test's failureException raised by unittest.  Otherwise, return None.
+    The stack is returned as a list of (module filename, code object) tuples, outermost first, where the module filename
+    is the __file__ of the module the code was called in, or None for modules without a __file__.  Frames are taken from
+    frame outward, and from traceback inward, so the frames that an exception has already unwound (eg those of
+    out-of-scope code that was never traced) are included as well.
+    """
+    # Only failures raised by unittest are of interest
+    if not isinstance(exception, AssertionError) or traceback is None:
+        return None
+    innermost_traceback = traceback
+    while innermost_traceback.tb_next is not None:
+        innermost_traceback = innermost_traceback.tb_next
+    if os.path.basename(innermost_traceback.tb_frame.f_code.co_filename) != FAILURE_RAISING_FILENAME:
+        return None
+
+    # Collect frame and its callers, outermost first, followed by the frames in traceback below frame
+    frames = []
+    this_frame = frame if traceback.tb_frame is not frame else frame.f_back
+    while this_frame is not None:
+        frames.append(this_frame)
+        this_frame = this_frame.f_back
+    frames.reverse()
+    this_traceback = traceback
+    while this_traceback is not None:
+        frames.append(this_traceback.tb_frame)
+        this_traceback = this_traceback.tb_next
+
+    # Return!
+    return [(this_frame.f_globals.get("__file__", None), this_frame.f_code) for this_frame in frames]
+
+
+def failure_stack_entries(failure_stack, modulename: str, funcname: str):
+    """Given a stack returned by failure_stack_at(), return it from the first entry into funcname within modulename
+    inward, as a list of (modulename, funcname, is_user, is_ignored) tuples, outermost first.  is_user is whether the
+    function's file is a user or py-holmes file, and is_ignored is whether it's also holmesignored.  Each function's file
+    is classified by its absolute path, so files that share a name with another file are never confused with it.  Return
+    None if failure_stack is None or never enters funcname within modulename.
+    """
+    if failure_stack is None:
+        return None
+    entries = []
+    for module_filename, code in failure_stack:
+        if module_filename is None:
+            continue
+        this_modulename = os.path.splitext(os.path.basename(module_filename))[0]
+        if not entries and (this_modulename != modulename or code.co_name != funcname):
+            continue    # Not yet in the test method
+        if code.co_filename.endswith(".py") and os.path.isfile(code.co_filename):
+            non_ignored_user_file, is_user = classify_path(os.path.abspath(code.co_filename))
+        else:   # Code that isn't from a file, such as code run from a string
+            non_ignored_user_file, is_user = False, False
+        is_ignored = is_user and not non_ignored_user_file
+        entries.append((this_modulename, code.co_name, is_user, is_ignored))
+    return entries if entries else None
+
+
+def stop_tracing_frames(frame) -> None:
+    """Switch off sys.settrace() tracing for frame and every frame that called it."""
+    while frame is not None:
+        frame.f_trace = None
+        frame = frame.f_back
+
+
+def is_in_trace_scope(filename: str, searchextend_patterns: list) -> bool:
+    """Return whether code from filename should be traced line by line when tracing with scope "user".
+    This is True for user and py-holmes files (ie files in the project directory, but not in the directory of the Python
+    interpreter or the default Python install location), and for files matching a pattern in .holmessearchextend.
+    Holmesignored files are still in scope; they're needed to find the user's test method and its callees.
+    filename is the co_filename of a code object, so it may be a pseudo-filename such as "<string>".
+    """
+    if not os.path.isfile(filename):
+        return False
+    filepath = os.path.abspath(filename)
+    if matches_an_ignore_pattern(filepath, optional_ignore_patterns=searchextend_patterns):
+        return True
+    file_in_root_dir = filepath.startswith(shared_variables.ROOT_DIR + os.sep)
+    file_in_executable = filepath.startswith(os.path.dirname(os.path.dirname(sys.executable)))
+    file_in_platform_python_path = filepath.startswith(PLATFORM_PYTHON_PATH)
+    return file_in_root_dir and not (file_in_executable or file_in_platform_python_path)
+
+
+def gate_tracing_to(tracer, func):
+    """Return a wrapper around func that switches tracer on only while func runs, by way of tracer.runfunc().
+    tracer may be a trace.Trace object or an EventTracer.
+    """
+    @functools.wraps(func)
+    def gated_func(*args, **kwargs):
+        return tracer.runfunc(func, *args, **kwargs)
+    return gated_func
+
+
+def gate_tracing_to_test_method(tracer, test_instance):
+    """Wrap the test method that test_instance (a unittest.TestCase object) was built to run, so that tracer is switched
+    on only while that method runs.  unittest looks the method up on the instance, so the wrapper is set as an instance
+    attribute, leaving the class untouched.
+    """
+    test_method_name = test_instance._testMethodName
+    setattr(test_instance, test_method_name, gate_tracing_to(tracer, getattr(test_instance, test_method_name)))
+
+
+def make_event_tracer(trace_backend: str, scope="all", granularity="line", max_events=None, sample_every=None, sample_interval=None) -> EventTracer:
+    """Return a new event-recording tracer for trace_backend.  If trace_backend is "monitoring" but sys.monitoring is
+    unavailable, warn and fall back to an EventTracer built on sys.settrace().
+    """
+    # Handle errors
+    # trace_backend not an event-recording backend
+    if trace_backend not in TRACE_BACKENDS or trace_backend == "trace":
+        raise ValueError("trace_backend must be one of the event-recording backends in " + str(TRACE_BACKENDS[1:]))
+
+    # Run
+    if trace_backend == "monitoring":
+        if hasattr(sys, "monitoring"):
+            return MonitoringEventTracer(scope=scope, granularity=granularity, max_events=max_events, sample_every=sample_every, sample_interval=sample_interval)
+        warn("sys.monitoring is unavailable before Python 3.12; falling back to the settrace backend")
+    return EventTracer(scope=scope, granularity=granularity, max_events=max_events, sample_every=sample_every, sample_interval=sample_interval)
+
+
+def cache_file_of_code(code) -> None:
+    """Make sure that the file containing code is in FILES_ALREADY_FOUND, and so classified as user code or not, checking
+    it by the content of the line that code starts on.  The file is taken to be at code's absolute co_filename, without
+    searching for it, so a file that shares its name with a file found before is still added.  Files that can't be
+    read there are left out, just as files that are never traced are.  Each file is only checked once.
+    """
+    filepath = os.path.abspath(code.co_filename)
+    filename = os.path.basename(filepath)
+    if not filename.endswith(".py") or FILES_ALREADY_FOUND.get(filename) == filepath:
+        return
+    found = FILES_OF_CODE_CHECKED.get(filepath)
+    if found is None:
+        note_path_of_running_file(filepath)
+        try:
+            first_line = linecache.getline(filepath, code.co_firstlineno)
+            if first_line.endswith("\n"):
+                first_line = first_line[:-1]
+            found = file_contains_content_on_line(filepath, filename, first_line, code.co_firstlineno, cached=False)
+        except (OSError, SyntaxError, ValueError) as err:   # Eg the file has been removed, or isn't UTF-8
+            found = False
+        FILES_OF_CODE_CHECKED[filepath] = found
+    elif found:
+        FILES_ALREADY_FOUND[filename] = filepath    # Found before, but another file by the same name has been found since
+
+
+def get_free_monitoring_tool_id() -> int:
+    """Return the id of a sys.monitoring tool slot that no other tool (eg a debugger or coverage.py) is using.
+    Raise a RuntimeError if all slots are taken.
+    """
+    for tool_id in [sys.monitoring.PROFILER_ID, sys.monitoring.OPTIMIZER_ID, 3, 4]:
+        if sys.monitoring.get_tool(tool_id) is None:
+            return tool_id
+    raise RuntimeError("no free sys.monitoring tool id available for tracing")
+
+
+def get_trace_backend() -> str:
+    """Return the tracing backend requested with --trace_backend, or "trace" if none was requested."""
+    shared_variables.initialize()
+    try:
+        trace_backend = shared_variables.trace_backend
+    except AttributeError as err:
+        trace_backend = "trace"
+    return trace_backend
+
+
+def get_trace_scope() -> str:
+    """Return the tracing scope requested with --trace_scope, or "all" if none was requested."""
+    shared_variables.initialize()
+    try:
+        trace_scope = shared_variables.trace_scope
+    except AttributeError as err:
+        trace_scope = "all"
+    return trace_scope
+
+
+def get_trace_granularity() -> str:
+    """Return the tracing granularity requested with --trace_granularity, or "line" if none was requested."""
+    shared_variables.initialize()
+    try:
+        trace_granularity = shared_variables.trace_granularity
+    except AttributeError as err:
+        trace_granularity = "line"
+    return trace_granularity
+
+
+def get_trace_sample_every():
+    """Return the line sampling rate requested with --trace_sample_every, or None if none was requested."""
+    shared_variables.initialize()
+    try:
+        trace_sample_every = shared_variables.trace_sample_every
+    except AttributeError as err:
+        trace_sample_every = None
+    return trace_sample_every
+
+
+def get_trace_sample_interval():
+    """Return the line sampling interval in seconds requested with --trace_sample_interval, or None if none was
+    requested.
+    """
+    shared_variables.initialize()
+    try:
+        trace_sample_interval = shared_variables.trace_sample_interval
+    except AttributeError as err:
+        trace_sample_interval = None
+    return trace_sample_interval
+
+
+def get_trace_max_events():
+    """Return the event limit requested with --trace_max_events, or None if none was requested."""
+    shared_variables.initialize()
+    try:
+        trace_max_events = shared_variables.trace_max_events
+    except AttributeError as err:
+        trace_max_events = None
+    return trace_max_events
+
+
+def get_trace_max_bytes():
+    """Return the limit on characters of printed execution trace requested with --trace_max_bytes, or None if none was
+    requested.
+    """
+    shared_variables.initialize()
+    try:
+        trace_max_bytes = shared_variables.trace_max_bytes
+    except AttributeError as err:
+        trace_max_bytes = None
+    return trace_max_bytes
+
+
+def get_trace_gated() -> bool:
+    """Return whether --trace_gated was given, ie whether tracing should be switched on only while the test method runs."""
+    shared_variables.initialize()
+    try:
+        trace_gated = shared_variables.trace_gated
+    except AttributeError as err:
+        trace_gated = False
+    return trace_gated
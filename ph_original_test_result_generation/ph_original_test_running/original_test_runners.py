@@ -4,7 +4,6 @@ from io import StringIO
 import unittest
 from warnings import warn
 import os
-import trace
 import io
 from contextlib import redirect_stdout
 from ast import parse
@@ -13,7 +12,10 @@ import pickle
 from ph_basic_processing.parsers import remove_leading_substring, get_folder_delimiter, get_indices_containing_function_body_and_indentation_of_definition, count_indentation_in_spaces, get_method_name_from_definition_line, leading_spaces_of, find_class_containing_method, get_call_from_traceback
 from ph_basic_processing.stripping import strip_custom
 from ph_original_test_result_generation.ph_original_test_running.importers import *
-from ph_basic_processing.trace_exit_line_adders import add_exit_lines_to_trace, remove_before_user_runtime, remove_after_user_runtime
+from ph_basic_processing.trace_samplers import SampledTrace
+from ph_basic_processing.trace_exit_line_adders import crop_and_add_exit_lines_to_trace
+from ph_original_test_result_generation.ph_fault_assessment.execution_trace_fault_assessers import find_index_of_failing_line
+from ph_original_test_result_generation.ph_original_test_running.event_tracers import make_event_tracer, get_trace_backend, get_trace_scope, get_trace_granularity, get_trace_gated, get_trace_max_events, get_trace_max_bytes, get_trace_sample_every, get_trace_sample_interval, gate_tracing_to_test_method, failure_stack_entries, TextTracer, BoundedTraceBuffer, USER_OUTPUT_MAX_BYTES
 
 
 #
@@ -22,7 +24,7 @@ from ph_basic_processing.trace_exit_line_adders import add_exit_lines_to_trace,
 class OriginalUnitTestResult:
     """Container for those results of an original unit test that are relevant for causal testing."""
 
-    def __init__(self, input_args_tree=None, execution_path=None, failed=None, traceback=None, trace_indices_descended_from_non_ignored_user_code=None, test_class_string=None, test_method_string=None, involved_user_and_py_holmes_modules=None, activations=None) -> None:
+    def __init__(self, input_args_tree=None, execution_path=None, failed=None, traceback=None, trace_indices_descended_from_non_ignored_user_code=None, test_class_string=None, test_method_string=None, involved_user_and_py_holmes_modules=None, activations=None, failure_stack=None) -> None:
         """
         :param input_args_tree: Python ast containing arguments of BOTH the first assert failed in this test-case method AND the function tested within that assert
         :param execution_path: String.  Execution trace in string form.  ONLY INCLUDES THE LINES RUN DURING THE USER'S TEST'S RUNTIME; lines from before and after this have been cropped away
@@ -33,6 +35,7 @@ class OriginalUnitTestResult:
         :param test_method_string: The name of the test method, without parentheses.  For example: "test_values"
         :param involved_user_and_py_holmes_modules: A list of user and py-holmes module names (without a file extension) used in the entire (pre-cropping) trace.  Holmesignored modules are not excluded from this list.
         :param activations: Only for use when py-holmes is being used with the --dl flag.  Dictionary of tensors representing the activation of each layer.
+        :param failure_stack: List of (modulename, funcname, is_user, is_ignored) tuples.  The stack from the test method inward at the point where the test failed, as recorded by the tracer, or None if it wasn't recorded
         """
         self.input_args_tree = input_args_tree
         self.execution_path = execution_path
@@ -43,6 +46,7 @@ class OriginalUnitTestResult:
         self.test_method_string = test_method_string
         self.involved_user_and_py_holmes_modules = involved_user_and_py_holmes_modules
         self.activations = activations
+        self.failure_stack = failure_stack
 
 
 #
@@ -186,9 +190,11 @@ def build_and_run_test_suite_dl() -> dict:
         pickle.dump(dictionary, pickle_file)
 
 
-def build_and_run_test_suite() -> None:
+def build_and_run_test_suite(gated_tracer=None) -> None:
     """To be traced by the python trace module, called by get_unit_test_result().
     Build a test suite containing the original test, run, and return test results by creating a .pickle file.
+    If gated_tracer is given, this function should not itself be traced.  Instead, gated_tracer is switched on only
+    while the test method runs, so that imports and the unittest runner are never traced.
     """
     # Get inputs via globaling, to get around NameError: name 'foo' is not defined
     global test_case_as_string
@@ -219,7 +225,10 @@ def build_and_run_test_suite() -> None:
     # Build a test suite which contains only this test method
     test_class = import_by_string(importstring)
     suite = unittest.TestSuite()
-    suite.addTest(test_class(test_case_as_string))
+    test_instance = test_class(test_case_as_string)
+    if gated_tracer is not None:
+        gate_tracing_to_test_method(gated_tracer, test_instance)
+    suite.addTest(test_instance)
 
     # Run test and get results
     stream = StringIO()
@@ -503,14 +512,32 @@ def get_unit_test_result(test_filepath_temp: str, test_filename_temp: str, line_
                                       activations=activations)
     else:
         # Run test and get results, simultaneously tracing execution.
-        # Getting tracer results involves redirecting stdout to a buffer and capturing it later as a variable.
+        # The tracer keeps the execution trace on its own channel: events in memory, or, with the "trace" backend, text in
+        # tracer.stream.  Whatever the user's code prints is caught separately, in output_buffer, by redirecting stdout, so
+        # it never goes through trace parsing.
         # Getting unittest runner results requires reading the important results from a pickle
         # that build_and_run_test_suite() writes
-        tracer = trace.Trace(count=0, trace=1, countfuncs=0, countcallers=0, ignoremods=(), ignoredirs=(), infile=None, outfile=None, timing=False)
-        trace_buffer = io.StringIO()
+        # If --trace_max_events or --trace_max_bytes was given, the trace may be cut short (or, for event backends,
+        # coarsened to function-level) partway through the test, in which case it's marked as truncated.
+        # If --trace_sample_every or --trace_sample_interval was given, only some line events are recorded, so the trace
+        # is kept as a SampledTrace that knows how many lines each of its lines stands for.
+        trace_backend = get_trace_backend()
+        trace_granularity = get_trace_granularity()
+        trace_gated = get_trace_gated()
+        trace_sampled = get_trace_sample_every() is not None or get_trace_sample_interval() is not None
+        if trace_backend == "trace":
+            tracer = TextTracer(max_bytes=get_trace_max_bytes())
+        else:
+            tracer = make_event_tracer(trace_backend, scope=get_trace_scope(), granularity=trace_granularity, max_events=get_trace_max_events(), sample_every=get_trace_sample_every(), sample_interval=get_trace_sample_interval())
+        output_buffer = BoundedTraceBuffer(max_bytes=USER_OUTPUT_MAX_BYTES)
         try:
-            with redirect_stdout(trace_buffer):   # To prevent the execution trace from getting printed to the screen
-                tracer.run("build_and_run_test_suite()")   # Unit test result.  Running this line leads to warning about using PyDev debugger with sys.settrace()
+            with redirect_stdout(output_buffer):   # To keep whatever the test prints off the screen
+                if trace_gated:
+                    build_and_run_test_suite(gated_tracer=tracer)
+                elif trace_backend == "trace":
+                    tracer.run("build_and_run_test_suite()")   # Unit test result.  Running this line leads to warning about using PyDev debugger with sys.settrace()
+                else:
+                    tracer.runfunc(build_and_run_test_suite)
             with open(pickle_filename, "rb") as pickle_file:
                 runner_result = pickle.load(pickle_file)
         finally:
@@ -523,15 +550,39 @@ def get_unit_test_result(test_filepath_temp: str, test_filename_temp: str, line_
         # Get the execution trace, unless the test didn't fail and the user didn't request causal testing be performed anyway
         still_run_causal_testing_on_passing_tests = shared_variables.still_run_causal_testing_on_passing_tests
         if test_failed or still_run_causal_testing_on_passing_tests:
-            tracer_result = trace_buffer.getvalue()
-            tracer_result = remove_before_user_runtime(tracer_result)
-            tracer_result, non_ignored_user_code_indices, traced_user_and_py_holmes_modules = add_exit_lines_to_trace(tracer_result)  # Add exit lines to tracer_result for every time we exit a function or class, and do some other touch-ups as well
-            # Remove all but the user's runtime from the execution trace, and update non_ignored_user_code_indices accordingly
-            tracer_result, non_ignored_user_code_indices = remove_after_user_runtime(tracer_result, non_ignored_user_code_indices)
+            trace_truncated = tracer.stream.truncated if trace_backend == "trace" else tracer.results().truncated
+            try:
+                if trace_backend == "trace":
+                    tracer_result = tracer.stream.getvalue()
+                else:
+                    # Truncated and sampled traces are missing lines, so their exits are taken from their return events
+                    tracer_result = tracer.results().parsed_tracelines_from_entry(test_filename_without_file_extension, test_case_as_string, function_level=(trace_granularity == "function" or trace_truncated or trace_sampled))
+                # Crop the execution trace to the user's runtime, adding exit lines to it for every time we exit a function or class, and doing some other touch-ups as well
+                tracer_lines, non_ignored_user_code_indices, traced_user_and_py_holmes_modules = crop_and_add_exit_lines_to_trace(tracer_result, test_case_as_string, test_filename_without_file_extension, exit_remaining_functions=(trace_gated or trace_truncated))
+            except RuntimeError as err:
+                if trace_truncated:
+                    raise RuntimeError("the execution trace of the original test hit the limit set by --trace_max_events or --trace_max_bytes before the test method was entered.  Raise the limit, or, if not already using it, use --trace_gated so that only the test method is traced") from err
+                raise
+            if trace_truncated:
+                warn("The execution trace of the original test was truncated, since it hit the limit set by --trace_max_events or --trace_max_bytes")
+            # Get the stack at the point of failure, if the tracer caught it
+            recorded_failure_stack = tracer.failure_stack if trace_backend == "trace" else tracer.results().failure_stack
+            failure_stack = failure_stack_entries(recorded_failure_stack, test_filename_without_file_extension, test_case_as_string) if test_failed else None
+            # A trace cut short before the failure can't show whether the user is at fault, unless the tracer caught the
+            # stack at the point of failure anyway
+            if test_failed and trace_truncated and failure_stack is None:
+                try:
+                    find_index_of_failing_line(tracer_lines)
+                except ValueError as err:
+                    raise RuntimeError("the execution trace of the original test hit the limit set by --trace_max_events or --trace_max_bytes before the test failed.  Raise the limit, or, if not already using it, use --trace_gated so that only the test method is traced") from err
+            tracer_result = "\n".join(tracer_lines)
+            if trace_sampled:
+                tracer_result = SampledTrace(tracer_result, line_weight=tracer.results().line_weight())
         else:
             tracer_result = None
             non_ignored_user_code_indices = None
             traced_user_and_py_holmes_modules = None
+            failure_stack = None
 
         if test_failed:
             # Get the traceback of the failing test
@@ -567,4 +618,4 @@ def get_unit_test_result(test_filepath_temp: str, test_filename_temp: str, line_
             test_user_and_py_holmes_modules = traced_user_and_py_holmes_modules
 
         # Return an OriginalUnitTestResult object with the information that we need for causal testing
-        return OriginalUnitTestResult(input_args_tree=test_args_tree, execution_path=test_execution_path, failed=test_failed, traceback=test_traceback, trace_indices_descended_from_non_ignored_user_code=test_trace_indices_descended_from_non_ignored_user_code, test_class_string=test_class_string_version, test_method_string=test_case_string_version, involved_user_and_py_holmes_modules=test_user_and_py_holmes_modules)
+        return OriginalUnitTestResult(input_args_tree=test_args_tree, execution_path=test_execution_path, failed=test_failed, traceback=test_traceback, trace_indices_descended_from_non_ignored_user_code=test_trace_indices_descended_from_non_ignored_user_code, test_class_string=test_class_string_version, test_method_string=test_case_string_version, involved_user_and_py_holmes_modules=test_user_and_py_holmes_modules, failure_stack=failure_stack)
@@ -8,7 +8,13 @@ import os
 from os import path
 from sys import executable
 
-from ph_basic_processing.scrapers_for_holmesignore_and_holmessearchextend import parse_holmesignore, parse_holmessearchextend
+from ph_basic_processing.scrapers_for_holmesignore_and_holmessearchextend import parse_holmesignore, parse_holmessearchextend, get_ignore_pattern_matcher
+
+
+#
+# GLOBAL VARIABLES
+#
+HOLMESIGNORES_PARSED = {}   # For caching results of parse_holmesignore().  Keys are absolute paths of .holmesignore files.  Values are a tuple containing (the file's (modification time in nanoseconds, size in bytes) when it was parsed, an IgnorePatternMatcher of the patterns parsed from it)
 
 
 #
@@ -16,7 +22,30 @@ from ph_basic_processing.scrapers_for_holmesignore_and_holmessearchextend import
 #
 def get_ignore_patterns():
     """Return an up-to-date list of patterns based on the current state of .holmesignore"""
-    return parse_holmesignore()
+    return list(get_ignore_matcher().patterns)
+
+
+def get_ignore_matcher():
+    """Return an IgnorePatternMatcher of the patterns in the current state of .holmesignore.  The file is only parsed
+    again once it's changed since it was last parsed.
+    """
+    holmesignore_path = path.abspath(".holmesignore")
+    version = get_version_of_file(holmesignore_path)
+    if version is None or holmesignore_path not in HOLMESIGNORES_PARSED or HOLMESIGNORES_PARSED[holmesignore_path][0] != version:
+        patterns = parse_holmesignore()     # This may add py-holmes files to .holmesignore, so its version is found again afterwards
+        HOLMESIGNORES_PARSED[holmesignore_path] = (get_version_of_file(holmesignore_path), get_ignore_pattern_matcher(patterns))
+    return HOLMESIGNORES_PARSED[holmesignore_path][1]
+
+
+def get_version_of_file(filepath: str):
+    """Return the (modification time in nanoseconds, size in bytes) of the file at filepath, or None if there's no such
+    file.
+    """
+    try:
+        stat_result = os.stat(filepath)
+    except OSError as err:
+        return None
+    return stat_result.st_mtime_ns, stat_result.st_size
 
 
 def get_searchextend_patterns():
@@ -43,7 +72,7 @@ def get_lowest_dir_in_fragment(path_fragment: str) -> str:
         return path.dirname(path_fragment)
 
 
-def initialize(file_in=None, lines_in=None, definition_line_in=None, tatosp_in=None, dev_only_test_mode_in=None, still_run_causal_testing_on_passing_tests_in=None, test_method_in=None, user_test_method_objects_in=None, variant_testing_time_limit_seconds_in=None, user_help_skip_in=None, num_test_variants_in=None, dl_in=None, seed_in="not_given", execution_path_suppress_in=None) -> None:
+def initialize(file_in=None, lines_in=None, definition_line_in=None, tatosp_in=None, dev_only_test_mode_in=None, still_run_causal_testing_on_passing_tests_in=None, test_method_in=None, user_test_method_objects_in=None, variant_testing_time_limit_seconds_in=None, user_help_skip_in=None, num_test_variants_in=None, dl_in=None, seed_in="not_given", execution_path_suppress_in=None, trace_backend_in=None, trace_scope_in=None, trace_granularity_in=None, trace_gated_in=None, trace_max_events_in=None, trace_max_bytes_in=None, trace_sample_every_in=None, trace_sample_interval_in=None, trace_compress_in=None) -> None:
     """Set variables to be shared, or access those variables.
     For file_in, lines_in, tatosp_in, dev_only_test_mode_in, still_run_causal_testing_on_passing_tests_in, and
     test_method_in, calling initialize() without specifying an argument for that variable will leave that variable
@@ -54,6 +83,15 @@ def initialize(file_in=None, lines_in=None, definition_line_in=None, tatosp_in=N
     definition_line_in:    The line on which the definition for the original test method appears, starting counting at 1
     user_test_method_objects_in: The set of all user-written test methods, as TestMethod objects.
     variant_testing_time_limit_seconds_in: Time limit for variant test running.
+    trace_backend_in: Which tracer to record execution traces with.  One of the names in event_tracers.TRACE_BACKENDS.
+    trace_scope_in: Which frames to trace line by line.  One of the names in event_tracers.TRACE_SCOPES.
+    trace_granularity_in: What to record within traced frames.  One of the names in event_tracers.TRACE_GRANULARITIES.
+    trace_gated_in: Whether to switch tracing on only while the test method runs.
+    trace_max_events_in: Most events an event-recording tracer may record per test run before coarsening and then stopping.
+    trace_max_bytes_in: Most characters of execution trace that the trace module may print per test run.
+    trace_sample_every_in: If given, only every Nth line event of each code object is recorded.
+    trace_sample_interval_in: If given, at most one line event of each code object is recorded per this many seconds.
+    trace_compress_in: Whether to collapse repeated blocks of lines in the execution traces of test variants.
     """
     # Directory definitions, so that files in subdirectories can access files in other subdirectories
     global ROOT_DIR
@@ -110,6 +148,33 @@ def initialize(file_in=None, lines_in=None, definition_line_in=None, tatosp_in=N
     if execution_path_suppress_in is not None:
         global execution_path_suppress
         execution_path_suppress = execution_path_suppress_in
+    if trace_backend_in is not None:
+        global trace_backend
+        trace_backend = trace_backend_in
+    if trace_scope_in is not None:
+        global trace_scope
+        trace_scope = trace_scope_in
+    if trace_granularity_in is not None:
+        global trace_granularity
+        trace_granularity = trace_granularity_in
+    if trace_gated_in is not None:
+        global trace_gated
+        trace_gated = trace_gated_in
+    if trace_max_events_in is not None:
+        global trace_max_events
+        trace_max_events = trace_max_events_in
+    if trace_max_bytes_in is not None:
+        global trace_max_bytes
+        trace_max_bytes = trace_max_bytes_in
+    if trace_sample_every_in is not None:
+        global trace_sample_every
+        trace_sample_every = trace_sample_every_in
+    if trace_sample_interval_in is not None:
+        global trace_sample_interval
+        trace_sample_interval = trace_sample_interval_in
+    if trace_compress_in is not None:
+        global trace_compress
+        trace_compress = trace_compress_in
 
     # .pickle filename for original unit test running AND fuzzed unit test running
     global pickle_filename
@@ -17,6 +17,7 @@ from ph_original_test_result_generation.ph_original_test_running.original_test_r
 from ph_original_test_result_generation.ph_fault_assessment.execution_trace_fault_assessers import user_at_fault
 from ph_causal_testing.causal_testers import run_causal_testing
 from ph_causal_testing.variant_test_runners import build_and_run_fuzzed_test_suite  # We must import build_and_run_fuzzed_test_suite here so that tracer.run() can access it
+from ph_original_test_result_generation.ph_original_test_running.event_tracers import TRACE_BACKENDS, TRACE_SCOPES, TRACE_GRANULARITIES
 from ph_basic_processing.cleanup import cleanup
 import random
 
@@ -54,6 +55,15 @@ if __name__ == "__main__":
     parser.add_argument("--dl", action="store_true", required=False, default=False, help="Run py-holmes on a test of a deep neural network", dest="dl")
     parser.add_argument("--seed", "-s", action="store", nargs=1, type=int, required=False, default=None, help="Random seed.  If given, py-holmes's results will be reproducible if the same seed is given again later.", dest="seed")
     parser.add_argument("--execution_path_suppress", "-e", action="store_true", required=False, default=False, help="Suppress showing execution paths in report", dest="execution_path_suppress")
+    parser.add_argument("--trace_backend", action="store", nargs=1, type=str, required=False, default="trace", choices=TRACE_BACKENDS, help="Tracer used to record execution traces.  'trace' prints and re-parses text with Python's trace module; 'settrace' records structured events with sys.settrace; 'monitoring' records the same events with sys.monitoring, falling back to settrace before Python 3.12 (default is trace)", dest="trace_backend")
+    parser.add_argument("--trace_scope", action="store", nargs=1, type=str, required=False, default="all", choices=TRACE_SCOPES, help="Which frames to trace line by line.  'all' traces everything; 'user' only traces user, py-holmes, and .holmessearchextend files, and records calls into libraries as a single call/return pair.  'user' requires an event-recording --trace_backend such as settrace or monitoring (default is all)", dest="trace_scope")
+    parser.add_argument("--trace_granularity", action="store", nargs=1, type=str, required=False, default="line", choices=TRACE_GRANULARITIES, help="What to record within traced frames.  'line' records every line run; 'function' records only function calls and exits, plus the lines that exceptions pass through, and re-runs just the tests shown in the report at line level.  'function' requires an event-recording --trace_backend such as settrace or monitoring (default is line)", dest="trace_granularity")
+    parser.add_argument("--trace_gated", action="store_true", required=False, default=False, help="Import the test and its dependencies before tracing starts, and trace only while the test method runs, rather than also tracing imports and the unittest runner", dest="trace_gated")
+    parser.add_argument("--trace_max_events", action="store", nargs=1, type=int, required=False, default=None, help="Most events an event-recording --trace_backend may record per test run.  A run that reaches this limit is traced at function level for the rest of the run, and one that records this many events again stops being traced, with its trace marked as truncated (default is no limit)", dest="trace_max_events")
+    parser.add_argument("--trace_max_bytes", action="store", nargs=1, type=int, required=False, default=None, help="Most characters of execution trace that --trace_backend trace may print per test run.  A run that reaches this limit stops being traced, with its trace marked as truncated (default is no limit)", dest="trace_max_bytes")
+    parser.add_argument("--trace_sample_every", action="store", nargs=1, type=int, required=False, default=None, help="Record only every Nth line event of each function, starting with its first, for long-running tests.  Calls, exits, and the lines that exceptions pass through are still all recorded, and distances between traces are scaled to make up for the lines left out.  Requires an event-recording --trace_backend such as settrace or monitoring (default is to record every line)", dest="trace_sample_every")
+    parser.add_argument("--trace_sample_interval", action="store", nargs=1, type=float, required=False, default=None, help="Record at most one line event of each function per this many seconds, for long-running tests.  Otherwise as --trace_sample_every, which it can't be combined with (default is to record every line)", dest="trace_sample_interval")
+    parser.add_argument("--trace_compress", action="store_true", required=False, default=False, help="Collapse repeated blocks of lines in execution traces, such as the iterations of a loop, into a single block and a repeat count, and compare and show traces in that form", dest="trace_compress")
 
     args = parser.parse_args()
     test_module_filepath = args.test_module_filepath[0]
@@ -76,6 +86,29 @@ if __name__ == "__main__":
     dev_only_test_mode = args.dev_only_test_mode
     dl = args.dl
     execution_path_suppress = args.execution_path_suppress
+    trace_backend = args.trace_backend
+    if not isinstance(trace_backend, str):
+        trace_backend = trace_backend[0]
+    trace_scope = args.trace_scope
+    if not isinstance(trace_scope, str):
+        trace_scope = trace_scope[0]
+    trace_granularity = args.trace_granularity
+    if not isinstance(trace_granularity, str):
+        trace_granularity = trace_granularity[0]
+    trace_gated = args.trace_gated
+    trace_max_events = args.trace_max_events
+    if not isinstance(trace_max_events, int) and trace_max_events is not None:
+        trace_max_events = trace_max_events[0]
+    trace_max_bytes = args.trace_max_bytes
+    if not isinstance(trace_max_bytes, int) and trace_max_bytes is not None:
+        trace_max_bytes = trace_max_bytes[0]
+    trace_sample_every = args.trace_sample_every
+    if not isinstance(trace_sample_every, int) and trace_sample_every is not None:
+        trace_sample_every = trace_sample_every[0]
+    trace_sample_interval = args.trace_sample_interval
+    if not isinstance(trace_sample_interval, float) and trace_sample_interval is not None:
+        trace_sample_interval = trace_sample_interval[0]
+    trace_compress = args.trace_compress
     user_help_skip = args.user_help_skip
     still_run_causal_testing_on_passing_tests = args.still_run_causal_testing_on_passing_tests
     take_manual_characters_for_fuzzing = args.take_manual_characters_for_fuzzing
@@ -131,6 +164,43 @@ if __name__ == "__main__":
     # num_test_variants not positive
     if num_test_variants <= 0:
         raise ValueError("--num_test_variants (aka -n) must be positive")
+    # trace_scope narrowed without an event-recording backend
+    if trace_scope != "all" and trace_backend == "trace":
+        raise ValueError("--trace_scope other than 'all' requires an event-recording --trace_backend, such as settrace or monitoring")
+    # trace_granularity coarsened without an event-recording backend
+    if trace_granularity != "line" and trace_backend == "trace":
+        raise ValueError("--trace_granularity other than 'line' requires an event-recording --trace_backend, such as settrace or monitoring")
+    # trace_max_events not positive
+    if trace_max_events is not None and trace_max_events <= 0:
+        raise ValueError("--trace_max_events must be positive")
+    # trace_max_events given without an event-recording backend
+    if trace_max_events is not None and trace_backend == "trace":
+        raise ValueError("--trace_max_events requires an event-recording --trace_backend, such as settrace or monitoring.  Use --trace_max_bytes to limit the trace backend")
+    # trace_max_bytes not positive
+    if trace_max_bytes is not None and trace_max_bytes <= 0:
+        raise ValueError("--trace_max_bytes must be positive")
+    # trace_max_bytes given with an event-recording backend
+    if trace_max_bytes is not None and trace_backend != "trace":
+        raise ValueError("--trace_max_bytes requires --trace_backend trace.  Use --trace_max_events to limit event-recording backends")
+    # trace_sample_every not positive
+    if trace_sample_every is not None and trace_sample_every <= 0:
+        raise ValueError("--trace_sample_every must be positive")
+    # trace_sample_interval not positive
+    if trace_sample_interval is not None and trace_sample_interval <= 0:
+        raise ValueError("--trace_sample_interval must be positive")
+    trace_sampled = trace_sample_every is not None or trace_sample_interval is not None
+    # Both sampling modes requested
+    if trace_sample_every is not None and trace_sample_interval is not None:
+        raise ValueError("--trace_sample_every and --trace_sample_interval cannot be used together")
+    # Sampling requested without an event-recording backend
+    if trace_sampled and trace_backend == "trace":
+        raise ValueError("--trace_sample_every and --trace_sample_interval require an event-recording --trace_backend, such as settrace or monitoring")
+    # Sampling requested without line events to sample
+    if trace_sampled and trace_granularity != "line":
+        raise ValueError("--trace_sample_every and --trace_sample_interval require --trace_granularity line")
+    # Sampling requested along with compression
+    if trace_sampled and trace_compress:
+        raise ValueError("--trace_sample_every and --trace_sample_interval cannot be used with --trace_compress, since sampled traces have no reliable repeats to collapse")
 
     # Based on user input, run either all tests or a set number of tests:
     test_module = open(test_module_filepath, "r", encoding="utf-8")
@@ -158,7 +228,7 @@ if __name__ == "__main__":
         raise ValueError("The file requested by the user contains no test methods")
 
     # Share important variables with all files
-    initialize(file_in=test_module_filepath, lines_in=line_numbers_to_test, tatosp_in=spaces_per_tab, dev_only_test_mode_in=dev_only_test_mode, still_run_causal_testing_on_passing_tests_in=still_run_causal_testing_on_passing_tests, variant_testing_time_limit_seconds_in=variant_testing_time_limit_seconds, user_help_skip_in=user_help_skip, num_test_variants_in=num_test_variants, dl_in=dl, seed_in=seed, execution_path_suppress_in=execution_path_suppress)
+    initialize(file_in=test_module_filepath, lines_in=line_numbers_to_test, tatosp_in=spaces_per_tab, dev_only_test_mode_in=dev_only_test_mode, still_run_causal_testing_on_passing_tests_in=still_run_causal_testing_on_passing_tests, variant_testing_time_limit_seconds_in=variant_testing_time_limit_seconds, user_help_skip_in=user_help_skip, num_test_variants_in=num_test_variants, dl_in=dl, seed_in=seed, execution_path_suppress_in=execution_path_suppress, trace_backend_in=trace_backend, trace_scope_in=trace_scope, trace_granularity_in=trace_granularity, trace_gated_in=trace_gated, trace_max_events_in=trace_max_events, trace_max_bytes_in=trace_max_bytes, trace_sample_every_in=trace_sample_every, trace_sample_interval_in=trace_sample_interval, trace_compress_in=trace_compress)
 
     # Apply random seed if given by user (no actual if statement needed)
     random.seed(seed)
@@ -176,7 +246,7 @@ if __name__ == "__main__":
                 # Run the test, and if it fails due to the user's fault (ie some failure in a "call descendant" of the user's test file), run causal testing on it.  Or if the --dl flag was used, run causal testing on all tests.
                 original_test_result = get_unit_test_result(test_module_filepath, filename, ll+1)
                 if original_test_result.failed:
-                    if dl or user_at_fault(original_test_result.execution_path, original_test_result.trace_indices_descended_from_non_ignored_user_code, test_module_name, original_test_result.involved_user_and_py_holmes_modules):    # If the user's test is at fault:
+                    if dl or user_at_fault(original_test_result.execution_path, original_test_result.trace_indices_descended_from_non_ignored_user_code, test_module_name, original_test_result.involved_user_and_py_holmes_modules, failure_stack=original_test_result.failure_stack):    # If the user's test is at fault:
                         failed_test_encountered_user_fault = True
                         run_causal_testing(original_test_result, dev_only_test_mode, take_manual_characters_for_fuzzing)
                     else:   # If the user isn't at fault:
@@ -193,7 +263,7 @@ if __name__ == "__main__":
             line_requested_as_int = int(line_requested)
             original_test_result = get_unit_test_result(test_module_filepath, filename, line_requested_as_int)
             if original_test_result.failed:
-                if dl or user_at_fault(original_test_result.execution_path, original_test_result.trace_indices_descended_from_non_ignored_user_code, test_module_name, original_test_result.involved_user_and_py_holmes_modules):    # If the user's test is at fault:
+                if dl or user_at_fault(original_test_result.execution_path, original_test_result.trace_indices_descended_from_non_ignored_user_code, test_module_name, original_test_result.involved_user_and_py_holmes_modules, failure_stack=original_test_result.failure_stack):    # If the user's test is at fault:
                     failed_test_encountered_user_fault = True
                     run_causal_testing(original_test_result, dev_only_test_mode, take_manual_characters_for_fuzzing)
                 else:   # If the user isn't at fault:
@@ -3,6 +3,7 @@ WARNING: TO DO A COMPLETE TEST OF PY-HOLMES' CAPABILITIES, ALSO RUN mnist_demo.i
 """
 import unittest
 import os
+import sys
 import ast
 import re
 import torch
@@ -390,6 +391,32 @@ class TestExitLinesAndHolmesignoreEXTERNAL(unittest.TestCase):
             self.assertEqual(desired, result)
 
 
+    def test_ignore_matcher_reloaded_when_holmesignore_changes(self):
+        """WARNING: OVERWRITES .HOLMESIGNORE
+        Ensure that the compiled matcher of .holmesignore's patterns decides the same way fnmatch does, that it's reused
+        while .holmesignore is unchanged, and that it's rebuilt once .holmesignore changes.
+        """
+        from fnmatch import fnmatch
+        from ph_basic_processing.parsers import matches_an_ignore_pattern
+        from ph_variable_sharing.shared_variables import get_ignore_patterns, get_ignore_matcher
+        wipe_old_files()    # Remove key files that, if left over, may interfere with the flow of a test.
+
+        filenames = [os.path.join(ROOT_DIR, "budget_calculations", "total_spending.py"), os.path.join(ROOT_DIR, "circle_method.py"), os.path.join(ROOT_DIR, "ph_causal_testing", "unit_test_fuzzers.py")]
+        with open(".holmesignore", "w", encoding="utf-8") as file:
+            file.write(os.path.join(ROOT_DIR, "budget_calculations") + "/\n")
+        matcher = get_ignore_matcher()
+        self.assertIs(matcher, get_ignore_matcher())
+        for filename in filenames:
+            self.assertEqual(any(fnmatch(filename, pattern) for pattern in get_ignore_patterns()), matches_an_ignore_pattern(filename))
+        self.assertEqual([True, False, True], [matches_an_ignore_pattern(filename) for filename in filenames])
+
+        with open(".holmesignore", "a", encoding="utf-8") as file:
+            file.write(os.path.join(ROOT_DIR, "circle_*.py") + "\n")
+        self.assertIsNot(matcher, get_ignore_matcher())
+        self.assertEqual([True, True, True], [matches_an_ignore_pattern(filename) for filename in filenames])
+        wipe_old_files()
+
+
 class TestHolmessearchextendEXTERNAL(unittest.TestCase):
     """WARNING: THIS CLASS OF TESTS SHOULD BE PERFORMED WITH A PYTHON INTERPRETER THAT IS NOT IN A SUBDIRECTORY OF THE
     PROJECT DIRECTORY!  Otherwise, test_search_in_holmessearchextend() is moot.
@@ -981,6 +1008,28 @@ class TestUnitTestFinding(unittest.TestCase):
         ]
         self.assertCountEqual(desired, result)
 
+    def test_symbol_index_finds_tests_referencing_subsets(self):
+        """Index a few tests by the files/methods/classes they reference, and ensure that exactly those referencing a
+        nonempty subset of some symbols are found, in order of filepath and line.  Then ensure that
+        find_tests_of_same_files_methods_and_classes() returns its tests in the same order every time.
+        """
+        wipe_old_files()  # Remove key files that, if left over, may interfere with the flow of a test.
+        symbol_index = unit_test_finders.SymbolIndex()
+        tests = []
+        for test_filepath, starting_test_lineno, symbols in [("/b.py", 5, {"circle.area"}), ("/a.py", 9, {"circle.area", "circle.crash"}), ("/a.py", 2, {"circle.area", "dog.bark"}), ("/a.py", 4, set())]:
+            test_method = class_for_test_method.TestMethod("found", test_filepath, starting_test_lineno, False, is_dummy=True)
+            test_method.test_filepath, test_method.starting_test_lineno, test_method.files_methods_and_classes_testing = test_filepath, starting_test_lineno, symbols
+            symbol_index.add(test_method)
+            tests.append(test_method)
+        self.assertEqual([tests[1], tests[0]], symbol_index.tests_referencing_subset_of({"circle.area", "circle.crash"}))
+        self.assertEqual([tests[0]], symbol_index.tests_referencing_subset_of({"circle.area"}))
+        self.assertEqual([], symbol_index.tests_referencing_subset_of(set()))
+
+        test_method = class_for_test_method.TestMethod("found", os.path.join(ROOT_DIR, "test_circle_method.py"), 24, False, False)
+        result = [(element.test_filepath, element.starting_test_lineno) for element in unit_test_finders.find_tests_of_same_files_methods_and_classes(test_method, dev_only_test_mode=False)]
+        self.assertEqual(sorted(result), result)
+        self.assertEqual(result, [(element.test_filepath, element.starting_test_lineno) for element in unit_test_finders.find_tests_of_same_files_methods_and_classes(test_method, dev_only_test_mode=False)])
+
     def test_finding_all_related_tests_with_asterisk_imports(self):
         """Find all tests related to test_circle_method_with_asterisk_import_0.test_values, and ensure that
         test_circle_method_with_asterisk_import_1.test_values is among these.
@@ -991,6 +1040,31 @@ class TestUnitTestFinding(unittest.TestCase):
         filepaths_with_names = [(element.test_filepath, element.test_name) for element in result]
         self.assertIn((os.path.join(ROOT_DIR, 'test_circle_method_with_asterisk_import_1.py'), "test_values"), filepaths_with_names)
 
+    def test_exported_names_of_star_imported_modules(self):
+        """Find the names that a few modules export to "from module import *", and ensure that __all__ is honoured, that
+        names are only found anew once a module changes, and that they're kept in a persistent cache.
+        """
+        import tempfile
+        from ph_basic_processing.module_exports import EXPORTED_NAMES_CACHE_NAME, EXPORTED_NAMES_OF_MODULES, get_exported_names, save_exported_names
+        from ph_basic_processing.persistent_caches import load_persistent_cache
+        wipe_old_files()  # Remove key files that, if left over, may interfere with the flow of a test.
+
+        self.assertEqual(("circle_area", "crash"), get_exported_names(os.path.join(ROOT_DIR, "circle_method.py")))
+        with tempfile.TemporaryDirectory() as folder:
+            filepath = os.path.join(folder, "exporting_module.py")
+            with open(filepath, "w", encoding="utf-8") as file:
+                file.write('"""\ndef not_a_function():\n"""\nclass Dog:\n    def bark(self):\n        pass\ndef _hidden():\n    pass\nasync def fetch():\n    pass\n')
+            self.assertEqual(("Dog", "fetch"), get_exported_names(filepath))
+            with open(filepath, "a", encoding="utf-8") as file:
+                file.write('__all__ = ["Dog"]\n__all__ += ["_hidden"]\n')
+            self.assertEqual(("Dog", "_hidden"), get_exported_names(filepath))
+            with open(filepath, "a", encoding="utf-8") as file:
+                file.write('__all__: list = ["fetch"]\n__all__: list\n')
+            self.assertEqual(("fetch",), get_exported_names(filepath))
+            save_exported_names()
+            self.assertEqual(EXPORTED_NAMES_OF_MODULES[filepath], load_persistent_cache(EXPORTED_NAMES_CACHE_NAME)[filepath])
+            EXPORTED_NAMES_OF_MODULES.pop(filepath)
+
     def test_finding_all_related_tests_with_folder_relativity(self):
         """Find all tests related to ph_assets_for_test_py_holmes_0.test_bark_method_same_folder_absolute_reference.test_bark, and ensure
         that the following tests are included:
@@ -1105,6 +1179,134 @@ class TestUnitTestFinding(unittest.TestCase):
                                                                                                    "ph_assets_for_test_py_holmes_0/test_as_imports_methods.py")), starting_test_lineno=20, is_fuzzed=False, is_original=False)
         self.assertSetEqual({"ph_assets_for_test_py_holmes_0.as_imports_methods.compute0", "ph_assets_for_test_py_holmes_0.as_imports_methods.compute1"}, obj.files_methods_and_classes_testing)
 
+    def test_dotted_module_resolution_shared_between_test_methods(self):
+        """Resolve dotted module names the way TestMethod objects do, and ensure that each folder is only listed once,
+        that names resolving to nothing are remembered too, and that the leads found are the same as listing each folder
+        gives.
+        """
+        from ph_original_test_result_generation.ph_dir_and_file_finders import module_resolvers
+        wipe_old_files()  # Remove key files that, if left over, may interfere with the flow of a test.
+
+        obj = class_for_test_method.TestMethod("found", test_filepath=os.path.abspath(os.path.join(ROOT_DIR, "ph_assets_for_test_py_holmes_0/test_as_imports_methods.py")), starting_test_lineno=20, is_fuzzed=False, is_original=False)
+        folder = os.path.join(ROOT_DIR, "ph_assets_for_test_py_holmes_0")
+        self.assertEqual([("file", os.path.join(folder, "as_imports_methods.py"), os.path.join(folder, "as_imports_methods.py"))], obj.python_files_and_folders_in_directory_matching_name(ROOT_DIR, "ph_assets_for_test_py_holmes_0.as_imports_methods", files_only=True))
+        self.assertEqual([("dir", folder, folder)], obj.python_files_and_folders_in_directory_matching_name(ROOT_DIR, "ph_assets_for_test_py_holmes_0"))
+        self.assertEqual([], obj.python_files_and_folders_in_directory_matching_name(ROOT_DIR, "ph_assets_for_test_py_holmes_0.no_such_module", files_only=True))
+        self.assertEqual((), module_resolvers.LEADS_OF_DOTTED_NAMES[(ROOT_DIR, "ph_assets_for_test_py_holmes_0.no_such_module", True)])
+        self.assertEqual(sorted({name[:-3] if name.endswith(".py") else name for name in os.listdir(folder)}), sorted(module_resolvers.LEADS_IN_DIRECTORIES[folder]))
+
+        # Another test importing the same module lists no more folders
+        folders_listed = list(module_resolvers.LEADS_IN_DIRECTORIES)
+        class_for_test_method.TestMethod("found", test_filepath=os.path.abspath(os.path.join(ROOT_DIR, "ph_assets_for_test_py_holmes_0/test_as_imports_methods.py")), starting_test_lineno=15, is_fuzzed=False, is_original=False)
+        self.assertEqual(folders_listed, list(module_resolvers.LEADS_IN_DIRECTORIES))
+
+    def test_test_index_reuses_unchanged_files(self):
+        """Look up the test methods of a test file by way of the test index, and ensure that they're the same as
+        analysing the file gives, that the file is only analysed again once its content changes, and that merely touching
+        the file doesn't make its entry invalid.
+        """
+        from ph_causal_testing import indexes_of_found_tests
+        wipe_old_files()  # Remove key files that, if left over, may interfere with the flow of a test.
+
+        filepath = os.path.join(ROOT_DIR, "test_circle_method_with_asterisk_import_0.py")
+        indexes_of_found_tests.load_test_index()
+        indexes_of_found_tests.TEST_INDEX.pop(filepath, None)
+        analysed = unit_test_finders.find_all_test_methods_in_file(filepath)
+        indexed = indexes_of_found_tests.get_indexed_test_methods_in_file(filepath)
+        entry = indexes_of_found_tests.TEST_INDEX[filepath]
+        self.assertEqual({os.path.join(ROOT_DIR, "circle_method.py")}, set(entry[2]))
+        self.assertEqual([test_method.descriptor() for test_method in indexed], entry[3])
+        for test_method in analysed:
+            unit_test_cutters.get_call_sequence_signature(test_method)
+        self.assertEqual([test_method.descriptor() for test_method in analysed], [test_method.descriptor() for test_method in indexed])
+
+        # Looked up again without analysing the file
+        looked_up = indexes_of_found_tests.get_indexed_test_methods_in_file(filepath)
+        self.assertIs(entry, indexes_of_found_tests.TEST_INDEX[filepath])
+        self.assertEqual(entry[3], [test_method.descriptor() for test_method in looked_up])
+
+        # Touched but unchanged, or changed
+        stat_result = os.stat(filepath)
+        try:
+            os.utime(filepath, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10**9))
+            indexes_of_found_tests.get_indexed_test_methods_in_file(filepath)
+            self.assertEqual(entry[1:], indexes_of_found_tests.TEST_INDEX[filepath][1:])
+            self.assertFalse(indexes_of_found_tests.entry_is_valid(filepath, (None, "0" * 40) + entry[2:], (None, None)))
+        finally:
+            os.utime(filepath, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+
+    def test_test_methods_built_from_shared_file_analysis(self):
+        """Build the TestMethod objects of a test file from one shared analysis of the file, and ensure that they're the
+        same as building each one on its own.  Then ensure that the classes of nested test methods are found.
+        """
+        import tempfile
+        from ph_causal_testing.file_analyzers_for_tests import TestFileAnalysis
+        wipe_old_files()  # Remove key files that, if left over, may interfere with the flow of a test.
+
+        filepath = os.path.join(ROOT_DIR, "test_circle_method.py")
+        shared = unit_test_finders.find_all_test_methods_in_file(filepath)
+        self.assertTrue(len(shared) > 1)
+        for test_method in shared:
+            alone = class_for_test_method.TestMethod("found", filepath, test_method.starting_test_lineno, False, False)
+            self.assertEqual(alone.descriptor(), test_method.descriptor())
+        with self.assertRaises(ValueError):
+            class_for_test_method.TestMethod("found", filepath, shared[0].starting_test_lineno, False, False, analysis=TestFileAnalysis(os.path.join(ROOT_DIR, "circle_method.py")))
+
+        with tempfile.TemporaryDirectory() as folder:
+            filepath = os.path.join(folder, "test_decorated.py")
+            with open(filepath, "w", encoding="utf-8") as file:
+                file.write('import unittest\n\n\nclass TestOuter(unittest.TestCase):\n    @unittest.skip("not yet")\n    def test_skipped(self):\n        pass\n\n    class TestInner(unittest.TestCase):\n        def test_inner(self):\n            import math\n\n    def test_outer(self):\n        pass\n')
+            test_methods = unit_test_finders.find_all_test_methods_in_file(filepath)
+            self.assertEqual([("TestOuter", "test_skipped"), ("TestInner", "test_inner"), ("TestOuter", "test_outer")], [(test_method.test_class, test_method.test_name) for test_method in test_methods])
+            self.assertEqual((13, 15), (test_methods[2].starting_test_lineno, test_methods[2].ending_test_lineno))
+            self.assertEqual((9, 13), (test_methods[1].starting_class_lineno, test_methods[1].ending_class_lineno))
+
+    def test_test_files_analysed_in_parallel(self):
+        """Analyse a few test files with a pool of worker processes, and ensure that the test methods built from what they
+        send back are the same as analysing each file in this process gives, in the same order.
+        """
+        import glob
+        from ph_causal_testing import indexes_of_found_tests
+        wipe_old_files()  # Remove key files that, if left over, may interfere with the flow of a test.
+
+        filepaths = sorted(glob.glob(os.path.join(ROOT_DIR, "test_circle_method*.py")))
+        self.assertTrue(len(filepaths) >= indexes_of_found_tests.MIN_FILES_TO_ANALYSE_IN_PARALLEL)
+        analyses_of_files = indexes_of_found_tests.analyse_test_files(filepaths, max_workers=2)
+        self.assertEqual({filepath: indexes_of_found_tests.analyse_test_file(filepath) for filepath in filepaths}, analyses_of_files)
+
+        analysed = []
+        for filepath in filepaths:
+            for test_method in unit_test_finders.find_all_test_methods_in_file(filepath):
+                unit_test_cutters.get_call_sequence_signature(test_method)
+                analysed.append(test_method.descriptor())
+        indexes_of_found_tests.load_test_index()
+        for filepath in filepaths:
+            indexes_of_found_tests.TEST_INDEX.pop(filepath, None)
+        self.assertEqual(analysed, [test_method.descriptor() for test_method in indexes_of_found_tests.get_indexed_test_methods_in_files(filepaths, max_workers=2)])
+
+    def test_touched_test_file_checked_once(self):
+        """Touch an indexed test file without changing it, and ensure that looking up its test methods alongside other
+        files only hashes its content once.
+        """
+        from ph_causal_testing import indexes_of_found_tests
+        wipe_old_files()  # Remove key files that, if left over, may interfere with the flow of a test.
+
+        filepath = os.path.join(ROOT_DIR, "test_circle_method_with_asterisk_import_0.py")
+        indexes_of_found_tests.load_test_index()
+        indexed = indexes_of_found_tests.get_indexed_test_methods_in_files([filepath])
+        stat_result = os.stat(filepath)
+        hashed = []
+        get_content_hash = indexes_of_found_tests.get_content_hash
+        try:
+            os.utime(filepath, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 10**9))
+            indexes_of_found_tests.get_content_hash = lambda path: hashed.append(path) or get_content_hash(path)
+            looked_up = indexes_of_found_tests.get_indexed_test_methods_in_files([filepath])
+        finally:
+            indexes_of_found_tests.get_content_hash = get_content_hash
+            os.utime(filepath, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+        self.assertEqual([filepath], hashed)
+        self.assertEqual([test_method.descriptor() for test_method in indexed], [test_method.descriptor() for test_method in looked_up])
+
     def test_cut_found_tests(self):
         """Run ph_causal_testing.unit_test_cutters.cut_found_tests on a set of found tests, and ensure that the cut/keep
         choices are made.
@@ -1129,6 +1331,27 @@ class TestUnitTestFinding(unittest.TestCase):
         self.assertCountEqual(desired_names, result_names)
 
 
+    def test_call_sequence_signatures(self):
+        """Ensure that tests have the same call sequence signature exactly when they have the same call sequence, and
+        that cut_found_tests() still compares the call sequences of tests whose signature matches the original test's.
+        """
+        wipe_old_files()  # Remove key files that, if left over, may interfere with the flow of a test.
+
+        filepath = os.path.join(ROOT_DIR, "test_methods_for_test_cut_found_tests.py")
+        original = class_for_test_method.TestMethod(origin="found", test_filepath=filepath, starting_test_lineno=10, is_fuzzed=False, is_original=False)
+        variants = [class_for_test_method.TestMethod(origin="found", test_filepath=filepath, starting_test_lineno=lineno, is_fuzzed=False, is_original=False) for lineno in [16, 24, 32, 40, 47, 56, 64]]
+        for variant in variants:
+            same_sequence = unit_test_cutters.get_call_sequence(variant) == unit_test_cutters.get_call_sequence(original)
+            self.assertEqual(same_sequence, unit_test_cutters.get_call_sequence_signature(variant) == unit_test_cutters.get_call_sequence_signature(original))
+        self.assertEqual(unit_test_cutters.signature_of_call_sequence(["a", "b"]), unit_test_cutters.get_call_sequence_signature(class_for_test_method.TestMethod.from_descriptor({"call_sequence": ["a", "b"]})))
+        self.assertNotEqual(unit_test_cutters.signature_of_call_sequence(["a", "b"]), unit_test_cutters.signature_of_call_sequence(["ab"]))
+
+        # A variant whose signature matches only by collision is still cut
+        variants[2].call_sequence_signature = original.call_sequence_signature
+        result_names = [test.test_name for test in unit_test_cutters.cut_found_tests(variants, original, dev_only_test_mode=False)]
+        self.assertEqual(["test_variant_0", "test_variant_1", "test_variant_6"], result_names)
+
+
 class TestUnitTestFuzzing(unittest.TestCase):
     """Tests py-holmes's ability to fuzz both found and generated unit tests"""
 
@@ -1694,6 +1917,13 @@ class TestVariantRunningAndReporting(unittest.TestCase):
         self.assertCountEqual(desired_failing, result_failing)
         self.assertCountEqual(desired_passing, result_passing)
 
+        # Mark the closest failing and passing tests as truncated, and ensure they now rank after all the others
+        objects[0].truncated = True
+        objects[4].truncated = True
+        result = variant_test_runners.filter_for_minimally_different_passing_and_failing_tests(results=objects, original_execution_trace=trace_old)
+        self.assertCountEqual(objects[1:4], result[0])
+        self.assertCountEqual(objects[5:8], result[1])
+
     def test_fewer_than_usual_traces(self):
         """Run filter_for_minimally_different_passing_and_failing_traces on a very small collection of passing and
         failing traces (ie fewer than 3 of each category), and ensure that all are returned.
@@ -2470,6 +2700,823 @@ class TestWhenOriginalFileInDeeperFolder(unittest.TestCase):
         os.remove("ph_assets_for_test_py_holmes_0/dummy_file.txt")
 
 
+class TestEventTracing(unittest.TestCase):
+    """Tests of the structured event tracers selected with --trace_backend.
+    """
+
+    def test_event_trace_matches_trace_module(self):
+        """Trace the same function with the trace module and with an EventTracer, and ensure that the lines rendered from
+        the events are the lines that the trace module printed.
+        """
+        import io
+        import trace
+        from contextlib import redirect_stdout
+        from circle_method import circle_area
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import EventTracer
+
+        trace_buffer = io.StringIO()
+        with redirect_stdout(trace_buffer):
+            tracer = trace.Trace(count=0, trace=1, countfuncs=0, countcallers=0, ignoremods=(), ignoredirs=())
+            tracer.runfunc(circle_area, 2)
+        desired = trace_buffer.getvalue().split("\n")[:-1]
+
+        event_tracer = EventTracer()
+        event_tracer.runfunc(circle_area, 2)
+        result = list(event_tracer.results().tracelines())
+        self.assertEqual(desired, result)
+
+    def test_event_trace_parsed_from_entry(self):
+        """Ensure that parsed_tracelines_from_entry() starts at the first entry into the given function, and raises a
+        RuntimeError when that function was never entered.
+        """
+        from circle_method import circle_area
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import EventTracer
+
+        event_tracer = EventTracer()
+        event_tracer.runfunc(circle_area, 2)
+        parsed_lines = event_tracer.results().parsed_tracelines_from_entry("circle_method", "circle_area")
+        self.assertEqual("functioncall", parsed_lines[0].category)
+        self.assertEqual("circle_area", parsed_lines[0].funcname)
+        self.assertEqual("linelog", parsed_lines[1].category)
+        self.assertEqual(14, parsed_lines[1].line_number)
+        with self.assertRaises(RuntimeError):
+            event_tracer.results().parsed_tracelines_from_entry("circle_method", "crash")
+
+    def test_innermost_containers_found_with_ast(self):
+        """Ensure that each line's innermost container is found from the file's syntax tree, so that multi-line
+        definitions and docstrings containing "def " don't throw it off, and that the result is cached by file.
+        """
+        import os
+        from ph_basic_processing.parsers import get_containers_of_lines
+        from ph_basic_processing.trace_exit_line_adders import ParsedTraceline
+        from ph_original_test_result_generation.ph_dir_and_file_finders.pathfinders import CONTAINERS_OF_FILES
+
+        module_content = [
+            "@decorator\n",
+            "def outer(a,\n",
+            "          b):\n",
+            "    \"\"\"Docstring mentioning\n",
+            "def not_a_function():\n",
+            "    \"\"\"\n",
+            "    def inner():\n",
+            "        return a\n",
+            "    return inner\n",
+            "class Circle:\n",
+            "    def area(self): return 1\n",
+            "x = 2\n",
+        ]
+        containers, outer_containers = get_containers_of_lines(module_content)
+        self.assertEqual(["<module>", "outer", "outer", "outer", "outer", "outer", "inner", "inner", "outer", "Circle", "area", "<module>"], [container[0] for container in containers[1:]])
+        self.assertEqual(["<module>", "<module>", "<module>", "outer", "outer", "outer", "outer", "inner", "outer", "<module>", "Circle", "<module>"], [container[0] for container in outer_containers[1:]])
+        self.assertEqual(("inner", "func", 7), containers[8])
+        self.assertEqual(("Circle", "class", 10), containers[10])
+
+        parsed_line = ParsedTraceline.from_linelog("circle_method.py", 14, "    return pi * r ** 2")
+        self.assertEqual(("circle_area", "func"), (parsed_line.innermost_container, parsed_line.innermost_container_type))
+        self.assertIn(os.path.abspath("circle_method.py"), [os.path.abspath(file_path) for file_path in CONTAINERS_OF_FILES])
+
+    def test_traceline_regexes_match_piece_by_piece_parsing(self):
+        """Parse every line of the fibonacci traces, and some awkward lines, with parse_traceline() and with
+        parse_traceline_piece_by_piece(), and ensure that both give the same result, and that ParsedTraceline only
+        parses each distinct line once.
+        """
+        from ph_basic_processing.trace_exit_line_adders import parse_traceline, parse_traceline_piece_by_piece, parse_traceline_cached, ParsedTraceline, PARSED_TRACELINES_MAX_SIZE
+
+        lines = ["", "printed content", "printed --- modulename: circle_method, funcname: circle_area", "printed circle_method.py(14):     return pi * r ** 2", "circle_method.py(14):", "parsers.py(3):     f\" --- modulename: {modulename}, funcname: {funcname}\"", "parsers.py(3):     x = 'a.py(1): b'"]
+        with open("ph_assets_for_test_py_holmes_0/fibonacci_trace.txt", "r") as file:
+            lines += file.read().split("\n")
+        for line in lines:
+            self.assertEqual(parse_traceline_piece_by_piece(line), parse_traceline(line))
+
+        parsed_line = ParsedTraceline(" --- modulename: circle_method, funcname: circle_area")
+        self.assertEqual(("circle_method", "circle_area"), (parsed_line.modulename, parsed_line.funcname))
+        hits = parse_traceline_cached.cache_info().hits
+        ParsedTraceline(" --- modulename: circle_method, funcname: circle_area")
+        self.assertEqual(hits + 1, parse_traceline_cached.cache_info().hits)
+        self.assertEqual(PARSED_TRACELINES_MAX_SIZE, parse_traceline_cached.cache_info().maxsize)
+        self.assertFalse(hasattr(parsed_line, "__dict__"))
+        self.assertFalse(hasattr(parsed_line, "line_number"))
+
+    def test_cropping_and_adding_exit_lines_in_one_pass(self):
+        """Trace a failing test with a TextTracer and with an EventTracer, and ensure that
+        crop_and_add_exit_lines_to_trace() gives the same trace and indices as cropping before, adding exit lines, and
+        cropping after, one step at a time.
+        """
+        import io
+        from test_circle_method import TestCircleArea
+        from ph_basic_processing.trace_exit_line_adders import crop_and_add_exit_lines_to_trace, add_exit_lines_to_trace, remove_before_function_runtime, remove_after_function_runtime
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import EventTracer, TextTracer
+
+        def run_test():
+            suite = unittest.TestSuite()
+            suite.addTest(TestCircleArea("test_values"))
+            unittest.TextTestRunner(stream=io.StringIO()).run(suite)
+
+        text_tracer = TextTracer()
+        text_tracer.runfunc(run_test)
+        text = text_tracer.stream.getvalue()
+        crop_and_add_exit_lines_to_trace(text, "test_values", "test_circle_method")   # So that both ways see the same files already read
+        desired, desired_indices, _ = add_exit_lines_to_trace(remove_before_function_runtime(text, "test_values", "test_circle_method"))
+        desired = remove_after_function_runtime(desired, "test_values", "test_circle_method")
+        lines, indices, _ = crop_and_add_exit_lines_to_trace(text, "test_values", "test_circle_method")
+        self.assertEqual(desired, "\n".join(lines))
+        self.assertEqual([index for index in desired_indices if index < len(lines) - 1], indices)
+
+        event_tracer = EventTracer()
+        event_tracer.runfunc(run_test)
+        desired = remove_after_function_runtime(add_exit_lines_to_trace(event_tracer.results().parsed_tracelines_from_entry("test_circle_method", "test_values"))[0], "test_values", "test_circle_method")
+        lines = crop_and_add_exit_lines_to_trace(event_tracer.results().parsed_tracelines(), "test_values", "test_circle_method")[0]
+        self.assertEqual(desired, "\n".join(lines))
+
+        with self.assertRaises(RuntimeError):
+            crop_and_add_exit_lines_to_trace(text, "test_nonexistent", "test_circle_method")
+
+    def test_traced_files_found_from_code_objects(self):
+        """Trace a failing test with an EventTracer and with a TextTracer, and ensure that the files they ran are known by
+        their absolute paths, so that get_absolute_path() finds them from there, and that each path is classified once.
+        """
+        import io
+        import unittest.case
+        from test_circle_method import TestCircleArea
+        from ph_original_test_result_generation.ph_dir_and_file_finders.pathfinders import PATHS_OF_RUN_FILES, CLASSIFICATIONS_OF_PATHS, get_absolute_path, classify_path
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import EventTracer, TextTracer
+
+        def run_test():
+            suite = unittest.TestSuite()
+            suite.addTest(TestCircleArea("test_values"))
+            unittest.TextTestRunner(stream=io.StringIO()).run(suite)
+
+        case_path = os.path.abspath(unittest.case.__file__)
+        PATHS_OF_RUN_FILES.pop("case.py", None)
+        event_tracer = EventTracer()
+        event_tracer.runfunc(run_test)
+        self.assertTrue(all(os.path.isabs(filename) for filename in event_tracer.results().filenames if filename.endswith(".py")))
+        self.assertIn(case_path, event_tracer.results().filenames)
+        self.assertIn(case_path, PATHS_OF_RUN_FILES["case.py"])
+        PATHS_OF_RUN_FILES.pop("case.py")
+        TextTracer().runfunc(run_test)
+        self.assertIn(case_path, PATHS_OF_RUN_FILES["case.py"])
+
+        with open(case_path, "r", encoding="utf-8") as file:
+            first_line = file.readline()[:-1]
+        self.assertEqual(case_path, get_absolute_path("case.py", first_line, 1))
+        self.assertEqual((False, False), CLASSIFICATIONS_OF_PATHS[case_path])
+        self.assertEqual((True, True), classify_path(os.path.abspath("circle_method.py")))
+
+    def test_user_scope_records_library_calls_as_opaque(self):
+        """Trace a failing test with scope "user", and ensure that calls into unittest are recorded without their lines,
+        except for the path from the assert call to the line that raised the failure.
+        """
+        import io
+        from test_circle_method import TestCircleArea
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import EventTracer
+
+        def run_test_values():
+            suite = unittest.TestSuite()
+            suite.addTest(TestCircleArea("test_values"))
+            unittest.TextTestRunner(stream=io.StringIO()).run(suite)
+
+        event_tracer = EventTracer(scope="user")
+        event_tracer.runfunc(run_test_values)
+        result = list(event_tracer.results().tracelines(start=event_tracer.results().index_of_first_entry("test_circle_method", "test_values")))
+        desired_start = [
+            " --- modulename: test_circle_method, funcname: test_values",
+            "test_circle_method.py(22):         self.assertRaises(ValueError, circle_area, -2)     # Checks to see if ValueError is raised when circle_area(-2) is run.",
+            " --- modulename: case, funcname: assertRaises",
+            " --- modulename: circle_method, funcname: circle_area",
+            "circle_method.py(14):     return pi * r ** 2",
+        ]
+        self.assertEqual(desired_start, result[:5])
+        self.assertTrue(any(line.startswith("case.py(") and "self._raiseFailure(" in line for line in result))
+        self.assertFalse(any(line.startswith("case.py(") and "def " in line for line in result))
+        with self.assertRaises(ValueError):
+            EventTracer(scope="nonexistent")
+
+    @unittest.skipUnless(hasattr(sys, "monitoring"), "sys.monitoring requires Python 3.12+")
+    def test_monitoring_tracer_matches_settrace_tracer(self):
+        """Trace the same passing and failing tests with an EventTracer and a MonitoringEventTracer, in both scopes, and
+        ensure that they render the same lines.
+        """
+        import gc
+        import io
+        from test_circle_method import TestCircleArea
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import EventTracer, MonitoringEventTracer
+
+        def run_test(test_name):
+            suite = unittest.TestSuite()
+            suite.addTest(TestCircleArea(test_name))
+            unittest.TextTestRunner(stream=io.StringIO()).run(suite)
+
+        gc.disable()    # Garbage collection can run finalizers at arbitrary points, which would make the traces differ
+        try:
+            for scope in ["all", "user"]:
+                for granularity in ["line", "function"]:
+                    for test_name in ["test_area", "test_values"]:
+                        run_test(test_name)     # Warm up caches (eg linecache) so that both tracers see the same code paths
+                        settrace_tracer = EventTracer(scope=scope, granularity=granularity)
+                        settrace_tracer.runfunc(run_test, test_name)
+                        monitoring_tracer = MonitoringEventTracer(scope=scope, granularity=granularity)
+                        monitoring_tracer.runfunc(run_test, test_name)
+                        desired = list(settrace_tracer.results().tracelines())
+                        result = list(monitoring_tracer.results().tracelines())
+                        self.assertEqual(desired, result)
+        finally:
+            gc.enable()
+
+    def test_function_granularity_records_calls_and_exits(self):
+        """Trace a failing test with granularity "function" and ensure that it makes the same calls as with granularity
+        "line", exits every one of them, and only records the lines that the failure propagated through.
+        """
+        import io
+        from test_circle_method import TestCircleArea
+        from ph_basic_processing.trace_exit_line_adders import add_exit_lines_to_trace
+        from ph_original_test_result_generation.ph_fault_assessment.execution_trace_fault_assessers import find_index_of_failing_line
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import EventTracer
+
+        def run_test():
+            suite = unittest.TestSuite()
+            suite.addTest(TestCircleArea("test_values"))
+            unittest.TextTestRunner(stream=io.StringIO()).run(suite)
+
+        line_tracer = EventTracer()
+        line_tracer.runfunc(run_test)
+        function_tracer = EventTracer(granularity="function")
+        function_tracer.runfunc(run_test)
+        desired = add_exit_lines_to_trace(line_tracer.results().parsed_tracelines_from_entry("test_circle_method", "test_values"))[0].split("\n")
+        desired = desired[:desired.index(" ||| exiting modulename: test_circle_method, funcname: test_values") + 1]
+        desired_calls = [line for line in desired if line.startswith(" --- modulename: ")]
+        result = add_exit_lines_to_trace(function_tracer.results().parsed_tracelines_from_entry("test_circle_method", "test_values", function_level=True))[0].split("\n")
+        result = result[:result.index(" ||| exiting modulename: test_circle_method, funcname: test_values") + 1]
+
+        self.assertEqual(desired_calls, [line for line in result if line.startswith(" --- modulename: ")])
+        self.assertEqual(len(desired_calls), len([line for line in result if line.startswith(" ||| exiting modulename: ")]))
+        self.assertEqual("case.py(", result[find_index_of_failing_line(result)][:8])
+        self.assertEqual(["case.py", "case.py", "case.py", "case.py", "test_circle_method.py"], [line[:line.index("(")] for line in result if not line.startswith((" --- ", " ||| "))])
+        with self.assertRaises(ValueError):
+            EventTracer(granularity="nonexistent")
+
+    def test_make_event_tracer_fallback(self):
+        """Ensure that make_event_tracer() only builds a MonitoringEventTracer where sys.monitoring exists, and rejects
+        the text-printing backend.
+        """
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import make_event_tracer, EventTracer, MonitoringEventTracer
+
+        self.assertIs(EventTracer, type(make_event_tracer("settrace")))
+        if hasattr(sys, "monitoring"):
+            self.assertIs(MonitoringEventTracer, type(make_event_tracer("monitoring", scope="user")))
+        else:
+            with self.assertWarns(UserWarning):
+                self.assertIs(EventTracer, type(make_event_tracer("monitoring", scope="user")))
+        with self.assertRaises(ValueError):
+            make_event_tracer("trace")
+
+    def test_gated_tracing_only_traces_test_method(self):
+        """Gate an EventTracer to a test method, run the test with unittest, and ensure that only the test method and its
+        callees were traced, and that every function entered gets an exit line.
+        """
+        import io
+        from test_circle_method import TestCircleArea
+        from ph_basic_processing.trace_exit_line_adders import add_exit_lines_to_trace
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import EventTracer, gate_tracing_to_test_method
+
+        event_tracer = EventTracer()
+        test_instance = TestCircleArea("test_area")
+        gate_tracing_to_test_method(event_tracer, test_instance)
+        suite = unittest.TestSuite()
+        suite.addTest(test_instance)
+        unittest.TextTestRunner(stream=io.StringIO()).run(suite)
+
+        result = list(event_tracer.results().tracelines())
+        self.assertEqual(" --- modulename: test_circle_method, funcname: test_area", result[0])
+        self.assertEqual(0, event_tracer.results().index_of_first_entry("test_circle_method", "test_area"))
+        result_with_exits = add_exit_lines_to_trace(event_tracer.results().parsed_tracelines(), exit_remaining_functions=True)[0]
+        self.assertEqual(" ||| exiting modulename: test_circle_method, funcname: test_area", result_with_exits.split("\n")[-2])
+
+    def test_settrace_backend_stacklike(self):
+        """Run py-holmes with --trace_backend settrace and ensure the execution path is still reported, with every
+        function entered later exited in a stacklike way.
+        """
+        wipe_old_files()    # Remove key files that, if left over, may interfere with the flow of a test.
+        os.system("python py_holmes.py -f test_circle_method.py -l 20 --trace_backend settrace --dev_only_test_mode")
+        result = contents_of_log_file()
+        self.assertIn("case.py(814):", result)
+
+        # Filter for just the execution lines
+        execution_lines = result.split("\n")
+        index_execution_path_start = execution_lines.index("EXECUTION PATH:")
+        index_execution_path_end = execution_lines.index("INPUT ARGS TREE:")
+        execution_lines = execution_lines[index_execution_path_start+1:index_execution_path_end]
+        # Check for stacklike order.  If there isn't, raise an error.
+        function_stack = []
+        for line in execution_lines:
+            if " --- modulename: " in line and not ("<" in line and ">" in line and "funcname: <" not in line):
+                function_stack.append(line[line.index(", funcname: ") + 12:])
+            elif " ||| exiting modulename: " in line and not ("<" in line and ">" in line and "funcname: <" not in line):
+                if not ("ALL REMAINING CONTAINERS" in line and "ALL REMAINING FILES" in line):
+                    self.assertEqual(line[line.index(", funcname: ") + 12:], function_stack.pop())
+
+    def test_gated_execution_path_matches_ungated(self):
+        """Run py-holmes with and without --trace_gated, and ensure that the execution path of the original test is the
+        same either way.
+        """
+        execution_paths = []
+        for options in ["", "--trace_gated", "--trace_backend settrace --trace_gated"]:
+            wipe_old_files()    # Remove key files that, if left over, may interfere with the flow of a test.
+            self.assertEqual(0, os.system(f"python py_holmes.py -f test_circle_method.py -l 20 {options} --dev_only_test_mode"))
+            result = contents_of_log_file()
+            execution_paths.append(result[result.index("EXECUTION PATH:"):result.index("INPUT ARGS TREE:")])
+        self.assertEqual(execution_paths[0], execution_paths[1])
+        self.assertEqual(execution_paths[0], execution_paths[2])
+
+    def test_user_scope_finds_failing_line(self):
+        """Run py-holmes with --trace_scope user and ensure the execution path skips library lines but still contains
+        the failing line inside unittest.
+        """
+        wipe_old_files()    # Remove key files that, if left over, may interfere with the flow of a test.
+        self.assertEqual(0, os.system("python py_holmes.py -f test_circle_method.py -l 20 --trace_backend settrace --trace_scope user --dev_only_test_mode"))
+        result = contents_of_log_file()
+        execution_lines = result.split("\n")
+        execution_lines = execution_lines[execution_lines.index("EXECUTION PATH:")+1:execution_lines.index("INPUT ARGS TREE:")]
+        self.assertTrue(any(line.startswith("case.py(") and "self._raiseFailure(" in line for line in execution_lines))
+        self.assertFalse(any(line.startswith("case.py(") and "def " in line for line in execution_lines))
+        self.assertEqual(" ||| exiting modulename: test_circle_method, funcname: test_values", execution_lines[-2])
+
+    def test_function_granularity_finds_failing_line(self):
+        """Run py-holmes with --trace_granularity function and ensure the execution path has no lines other than those
+        the failure propagated through, while still reaching causal testing.
+        """
+        wipe_old_files()    # Remove key files that, if left over, may interfere with the flow of a test.
+        self.assertEqual(0, os.system("python py_holmes.py -f test_circle_method.py -l 20 --trace_backend settrace --trace_granularity function --dev_only_test_mode"))
+        result = contents_of_log_file()
+        execution_lines = result.split("\n")
+        execution_lines = execution_lines[execution_lines.index("EXECUTION PATH:")+1:execution_lines.index("INPUT ARGS TREE:")]
+        self.assertTrue(any(line.startswith("case.py(") and "self._raiseFailure(" in line for line in execution_lines))
+        self.assertEqual(5, len([line for line in execution_lines if ".py(" in line]))
+        self.assertEqual(" ||| exiting modulename: test_circle_method, funcname: test_values", execution_lines[-2])
+        self.assertIn("CAUSAL TESTING RESULTS", result)
+
+    def test_event_limit_coarsens_then_stops_tracing(self):
+        """Trace a test with an EventTracer whose max_events is reached partway through, and ensure that the rest of the
+        test is traced at function level, with every call still recorded and exited.  Then lower max_events so that the
+        limit is reached again, and ensure that tracing stops there.
+        """
+        import io
+        from test_circle_method import TestCircleArea
+        from ph_basic_processing.trace_exit_line_adders import add_exit_lines_to_trace
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import EventTracer, gate_tracing_to_test_method
+
+        def traced_lines_of_test(event_tracer):
+            test_instance = TestCircleArea("test_values")
+            gate_tracing_to_test_method(event_tracer, test_instance)
+            suite = unittest.TestSuite()
+            suite.addTest(test_instance)
+            unittest.TextTestRunner(stream=io.StringIO()).run(suite)
+            event_trace = event_tracer.results()
+            return add_exit_lines_to_trace(event_trace.parsed_tracelines(function_level=event_trace.truncated), exit_remaining_functions=True)[0].split("\n")
+
+        desired = traced_lines_of_test(EventTracer())
+        desired_calls = [line for line in desired if line.startswith(" --- modulename: ")]
+        coarsened_tracer = EventTracer(max_events=20)
+        result = traced_lines_of_test(coarsened_tracer)
+        self.assertTrue(coarsened_tracer.results().truncated)
+        self.assertEqual("function", coarsened_tracer.granularity)
+        self.assertEqual(desired[:8], result[:8])   # Lines recorded before the limit was reached
+        self.assertEqual(desired_calls, [line for line in result if line.startswith(" --- modulename: ")])
+        self.assertEqual(len(desired_calls), len([line for line in result if line.startswith(" ||| exiting modulename: ")]))
+        self.assertGreater(len(desired), len(result))
+
+        stopped_tracer = EventTracer(max_events=5)
+        result = traced_lines_of_test(stopped_tracer)
+        self.assertTrue(stopped_tracer.results().truncated)
+        self.assertEqual(10, len(stopped_tracer.results().events))
+        result_calls = [line for line in result if line.startswith(" --- modulename: ")]
+        self.assertEqual(desired_calls[:len(result_calls)], result_calls)
+        self.assertEqual(len(result_calls), len([line for line in result if line.startswith(" ||| exiting modulename: ")]))
+        with self.assertRaises(ValueError):
+            EventTracer(max_events=0)
+
+    def test_failure_stack_matches_trace_scan(self):
+        """Trace a failing test with each tracer, and ensure that each records the stack from the test method to the line
+        that raised the failure, and that assessing fault from that stack agrees with assessing it from the trace.
+        """
+        import io
+        from test_circle_method import TestCircleArea
+        from ph_basic_processing.trace_exit_line_adders import add_exit_lines_to_trace
+        from ph_original_test_result_generation.ph_fault_assessment.execution_trace_fault_assessers import user_at_fault
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import EventTracer, TextTracer, make_event_tracer, failure_stack_entries
+
+        def run_test():
+            suite = unittest.TestSuite()
+            suite.addTest(TestCircleArea("test_values"))
+            unittest.TextTestRunner(stream=io.StringIO()).run(suite)
+
+        event_tracer = EventTracer()
+        event_tracer.runfunc(run_test)
+        trace, non_ignored_user_descendant_lines, user_and_py_holmes_modules = add_exit_lines_to_trace(event_tracer.results().parsed_tracelines_from_entry("test_circle_method", "test_values"))
+        desired_fault = user_at_fault(trace, non_ignored_user_descendant_lines, "test_circle_method", user_and_py_holmes_modules)
+        text_tracer = TextTracer()
+        text_tracer.runfunc(run_test)
+        recorded_failure_stacks = [event_tracer.results().failure_stack, text_tracer.failure_stack]
+        for tracer in [EventTracer(scope="user"), EventTracer(granularity="function")] + ([make_event_tracer("monitoring", scope="user")] if hasattr(sys, "monitoring") else []):
+            tracer.runfunc(run_test)
+            recorded_failure_stacks.append(tracer.results().failure_stack)
+        for recorded_failure_stack in recorded_failure_stacks:
+            failure_stack = failure_stack_entries(recorded_failure_stack, "test_circle_method", "test_values")
+            self.assertEqual([("test_circle_method", "test_values"), ("case", "assertRaises"), ("case", "handle"), ("case", "__exit__"), ("case", "_raiseFailure")], [entry[:2] for entry in failure_stack])
+            self.assertEqual(desired_fault, user_at_fault(trace, non_ignored_user_descendant_lines, "test_circle_method", user_and_py_holmes_modules, failure_stack=failure_stack))
+
+        # A failure inside a user module that isn't the test module, reached only through library code, isn't the user's fault
+        self.assertFalse(user_at_fault("", [], "test_circle_method", [], failure_stack=[("test_circle_method", "test_values", True, True), ("case", "assertRaises", False, False), ("helpers", "check", True, True), ("case", "fail", False, False)]))
+        self.assertTrue(user_at_fault("", [], "test_circle_method", [], failure_stack=[("test_circle_method", "test_values", True, True), ("helpers", "check", True, False), ("case", "fail", False, False)]))
+
+        # A frame is classified by its own file, even when another file by the same name was found first
+        from ph_original_test_result_generation.ph_dir_and_file_finders.pathfinders import FILES_ALREADY_FOUND
+        user_filepath = os.path.join(ROOT_DIR, "circle_method.py")
+        module_code = compile("def circle_area(r):\n    pass\n", user_filepath, "exec")
+        function_code = [const for const in module_code.co_consts if hasattr(const, "co_name")][0]
+        previously_found = FILES_ALREADY_FOUND.get("circle_method.py")
+        FILES_ALREADY_FOUND["circle_method.py"] = os.path.join(os.path.dirname(os.path.dirname(sys.executable)), "circle_method.py")
+        try:
+            self.assertEqual([("circle_method", "circle_area", True, False)], failure_stack_entries([(user_filepath, function_code)], "circle_method", "circle_area"))
+        finally:
+            if previously_found is None:
+                FILES_ALREADY_FOUND.pop("circle_method.py")
+            else:
+                FILES_ALREADY_FOUND["circle_method.py"] = previously_found
+
+    def test_files_of_code_cached_by_absolute_path(self):
+        """Cache the files of code objects from two files that share a name, and ensure that each is added to
+        FILES_ALREADY_FOUND and classified in turn.  Then ensure that a file that can't be read is only checked once.
+        """
+        import tempfile
+        from ph_original_test_result_generation.ph_dir_and_file_finders.pathfinders import FILES_ALREADY_FOUND, CLASSIFICATIONS_OF_PATHS
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import FILES_OF_CODE_CHECKED, cache_file_of_code
+        wipe_old_files()  # Remove key files that, if left over, may interfere with the flow of a test.
+
+        with tempfile.TemporaryDirectory() as folder:
+            filepaths = [os.path.join(folder, subfolder, "shared_name_helpers.py") for subfolder in ["a", "b"]]
+            codes = []
+            for filepath in filepaths:
+                os.mkdir(os.path.dirname(filepath))
+                with open(filepath, "w", encoding="utf-8") as file:
+                    file.write("def helper():\n    pass\n")
+                codes.append(compile("def helper():\n    pass\n", filepath, "exec"))
+            for filepath, code in zip(filepaths + filepaths[:1], codes + codes[:1]):
+                cache_file_of_code(code)
+                self.assertEqual(filepath, FILES_ALREADY_FOUND["shared_name_helpers.py"])
+                self.assertIn(filepath, CLASSIFICATIONS_OF_PATHS)
+
+            unreadable_filepath = os.path.join(folder, "shared_name_latin.py")
+            with open(unreadable_filepath, "wb") as file:
+                file.write(b"# \xe9\ndef helper():\n    pass\n")
+            unreadable_code = compile("# \ndef helper():\n    pass\n", unreadable_filepath, "exec")
+            cache_file_of_code(unreadable_code)
+            self.assertNotIn("shared_name_latin.py", FILES_ALREADY_FOUND)
+            self.assertIs(False, FILES_OF_CODE_CHECKED[unreadable_filepath])
+            FILES_ALREADY_FOUND.pop("shared_name_helpers.py")
+
+    def test_text_tracer_keeps_printed_output_separate(self):
+        """Trace a function with a TextTracer and ensure that it records the same lines that the trace module prints,
+        while whatever the function prints stays out of the trace.  Then ensure that max_bytes cuts the trace short.
+        """
+        import io
+        import trace
+        from contextlib import redirect_stdout
+        from circle_method import circle_area
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import TextTracer
+
+        def chatty_circle_area(r):
+            print("about to compute the area of a circle")
+            return circle_area(r)
+
+        desired_buffer = io.StringIO()
+        with redirect_stdout(desired_buffer):
+            trace.Trace(count=0, trace=1, countfuncs=0, countcallers=0, ignoremods=(), ignoredirs=(), timing=False).runfunc(circle_area, 2)
+        text_tracer = TextTracer()
+        output_buffer = io.StringIO()
+        with redirect_stdout(output_buffer):
+            text_tracer.runfunc(circle_area, 2)
+        self.assertEqual(desired_buffer.getvalue(), text_tracer.stream.getvalue())
+        self.assertEqual("", output_buffer.getvalue())
+
+        text_tracer = TextTracer()
+        with redirect_stdout(output_buffer):
+            text_tracer.runfunc(chatty_circle_area, 2)
+        self.assertEqual("about to compute the area of a circle\n", output_buffer.getvalue())
+        self.assertTrue(all(line.startswith((" --- modulename: ", "test_py_holmes.py(", "circle_method.py(")) for line in text_tracer.stream.getvalue().split("\n")[:-1]))
+        self.assertIn(" --- modulename: circle_method, funcname: circle_area\n", text_tracer.stream.getvalue())
+
+        short_tracer = TextTracer(max_bytes=100)
+        with redirect_stdout(output_buffer):
+            short_tracer.runfunc(chatty_circle_area, 2)
+        self.assertTrue(short_tracer.stream.truncated)
+        self.assertLessEqual(len(short_tracer.stream.getvalue()), 100)
+        self.assertTrue(short_tracer.stream.getvalue().endswith("\n"))
+
+    def test_bounded_trace_buffer(self):
+        """Write past the end of a BoundedTraceBuffer and ensure that everything from the write that overflowed onward is
+        dropped, and the buffer is marked as truncated.
+        """
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import BoundedTraceBuffer
+
+        trace_buffer = BoundedTraceBuffer(max_bytes=10)
+        trace_buffer.write("12345")
+        self.assertFalse(trace_buffer.truncated)
+        trace_buffer.write("678901")
+        trace_buffer.write("2")
+        self.assertEqual("12345", trace_buffer.getvalue())
+        self.assertTrue(trace_buffer.truncated)
+        unbounded_buffer = BoundedTraceBuffer()
+        unbounded_buffer.write("x" * 100000)
+        self.assertFalse(unbounded_buffer.truncated)
+        with self.assertRaises(ValueError):
+            BoundedTraceBuffer(max_bytes=-1)
+
+
+class TestTraceCompression(unittest.TestCase):
+    """Tests of the compressed execution traces used with --trace_compress.
+    """
+
+    def test_compress_trace_round_trip(self):
+        """Compress a trace containing nested loops, and ensure that the repeats are collapsed and that expanding the
+        compressed trace gives back the original.
+        """
+        from ph_basic_processing.trace_compressors import compress_trace
+
+        trace_as_list = [" --- modulename: loops, funcname: outer", "loops.py(2):     for i in range(50):"]
+        for ii in range(50):
+            trace_as_list += ["loops.py(3):         for j in range(3):", "loops.py(4):             total += j"] * 3
+            trace_as_list += ["loops.py(5):         total += i"]
+        trace_as_list += [" ||| exiting modulename: loops, funcname: outer", ""]
+        trace_as_string = "\n".join(trace_as_list)
+
+        result = compress_trace(trace_as_string)
+        self.assertEqual(trace_as_string, result.expand())
+        self.assertEqual(len(trace_as_list), result.number_of_lines())
+        self.assertEqual(5, len(result.items))
+        block, count = result.items[2]
+        self.assertEqual(50, count)
+        self.assertEqual((("loops.py(3):         for j in range(3):", "loops.py(4):             total += j"), 3), block[0])
+        self.assertIn(" (repeated 50 times:", result.rendered_lines())
+
+        # Looking for substrings works as it does on the shown trace, and the checks done on every trace don't render it
+        from unittest import mock
+        from ph_basic_processing.trace_compressors import CompressedTrace
+        shown_trace = str(result)
+        with mock.patch.object(CompressedTrace, "__str__", side_effect=AssertionError("the trace was rendered")):
+            for s in ["\n", "modulename: ", "---", "|||", "repeated 3 times", "end of repeated block", "total += i", "not in the trace"]:
+                self.assertEqual(s in shown_trace, s in result)
+        for trace in [CompressedTrace([]), CompressedTrace(["one line"]), CompressedTrace([(("one line",), 2)])]:
+            self.assertEqual("\n" in str(trace), "\n" in trace)
+        self.assertIn("outer\nloops.py(2)", result)
+
+    def test_distance_between_compressed_execution_traces(self):
+        """Ensure that distance_between_execution_traces() gives the same distance for compressed traces as for the
+        uncompressed ones, and that a loop running more times only costs the extra iterations.
+        """
+        from ph_basic_processing.trace_compressors import compress_trace
+
+        # Get execution traces
+        with open("ph_assets_for_test_py_holmes_0/fibonacci_trace.txt", "r") as file:
+            trace_old = file.read()
+        with open("ph_assets_for_test_py_holmes_0/fibonacci_trace_some_insertions_and_removals.txt", "r") as file:
+            trace_new = file.read()
+
+        # Compressed and uncompressed traces should be the same distance apart
+        result = variant_test_runners.distance_between_execution_traces(compress_trace(trace_new), compress_trace(trace_old))
+        self.assertEqual(26, result)
+        result = variant_test_runners.distance_between_execution_traces(compress_trace(trace_new), trace_old)
+        self.assertEqual(26, result)
+
+        # Repeat the recursive calls to powLF 4 more times
+        repeated_call = " --- modulename: benchmark_fibonacci, funcname: powLF\nbenchmark_fibonacci.py(5):     if n == 1:\nbenchmark_fibonacci.py(7):     L, F = powLF(n//2)\n"
+        trace_longer = trace_old.replace(repeated_call, repeated_call * 5, 1)
+        result = variant_test_runners.distance_between_execution_traces(compress_trace(trace_longer), compress_trace(trace_old))
+        self.assertEqual(4 * 12, result)
+
+
+class TestTraceSampling(unittest.TestCase):
+    """Tests of the sampled execution traces used with --trace_sample_every and --trace_sample_interval.
+    """
+
+    def test_sampled_tracer_keeps_calls_and_failing_line(self):
+        """Trace a failing test with an EventTracer that samples every third line event, and ensure that every call is
+        still recorded and exited, that fewer lines are recorded, that the line weight makes up for the lines left out,
+        and that the line that raised the failure is still in the trace.
+        """
+        import io
+        from test_circle_method import TestCircleArea
+        from ph_basic_processing.trace_exit_line_adders import add_exit_lines_to_trace
+        from ph_original_test_result_generation.ph_fault_assessment.execution_trace_fault_assessers import find_index_of_failing_line
+        from ph_original_test_result_generation.ph_original_test_running.event_tracers import EventTracer, gate_tracing_to_test_method
+
+        def traced_lines_of_test(event_tracer):
+            test_instance = TestCircleArea("test_values")
+            gate_tracing_to_test_method(event_tracer, test_instance)
+            suite = unittest.TestSuite()
+            suite.addTest(test_instance)
+            unittest.TextTestRunner(stream=io.StringIO()).run(suite)
+            return add_exit_lines_to_trace(event_tracer.results().parsed_tracelines(function_level=True), exit_remaining_functions=True)[0].split("\n")
+
+        desired = traced_lines_of_test(EventTracer())
+        sampled_tracer = EventTracer(sample_every=3)
+        result = traced_lines_of_test(sampled_tracer)
+        desired_calls = [line for line in desired if line.startswith(" --- modulename: ")]
+        result_calls = [line for line in result if line.startswith(" --- modulename: ")]
+        self.assertEqual(desired_calls, result_calls)
+        self.assertEqual(len(result_calls), len([line for line in result if line.startswith(" ||| exiting modulename: ")]))
+        self.assertGreater(len(desired), len(result))
+        line_weight = sampled_tracer.results().line_weight()
+        self.assertGreater(line_weight, 1)
+        self.assertLessEqual(line_weight, 3)
+        self.assertEqual(desired[find_index_of_failing_line(desired)], result[find_index_of_failing_line(result)])
+        self.assertEqual(1, EventTracer().results().line_weight())
+        with self.assertRaises(ValueError):
+            EventTracer(sample_every=3, sample_interval=0.1)
+        with self.assertRaises(ValueError):
+            EventTracer(granularity="function", sample_every=3)
+
+    def test_distance_between_sampled_execution_traces(self):
+        """Ensure that distance_between_execution_traces() compares sampled traces by calls and by estimated line counts,
+        so that identical traces are no distance apart, extra calls cost 10 each, and line differences scale with the
+        line weight.
+        """
+        from ph_basic_processing.trace_samplers import SampledTrace
+
+        # Get execution traces
+        with open("ph_assets_for_test_py_holmes_0/fibonacci_trace.txt", "r") as file:
+            trace_old = file.read()
+
+        # Identical traces
+        result = variant_test_runners.distance_between_execution_traces(SampledTrace(trace_old, line_weight=3), SampledTrace(trace_old, line_weight=3))
+        self.assertEqual(0, result)
+
+        # Same lines, but each stands for more lines in one trace than in the other
+        number_of_lines = len([line for line in trace_old.split("\n") if " --- modulename: " not in " " + line and " ||| exiting modulename: " not in " " + line])
+        result = variant_test_runners.distance_between_execution_traces(SampledTrace(trace_old, line_weight=3), SampledTrace(trace_old, line_weight=2))
+        self.assertEqual(number_of_lines, result)
+
+        # One extra call, with its two lines
+        repeated_call = " --- modulename: benchmark_fibonacci, funcname: powLF\nbenchmark_fibonacci.py(5):     if n == 1:\nbenchmark_fibonacci.py(7):     L, F = powLF(n//2)\n"
+        trace_longer = trace_old.replace(repeated_call, repeated_call * 2, 1)
+        result = variant_test_runners.distance_between_execution_traces(SampledTrace(trace_longer, line_weight=3), SampledTrace(trace_old, line_weight=3))
+        self.assertEqual(10 + 2*3, result)
+        with self.assertRaises(ValueError):
+            SampledTrace(trace_old, line_weight=0.5)
+
+class TestTraceTokenization(unittest.TestCase):
+    """Tests of the tokenized execution traces that test variants' results are held as.
+    """
+
+    def test_tokenize_trace_round_trip(self):
+        """Tokenize two traces that share lines, and ensure that each gives back its text, that shared lines share
+        tokens, and that looking for substrings works as it does on the text.
+        """
+        from unittest import mock
+        from ph_basic_processing.trace_tokenizers import tokenize_trace, TokenTrace, TRACE_LINES
+
+        with open("ph_assets_for_test_py_holmes_0/fibonacci_trace.txt", "r") as file:
+            trace_old = file.read()
+        with open("ph_assets_for_test_py_holmes_0/fibonacci_trace_few_insertions.txt", "r") as file:
+            trace_new = file.read()
+
+        result_old = tokenize_trace(trace_old)
+        number_of_lines_in_table = len(TRACE_LINES)
+        result_new = tokenize_trace(trace_new)
+        self.assertEqual(trace_old, str(result_old))
+        self.assertEqual(trace_new, str(result_new))
+        self.assertEqual(len(trace_old.split("\n")), result_old.number_of_lines())
+        self.assertLess(len(TRACE_LINES) - number_of_lines_in_table, len(set(trace_new.split("\n"))))
+        self.assertEqual(result_old, tokenize_trace(trace_old))
+        self.assertIs(result_old, tokenize_trace(result_old))
+        for s in ["\n", "modulename: ", "---", "|||", "powLF", "not in the trace"]:
+            self.assertEqual(s in trace_old, s in result_old)
+        self.assertNotIn("\n", tokenize_trace(["a single line"]))
+
+        # The checks done on every trace don't build its text
+        with mock.patch.object(TokenTrace, "__str__", side_effect=AssertionError("the text of the trace was built")):
+            for s in ["\n", "modulename: ", "---", "|||"]:
+                self.assertEqual(s in trace_new, s in result_new)
+
+    def test_distance_between_tokenized_execution_traces(self):
+        """Ensure that distance_between_execution_traces() gives the same distance for tokenized traces as for the
+        text they were made from.
+        """
+        from ph_basic_processing.trace_tokenizers import tokenize_trace
+
+        # Get execution traces
+        traces = []
+        for filename in ["fibonacci_trace.txt", "fibonacci_trace_few_insertions.txt", "fibonacci_trace_few_removals.txt", "fibonacci_trace_some_insertions_and_removals.txt", "fibonacci_trace_completely_different_trace.txt"]:
+            with open(f"ph_assets_for_test_py_holmes_0/{filename}", "r") as file:
+                traces.append(file.read())
+
+        # Tokenized and textual traces should be the same distance apart
+        for trace_new in traces:
+            desired = variant_test_runners.distance_between_execution_traces(trace_new, traces[0])
+            self.assertEqual(desired, variant_test_runners.distance_between_execution_traces(tokenize_trace(trace_new), tokenize_trace(traces[0])))
+            self.assertEqual(desired, variant_test_runners.distance_between_execution_traces(tokenize_trace(trace_new), traces[0]))
+
+class TestFilenameIndexes(unittest.TestCase):
+    def test_filename_index_matches_walk(self):
+        """Index a small directory tree, and ensure that files are found in the same order that os.walk() finds them,
+        that the index is only rescanned where the tree changed, and that it's saved and loaded again.
+        """
+        import tempfile
+        from ph_basic_processing.persistent_caches import get_cache_path
+        from ph_original_test_result_generation.ph_dir_and_file_finders.filename_indexes import FilenameIndex, FILENAME_INDEXES, get_filename_index, get_cache_name_of_root, names_in_directory
+
+        def walked_paths_of(root, name):
+            return [os.path.join(this_dir, name) for this_dir, dirs, files in os.walk(root) if name in files]
+
+        with tempfile.TemporaryDirectory() as root:
+            root = os.path.abspath(root)
+            for relative_path in ["z.py", os.path.join("a", "x.py"), os.path.join("b", "x.py"), os.path.join("b", "c", "y.py")]:
+                os.makedirs(os.path.dirname(os.path.join(root, relative_path)), exist_ok=True)
+                open(os.path.join(root, relative_path), "w").close()
+            filename_index = FilenameIndex(root)
+            self.assertTrue(filename_index.refresh())
+            self.assertEqual(walked_paths_of(root, "x.py"), filename_index.paths_of("x.py"))
+            self.assertEqual([os.path.join(root, "b", "c", "y.py")], filename_index.paths_of("y.py"))
+            self.assertEqual([], filename_index.paths_of("c"))
+            self.assertFalse(filename_index.refresh())
+
+            open(os.path.join(root, "b", "c", "x.py"), "w").close()
+            self.assertTrue(filename_index.refresh())
+            self.assertEqual(walked_paths_of(root, "x.py"), filename_index.paths_of("x.py"))
+            self.assertEqual(os.listdir(root), filename_index.names_in(root))
+
+            try:
+                saved_index = get_filename_index(root)
+                FILENAME_INDEXES.pop(root)
+                loaded_index = get_filename_index(root)
+                self.assertIsNot(saved_index, loaded_index)
+                self.assertEqual(saved_index.entries_of_dirs, loaded_index.entries_of_dirs)
+                open(os.path.join(root, "a", "w.py"), "w").close()
+                self.assertIn("w.py", names_in_directory(os.path.join(root, "a")))
+            finally:
+                FILENAME_INDEXES.pop(root, None)
+                if os.path.exists(get_cache_path(get_cache_name_of_root(root))):
+                    os.remove(get_cache_path(get_cache_name_of_root(root)))
+
+
+class TestLineCaches(unittest.TestCase):
+    def test_line_cache_matches_readlines(self):
+        """Read files through a LineCache with a budget too small to hold more than one of them at once, and ensure that
+        their lines are the same as readlines() gives, that a file rewritten since it was read is read anew, and that
+        evicting a file doesn't change whether it's classified as a user file.
+        """
+        import tempfile
+        from ph_original_test_result_generation.ph_dir_and_file_finders.line_caches import LineCache, LINE_CACHE
+        from ph_original_test_result_generation.ph_dir_and_file_finders.pathfinders import FILES_ALREADY_FOUND, CLASSIFICATIONS_OF_PATHS, get_absolute_path, is_found_non_ignored_user_file
+
+        line_cache = LineCache(max_bytes=1)
+        file_paths = [os.path.abspath(os.path.join("ph_basic_processing", "parsers.py")), os.path.abspath("circle_method.py")]  # The first has CRLF line endings
+        for file_path in file_paths + file_paths:
+            with open(file_path, "r", encoding="utf-8") as file:
+                self.assertEqual(file.readlines(), line_cache.lines(file_path))
+            self.assertEqual([file_path], list(line_cache.files))
+        self.assertEqual("", line_cache.getline(file_paths[1], 10000))
+
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "rewritten.py")
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write("a = 1\nb = 2\n")
+            self.assertEqual("b = 2\n", line_cache.getline(file_path, 2))
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write("c = 3")
+            self.assertEqual("c = 3", line_cache.getline(file_path, 1, revalidate=True))
+            self.assertEqual("", line_cache.getline(file_path, 2))
+            line_cache.forget(file_path)
+            self.assertEqual(0, line_cache.bytes_used)
+
+        get_absolute_path("circle_method.py", "from math import pi", 1)
+        classification = CLASSIFICATIONS_OF_PATHS[FILES_ALREADY_FOUND["circle_method.py"]]
+        LINE_CACHE.forget(FILES_ALREADY_FOUND["circle_method.py"])
+        self.assertEqual(classification, CLASSIFICATIONS_OF_PATHS[FILES_ALREADY_FOUND["circle_method.py"]])
+        self.assertEqual(classification[0], is_found_non_ignored_user_file("circle_method.py"))
+
+    def test_line_cache_holds_no_files_open(self):
+        """Cache more files than may be open at once, and ensure that no file is left open or mapped, so that a file
+        truncated while it's cached gives empty lines rather than crashing the process.
+        """
+        import tempfile
+        from ph_original_test_result_generation.ph_dir_and_file_finders.line_caches import LineCache
+
+        line_cache = LineCache()
+        with tempfile.TemporaryDirectory() as folder:
+            file_paths = [os.path.join(folder, f"file_{ii}.py") for ii in range(2000)]
+            for file_path in file_paths:
+                with open(file_path, "w", encoding="utf-8") as file:
+                    file.write("a = 1\nb = 2\n")
+                self.assertEqual("b = 2\n", line_cache.getline(file_path, 2))
+            self.assertEqual(len(file_paths), len(line_cache.files))
+
+            with open(file_paths[0], "w", encoding="utf-8"):
+                pass    # Truncate the file
+            self.assertEqual("", line_cache.getline(file_paths[0], 2))
+            self.assertEqual(["", ""], line_cache.lines(file_paths[0]))
+
+
 class TestReproducibilityWithSeeds(unittest.TestCase):
     """Tests of py_holmes's ability to run in the exact same way when using a seed.
     """
@@ -2701,6 +3748,11 @@ def wipe_old_files() -> None:
     cleanup()
 
 
+def tearDownModule() -> None:
+    """Remove the files left over by the last test run, so that none of them outlive the tests."""
+    wipe_old_files()
+
+
 def check_contiguous(input_list: list) -> bool:
     """Return True if, after sorting, all numbers in input_list form a contiguous chain
     (ie no adjacent elements differ by more than 1).